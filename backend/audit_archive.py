@@ -0,0 +1,81 @@
+"""
+Audit log partition maintenance and cold archival.
+
+    python audit_archive.py ensure                 # create upcoming monthly partitions
+    python audit_archive.py list                   # partitions with sizes
+    python audit_archive.py archive                # archive months past AUDIT_RETENTION_MONTHS
+    python audit_archive.py restore FILE.ndjson.gz # re-attach an archived month
+    python audit_archive.py search --entity-id ID  # search archives offline (no database)
+
+Run `archive` from cron, e.g. daily; it only touches months that have left
+the retention window.
+"""
+import argparse
+import asyncio
+import json
+from datetime import date
+
+from core.audit_partitions import (
+    archive_expired,
+    ensure_partitions,
+    list_partitions,
+    restore_partition,
+    search_archives,
+)
+from core.config import AUDIT_ARCHIVE_DIR
+from database import engine
+
+
+async def run(args):
+    try:
+        if args.command == "ensure":
+            for name in await ensure_partitions():
+                print(name)
+        elif args.command == "list":
+            for partition in await list_partitions():
+                print(
+                    f"{partition['name']:<24} {partition['bounds']:<70} "
+                    f"~{partition['estimated_rows']:>12,} rows "
+                    f"{partition['total_bytes'] / 1024 / 1024:>10,.1f} MB"
+                )
+        elif args.command == "archive":
+            manifests = await archive_expired(args.archive_dir)
+            for manifest in manifests:
+                print(f"archived {manifest['partition']}: {manifest['rows']:,} rows")
+            if not manifests:
+                print("Nothing to archive.")
+        elif args.command == "restore":
+            rows = await restore_partition(args.path)
+            print(f"restored {rows:,} rows from {args.path}")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit log partitions and archives")
+    parser.add_argument("--archive-dir", default=AUDIT_ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ensure")
+    commands.add_parser("list")
+    commands.add_parser("archive")
+    restore = commands.add_parser("restore")
+    restore.add_argument("path")
+    search = commands.add_parser("search")
+    search.add_argument("--start", type=date.fromisoformat)
+    search.add_argument("--end", type=date.fromisoformat)
+    search.add_argument("--entity-id")
+    search.add_argument("--user-id")
+    search.add_argument("--action")
+    args = parser.parse_args()
+
+    if args.command == "search":
+        for row in search_archives(
+            args.archive_dir, args.start, args.end, args.entity_id, args.user_id, args.action
+        ):
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Mutation latency with and without automatic audit capture.
+
+Repeatedly updates one household's address through PUT /api/v1/households/{id}
+(every request changes the value, so every request writes) with capture
+disabled and then enabled, and prints latency summaries plus the capture
+layer's own bookkeeping time per record.
+
+    python -m benchmarks.bench_audit_capture [--requests 500]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import auth_headers, login, make_client, summarize
+from core.audit_capture import audit_capture
+from main import app, lifespan
+
+
+async def mutate(client, headers, household_id, requests, label):
+    latencies = []
+    started = time.perf_counter()
+    for i in range(requests):
+        start = time.perf_counter()
+        res = await client.put(
+            f"/api/v1/households/{household_id}",
+            json={"address": f"Bench {label} {i}"},
+            headers=headers,
+        )
+        res.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(requests: int):
+    async with lifespan(app), make_client(app) as client:
+        headers = auth_headers(await login(client))
+        res = await client.get("/api/v1/households/", params={"limit": 1}, headers=headers)
+        res.raise_for_status()
+        household = res.json()["data"][0]
+        original_address = household["address"]
+
+        results = {}
+        for label, enabled in (("without auditing", False), ("with auditing", True)):
+            audit_capture.enabled = enabled
+            results[label] = await mutate(
+                client, headers, household["id"], requests, label
+            )
+
+        await client.put(
+            f"/api/v1/households/{household['id']}",
+            json={"address": original_address},
+            headers=headers,
+        )
+
+    for label, summary in results.items():
+        print(f"{label:<18} {summary}")
+    print("capture:", audit_capture.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
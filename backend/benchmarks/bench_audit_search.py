@@ -0,0 +1,112 @@
+"""
+Audit log search latency as the table grows.
+
+Seeds synthetic audit rows (entity_name 'BENCH') and 200 bench users, then
+after reaching each target size runs the searches of GET /api/v1/audit-logs:
+username prefix, username substring, action substring and the action_type
+filter. Each search is repeated with count=none so only the search itself is
+timed. Use a disposable database: 50M rows take tens of GB. --cleanup removes
+the seeded rows and users.
+
+    python -m benchmarks.bench_audit_search [--sizes 1000000 10000000 50000000]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import auth_headers, login, make_client, summarize
+from database import engine
+from main import app
+
+SEED_USERS = """
+INSERT INTO users (id, username, password_hash, role, active)
+SELECT gen_random_uuid(), 'bench_user_' || lpad(n::text, 3, '0'), 'x', 'citizen', true
+FROM generate_series(1, 200) AS n
+ON CONFLICT (username) DO NOTHING
+"""
+
+SEED_LOGS = """
+INSERT INTO audit_logs (id, user_id, action, action_type, entity_name, entity_id, timestamp)
+SELECT gen_random_uuid(),
+       (CAST(:user_ids AS uuid[]))[1 + g % array_length(CAST(:user_ids AS uuid[]), 1)],
+       (ARRAY['UPDATE_CITIZEN', 'CREATE_HOUSEHOLD', 'LOCK_USER', 'LOGIN', 'DELETE_FEEDBACK'])[1 + g % 5],
+       (ARRAY['data', 'data', 'account', 'security', 'data'])[1 + g % 5],
+       'BENCH',
+       md5(g::text)::uuid,
+       now() - make_interval(secs => g)
+FROM generate_series(:start, :stop - 1) AS g
+"""
+
+SEARCHES = {
+    "username prefix": {"search": "bench_user_01", "search_mode": "prefix"},
+    "username substring": {"search": "user_04"},
+    "action substring": {"search": "househ"},
+    "action_type filter": {"action_type": "security"},
+}
+
+
+async def seed(current: int, target: int, chunk: int):
+    async with engine.begin() as conn:
+        await conn.execute(text(SEED_USERS))
+        user_ids = list(
+            (
+                await conn.execute(
+                    text("SELECT id FROM users WHERE username LIKE 'bench_user_%'")
+                )
+            ).scalars()
+        )
+    for start in range(current, target, chunk):
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(SEED_LOGS),
+                {"user_ids": user_ids, "start": start, "stop": min(start + chunk, target)},
+            )
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE audit_logs"))
+
+
+async def cleanup():
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM audit_logs WHERE entity_name = 'BENCH'"))
+        await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_user_%'"))
+
+
+async def main(sizes: list[int], requests: int, chunk: int):
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+        seeded = 0
+        for size in sorted(sizes):
+            started = time.perf_counter()
+            await seed(seeded, size, chunk)
+            seeded = size
+            print(f"\n{size:,} bench rows (seeded in {time.perf_counter() - started:.0f}s)")
+            for label, params in SEARCHES.items():
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    res = await client.get(
+                        "/api/v1/audit-logs",
+                        params={**params, "page_size": 50, "count": "none"},
+                        headers=headers,
+                    )
+                    res.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                print(f"  {label:<20} {summarize(latencies, time.perf_counter() - started)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000]
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--chunk", type=int, default=1_000_000)
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded rows and exit")
+    args = parser.parse_args()
+    if args.cleanup:
+        asyncio.run(cleanup())
+    else:
+        asyncio.run(main(args.sizes, args.requests, args.chunk))
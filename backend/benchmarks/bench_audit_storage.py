@@ -0,0 +1,130 @@
+"""
+Storage used by full-copy versus compact (diff + hash) audit rows.
+
+Builds two scratch tables shaped like audit_logs with the same synthetic
+history: citizen records of about fifteen fields where each update changes
+one or two of them and one row in twenty is the anchored first entry of an
+entity. One table stores full before/after JSON copies, the other the
+`changes` JSONB diff and the 64-character state hash. Rows are generated
+server-side in chunks, then the total relation size (heap, TOAST and primary
+key index) of both tables is printed. The tables are dropped afterwards
+unless --keep is given.
+
+    python -m benchmarks.bench_audit_storage [--rows 10000000] [--chunk 1000000]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from database import engine
+
+COLUMNS = """
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID,
+    action VARCHAR,
+    entity_name VARCHAR,
+    entity_id UUID,
+    before_state JSON,
+    after_state JSON,
+    changes JSONB,
+    state_hash VARCHAR(64),
+    timestamp TIMESTAMP
+"""
+
+# One synthetic citizen state per row; `g` is the generate_series value
+STATE = """
+    jsonb_build_object(
+        'id', md5((g / 20)::text)::uuid,
+        'full_name', 'Nguyen Van ' || (g / 20),
+        'date_of_birth', (date '1950-01-01' + (g % 20000))::text,
+        'place_of_birth', 'Ha Noi',
+        'native_place', 'Nam Dinh',
+        'ethnicity', 'Kinh',
+        'religion', 'Khong',
+        'occupation', 'Nhan vien van phong',
+        'workplace', 'Cong ty ' || (g % 500),
+        'cccd_number', lpad((g / 20)::text, 12, '0'),
+        'cccd_issue_date', '2021-06-15',
+        'cccd_issue_place', 'Cuc CSQLHC ve TTXH',
+        'household_id', md5((g / 80)::text)::uuid,
+        'relationship_with_head', 'Con',
+        'is_active', true
+    )
+"""
+
+FULL_INSERT = f"""
+INSERT INTO bench_audit_full
+    (user_id, action, entity_name, entity_id, before_state, after_state, timestamp)
+SELECT u, 'UPDATE_CITIZEN', 'CITIZEN', (s ->> 'id')::uuid,
+       s::json,
+       (s || jsonb_build_object('occupation', 'Nghe ' || g, 'workplace', 'Noi ' || g))::json,
+       now() - make_interval(secs => g)
+FROM (
+    SELECT g, md5((g % 50)::text)::uuid AS u, {STATE} AS s
+    FROM generate_series(:start, :stop - 1) AS g
+) src
+"""
+
+COMPACT_INSERT = f"""
+INSERT INTO bench_audit_compact
+    (user_id, action, entity_name, entity_id, changes, state_hash, timestamp)
+SELECT u, 'UPDATE_CITIZEN', 'CITIZEN', (s ->> 'id')::uuid,
+       CASE WHEN g % 20 = 0
+            THEN (SELECT jsonb_object_agg(key, jsonb_build_array(value, value)) FROM jsonb_each(s))
+            ELSE jsonb_build_object(
+                'occupation', jsonb_build_array(s -> 'occupation', 'Nghe ' || g),
+                'workplace', jsonb_build_array(s -> 'workplace', 'Noi ' || g))
+       END,
+       encode(sha256(convert_to(s::text || g, 'UTF8')), 'hex'),
+       now() - make_interval(secs => g)
+FROM (
+    SELECT g, md5((g % 50)::text)::uuid AS u, {STATE} AS s
+    FROM generate_series(:start, :stop - 1) AS g
+) src
+"""
+
+
+def mb(size: int) -> str:
+    return f"{size / 1024 / 1024:,.1f} MB"
+
+
+async def main(rows: int, chunk: int, keep: bool):
+    async with engine.begin() as conn:
+        for name in ("bench_audit_full", "bench_audit_compact"):
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            await conn.execute(text(f"CREATE TABLE {name} ({COLUMNS})"))
+
+    for name, sql in (("bench_audit_full", FULL_INSERT), ("bench_audit_compact", COMPACT_INSERT)):
+        started = time.perf_counter()
+        for start in range(0, rows, chunk):
+            async with engine.begin() as conn:
+                await conn.execute(text(sql), {"start": start, "stop": min(start + chunk, rows)})
+        print(f"filled {name} with {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    sizes = {}
+    async with engine.begin() as conn:
+        for name in ("bench_audit_full", "bench_audit_compact"):
+            await conn.execute(text(f"ANALYZE {name}"))
+            sizes[name] = (
+                await conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": name})
+            ).scalar_one()
+        if not keep:
+            for name in sizes:
+                await conn.execute(text(f"DROP TABLE {name}"))
+    await engine.dispose()
+
+    full, compact = sizes["bench_audit_full"], sizes["bench_audit_compact"]
+    print(f"full copies : {mb(full)} ({full / rows:,.0f} bytes/row)")
+    print(f"compact diff: {mb(compact)} ({compact / rows:,.0f} bytes/row)")
+    print(f"reduction   : {(1 - compact / full) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk", type=int, default=1_000_000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch tables")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.chunk, args.keep))
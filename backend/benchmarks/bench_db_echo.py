@@ -0,0 +1,45 @@
+"""
+Cost of SQL echo logging on the residents list endpoint.
+
+Runs the same load against GET /api/v1/residents/ with echo off, echo=True
+(every statement and its parameters) and echo="debug" (also every result
+row), switching the engine's echo flag in place. SQLAlchemy writes echo
+output to stdout, so redirect it to see the cost of real log I/O; results
+are printed to stderr:
+
+    python -m benchmarks.bench_db_echo [--duration 10] > /tmp/echo.log
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks.common import auth_headers, login, make_client, run_load
+from database import engine
+from main import app
+
+
+async def main(path: str, duration: float, concurrency: int):
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+
+        results = {}
+        for label, echo in (("echo off", False), ("echo on", True), ("echo debug", "debug")):
+            engine.sync_engine.echo = echo
+            await run_load(client, "GET", path, 1, concurrency, headers=headers)
+            results[label] = await run_load(
+                client, "GET", path, duration, concurrency, headers=headers
+            )
+        engine.sync_engine.echo = False
+
+    for label, summary in results.items():
+        print(f"{label:<12} {summary}", file=sys.stderr)
+    print("pool:", engine.pool.stats(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/api/v1/residents/")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.duration, args.concurrency))
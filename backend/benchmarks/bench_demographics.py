@@ -0,0 +1,85 @@
+"""
+Resident demographics latency at scale.
+
+Seeds bench citizens like bench_overview_stats (up to --citizens), then times
+the old approach (load every living citizen and bucket ages in Python)
+against GET /statistics/residents/demographics with the default edges, a
+5-year pyramid and a per-neighborhood-group breakdown. Each endpoint variant
+is measured cold (aggregate cache cleared before every request) and cached.
+
+    python -m benchmarks.bench_demographics [--citizens 10000000]
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from sqlalchemy import select
+
+from benchmarks.bench_overview_stats import seed
+from benchmarks.common import auth_headers, login, make_client, summarize
+from database import AsyncSessionLocal
+from main import app
+from models.citizen import Citizen
+from services import statistics_service
+
+VARIANTS = [
+    "/api/v1/statistics/residents/demographics",
+    "/api/v1/statistics/residents/demographics?bucket_width=5",
+    "/api/v1/statistics/residents/demographics?bucket_width=5&group_by=neighborhood_group",
+]
+
+
+async def time_legacy(requests: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    today = datetime.date.today()
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Citizen).where(Citizen.is_active, ~Citizen.is_deceased)
+            )
+            groups = [0, 0, 0]
+            for citizen in result.scalars():
+                age = today.year - citizen.date_of_birth.year
+                groups[0 if age <= 15 else 1 if age <= 60 else 2] += 1
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def time_endpoint(client, path: str, headers: dict, requests: int, cold: bool) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        if cold:
+            statistics_service._cache.clear()
+        start = time.perf_counter()
+        res = await client.get(path, headers=headers)
+        res.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(citizens: int, requests: int, legacy_requests: int, chunk: int):
+    started = time.perf_counter()
+    await seed(citizens, chunk)
+    print(f"{citizens:,} bench citizens (seeded in {time.perf_counter() - started:.0f}s)")
+    if legacy_requests:
+        print(f"  {'legacy load + Python loop':<40} {await time_legacy(legacy_requests)}")
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+        for path in VARIANTS:
+            for cold in (True, False):
+                label = f"{path.rsplit('demographics', 1)[1] or 'default'} ({'cold' if cold else 'cached'})"
+                print(f"  {label:<40} {await time_endpoint(client, path, headers, requests, cold)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--citizens", type=int, default=10_000_000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--legacy-requests", type=int, default=1, help="0 skips the legacy run")
+    parser.add_argument("--chunk", type=int, default=500_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.citizens, args.requests, args.legacy_requests, args.chunk))
@@ -0,0 +1,79 @@
+"""
+Latency of /health and a cheap authenticated GET during a login storm.
+
+Fires `--logins` concurrent logins in back-to-back waves while two probes keep
+sampling `/health` and `--probe-path`; prints the probes' p50/p99 latency with
+and without the storm so event-loop stalls from password hashing show up.
+
+    python -m benchmarks.bench_login_storm [--logins 200] [--duration 15]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (
+    BENCH_PASSWORD,
+    BENCH_USERNAME,
+    auth_headers,
+    login,
+    make_client,
+    summarize,
+)
+from core.hashing import password_hasher
+from main import app, lifespan
+
+
+async def probe(client, path, headers, stop: asyncio.Event, interval=0.02):
+    latencies = []
+    started = time.perf_counter()
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def storm(client, logins: int, stop: asyncio.Event):
+    form = {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+    done = 0
+    while not stop.is_set():
+        responses = await asyncio.gather(
+            *(client.post("/api/v1/login", data=form) for _ in range(logins))
+        )
+        done += len(responses)
+    return done
+
+
+async def measure(client, headers, probe_path, duration, logins):
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.create_task(probe(client, "/health", {}, stop)),
+        asyncio.create_task(probe(client, probe_path, headers, stop)),
+    ]
+    storm_task = asyncio.create_task(storm(client, logins, stop)) if logins else None
+    await asyncio.sleep(duration)
+    stop.set()
+    health, cheap = await asyncio.gather(*tasks)
+    completed = await storm_task if storm_task else 0
+    return {"health": health, probe_path: cheap, "logins_completed": completed}
+
+
+async def main(duration: float, logins: int, probe_path: str):
+    async with lifespan(app), make_client(app) as client:
+        headers = auth_headers(await login(client))
+        idle = await measure(client, headers, probe_path, duration / 3, 0)
+        loaded = await measure(client, headers, probe_path, duration, logins)
+
+    print("idle:      ", idle)
+    print("login storm:", loaded)
+    print("hasher:", password_hasher.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probe-path", default="/api/v1/roles/admin/permissions")
+    args = parser.parse_args()
+    asyncio.run(main(args.duration, args.logins, args.probe_path))
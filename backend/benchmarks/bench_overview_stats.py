@@ -0,0 +1,111 @@
+"""
+Dashboard overview latency at scale.
+
+Seeds synthetic citizens (cccd_number 'B' + 11 digits) up to --citizens, then
+times the old sequential count queries against GET /statistics/overview and
+/statistics/ward/overview. The endpoints are measured twice: cold, with the
+aggregate cache cleared before every request (one FILTER statement per table,
+run concurrently), and warm, served from STATS_CACHE_TTL. Use a disposable
+database; --cleanup removes the seeded citizens.
+
+    python -m benchmarks.bench_overview_stats [--citizens 5000000]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import auth_headers, login, make_client, summarize
+from database import AsyncSessionLocal, engine
+from main import app
+from services import statistics_service
+
+SEED_CITIZENS = """
+INSERT INTO citizens (id, full_name, date_of_birth, cccd_number, is_active, is_deceased)
+SELECT gen_random_uuid(),
+       'Bench Citizen ' || g,
+       DATE '1940-01-01' + (g % 30000),
+       'B' || lpad(g::text, 11, '0'),
+       g % 100 <> 0,
+       g % 250 = 0
+FROM generate_series(:start, :stop - 1) AS g
+"""
+
+LEGACY_QUERIES = [
+    "SELECT count(*) FROM households WHERE is_active = true",
+    "SELECT count(*) FROM citizens WHERE is_active = true AND is_deceased = false",
+    "SELECT count(*) FROM feedbacks WHERE created_at >= date_trunc('month', now())",
+    "SELECT count(*) FROM feedbacks",
+    "SELECT count(*) FROM feedbacks WHERE status = 'DA_GIAI_QUYET'",
+]
+
+
+async def seed(target: int, chunk: int):
+    async with engine.connect() as conn:
+        current = (
+            await conn.execute(text("SELECT count(*) FROM citizens WHERE cccd_number LIKE 'B%'"))
+        ).scalar_one()
+    for start in range(current, target, chunk):
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(SEED_CITIZENS), {"start": start, "stop": min(start + chunk, target)}
+            )
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE citizens"))
+
+
+async def cleanup():
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM citizens WHERE cccd_number LIKE 'B%'"))
+
+
+async def time_legacy(requests: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            for query in LEGACY_QUERIES:
+                await session.execute(text(query))
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def time_endpoint(client, path: str, headers: dict, requests: int, cold: bool) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        if cold:
+            statistics_service._cache.clear()
+        start = time.perf_counter()
+        res = await client.get(path, headers=headers)
+        res.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(citizens: int, requests: int, chunk: int):
+    started = time.perf_counter()
+    await seed(citizens, chunk)
+    print(f"{citizens:,} bench citizens (seeded in {time.perf_counter() - started:.0f}s)")
+    print(f"  {'legacy 5 sequential counts':<34} {await time_legacy(requests)}")
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+        for path in ("/api/v1/statistics/overview", "/api/v1/statistics/ward/overview"):
+            for cold in (True, False):
+                label = f"{path.rsplit('/statistics', 1)[1]} ({'cold' if cold else 'cached'})"
+                print(f"  {label:<34} {await time_endpoint(client, path, headers, requests, cold)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--citizens", type=int, default=5_000_000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--chunk", type=int, default=500_000)
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded citizens and exit")
+    args = parser.parse_args()
+    if args.cleanup:
+        asyncio.run(cleanup())
+    else:
+        asyncio.run(main(args.citizens, args.requests, args.chunk))
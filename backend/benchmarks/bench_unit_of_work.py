@@ -0,0 +1,83 @@
+"""
+Connection checkouts and commits per request for the resident and household
+endpoints.
+
+Counts pool checkouts (InstrumentedPool) and Session commits while replaying
+each endpoint a few times, and prints the per-request averages. Mutations
+write back the values they read, and the household address is restored
+afterwards. Run it on this commit and on its parent to compare per-call
+sessions with the request-scoped unit of work.
+
+    python -m benchmarks.bench_unit_of_work [--repeat 20]
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from benchmarks.common import auth_headers, login, make_client
+from database import engine
+from main import app
+
+commits = 0
+
+
+@event.listens_for(Session, "after_commit")
+def _count_commit(session):
+    global commits
+    commits += 1
+
+
+async def measure(client, repeat: int, method: str, path: str, body, headers) -> dict:
+    checkouts_before, commits_before = engine.pool.checkouts, commits
+    for i in range(repeat):
+        res = await client.request(method, path, json=body(i), headers=headers)
+        res.raise_for_status()
+    return {
+        "checkouts": round((engine.pool.checkouts - checkouts_before) / repeat, 2),
+        "commits": round((commits - commits_before) / repeat, 2),
+    }
+
+
+async def main(repeat: int):
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+        resident = (
+            await client.get("/api/v1/residents/", params={"limit": 1}, headers=headers)
+        ).json()["data"][0]
+        household = (
+            await client.get("/api/v1/households/", params={"limit": 1}, headers=headers)
+        ).json()["data"][0]
+
+        cases = {
+            "GET /residents/": ("GET", "/api/v1/residents/", lambda i: None),
+            "GET /residents/{id}": ("GET", f"/api/v1/residents/{resident['id']}", lambda i: None),
+            "PUT /residents/{id}": (
+                "PUT",
+                f"/api/v1/residents/{resident['id']}",
+                lambda i: {"occupation": resident.get("occupation")},
+            ),
+            "GET /households/{id}": ("GET", f"/api/v1/households/{household['id']}", lambda i: None),
+            # Alternate the address so every request really writes
+            "PUT /households/{id}": (
+                "PUT",
+                f"/api/v1/households/{household['id']}",
+                lambda i: {"address": household["address"] + " " * (i % 2 + 1)},
+            ),
+        }
+        for label, (method, path, body) in cases.items():
+            print(f"{label:<24} {await measure(client, repeat, method, path, body, headers)}")
+
+        await client.put(
+            f"/api/v1/households/{household['id']}",
+            json={"address": household["address"]},
+            headers=headers,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,38 @@
+"""
+Requests per second of an authenticated GET with and without the user cache.
+
+    python -m benchmarks.bench_user_cache [--path /api/v1/residents/] [--duration 10]
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import auth_headers, login, make_client, run_load
+from core.user_cache import user_cache
+from main import app
+
+
+async def main(path: str, duration: float, concurrency: int):
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+
+        results = {}
+        for label, enabled in (("before (no cache)", False), ("after (cache)", True)):
+            user_cache.clear()
+            user_cache.enabled = enabled
+            await run_load(client, "GET", path, 1, concurrency, headers=headers)
+            results[label] = await run_load(
+                client, "GET", path, duration, concurrency, headers=headers
+            )
+
+    for label, summary in results.items():
+        print(f"{label:<20} {summary}")
+    print("cache:", user_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/api/v1/residents/")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.duration, args.concurrency))
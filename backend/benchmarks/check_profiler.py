@@ -0,0 +1,52 @@
+"""
+Sampled profiling check.
+
+Starts the app with the profiler on and PROFILE_SAMPLE_RATE=2, sends four
+requests to /health and two to an unrouted path, and exits non-zero unless
+exactly the second and fourth /health requests carry an X-Profile-Id and
+come back as sampled profiles labelled with the route template. Needs no
+database, so it runs without a seeded Postgres.
+
+    python -m benchmarks.check_profiler
+"""
+import asyncio
+import os
+import sys
+
+os.environ["REQUEST_PROFILER_ENABLED"] = "true"
+os.environ["PROFILE_SAMPLE_RATE"] = "2"
+
+from benchmarks.common import make_client  # noqa: E402
+from core.profiler import request_profiler  # noqa: E402
+from main import app  # noqa: E402
+
+
+async def main() -> int:
+    failures = []
+    async with make_client(app) as client:
+        ids = []
+        for _ in range(4):
+            res = await client.get("/health")
+            res.raise_for_status()
+            ids.append(res.headers.get("x-profile-id"))
+        for _ in range(2):
+            res = await client.get("/no-such-route")
+            if "x-profile-id" in res.headers:
+                failures.append("unrouted request was profiled")
+    if [bool(i) for i in ids] != [False, True, False, True]:
+        failures.append(f"unexpected X-Profile-Id pattern {ids}")
+    for profile_id in filter(None, ids):
+        profile = request_profiler.get(profile_id)
+        if profile is None:
+            failures.append(f"profile {profile_id} was not stored")
+        elif profile["trigger"] != "sampled" or profile["route"] != "GET /health":
+            failures.append(f"profile {profile_id}: {profile['trigger']} {profile['route']}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print(f"ok   {len(request_profiler.profiles)} sampled profiles")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
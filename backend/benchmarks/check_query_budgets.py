@@ -0,0 +1,58 @@
+"""
+Query budget check for routes that declare one.
+
+Calls every GET route carrying a `query_budget(...)` dependency (routes with
+path parameters are skipped) with QUERY_BUDGET_STRICT behaviour switched on,
+prints the statement count from each Server-Timing header and exits non-zero
+if any route goes over its budget.
+
+    python -m benchmarks.check_query_budgets
+"""
+import asyncio
+import re
+import sys
+
+from fastapi.routing import APIRoute
+
+from benchmarks.common import auth_headers, login, make_client
+from core.query_stats import QueryBudget, QueryBudgetExceeded, query_stats
+from main import app
+
+STATEMENTS = re.compile(r'desc="(\d+) queries')
+
+
+def budgeted_routes():
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods:
+            continue
+        if "{" in route.path:
+            continue
+        for dependency in route.dependant.dependencies:
+            if isinstance(dependency.call, QueryBudget):
+                yield route.path, dependency.call.max_statements
+
+
+async def main() -> int:
+    query_stats.strict = True
+    failures = 0
+    async with make_client(app) as client:
+        headers = auth_headers(await login(client))
+        for path, budget in budgeted_routes():
+            # Twice, so the second request runs with a warm user cache
+            for _ in range(2):
+                try:
+                    res = await client.get(path, headers=headers)
+                except QueryBudgetExceeded as e:
+                    outcome = f"FAIL {e}"
+                    break
+                match = STATEMENTS.search(res.headers.get("server-timing", ""))
+                outcome = f"ok   {match[1] if match else '?'} statements"
+            else:
+                outcome = f"{outcome} (budget {budget})"
+            failures += outcome.startswith("FAIL")
+            print(f"{path:<45} {outcome}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
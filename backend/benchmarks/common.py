@@ -0,0 +1,80 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The scripts drive the FastAPI app in-process through httpx's ASGI transport,
+so they need the same environment as the API itself (`.env`, a reachable
+Postgres seeded by `init_db.py`). Run them from the backend directory, e.g.
+`python -m benchmarks.bench_user_cache`.
+"""
+import asyncio
+import os
+import time
+
+import httpx
+
+BENCH_USERNAME = os.getenv("BENCH_USERNAME", "admin")
+BENCH_PASSWORD = os.getenv("BENCH_PASSWORD", "admin123")
+
+
+def make_client(app) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def login(client: httpx.AsyncClient) -> dict:
+    res = await client.post(
+        "/api/v1/login",
+        data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD},
+    )
+    res.raise_for_status()
+    return res.json()
+
+
+def auth_headers(login_data: dict) -> dict:
+    return {"Authorization": f"Bearer {login_data['access_token']}"}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    method: str,
+    path: str,
+    duration: float,
+    concurrency: int,
+    **request_kwargs,
+) -> dict:
+    """Hammer one endpoint for `duration` seconds and summarise latencies."""
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            res = await client.request(method, path, **request_kwargs)
+            latencies.append(time.perf_counter() - start)
+            if res.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, errors)
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
@@ -0,0 +1,237 @@
+"""
+Asynchronous, batched audit-log pipeline.
+
+Handlers enqueue `AuditLogForm` records without touching the database. A
+background writer drains the bounded queue and writes multi-row INSERTs of up
+to AUDIT_BATCH_SIZE rows, or whatever arrived within AUDIT_FLUSH_INTERVAL
+seconds. When the queue is full new records are dropped and counted rather
+than slowing requests down. The lifespan stops the writer after flushing
+everything still queued.
+
+With AUDIT_STORAGE_FORMAT=diff (the default) each row stores a field-level
+diff and state hash instead of full copies; the first row of an entity that
+has no audit history yet is anchored with its full state. Each batch also
+updates the daily rollups read by the stats endpoint (core/audit_rollups.py).
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, null, select, tuple_
+
+from core.audit_format import compact, redact
+from core.audit_rollups import apply_batch as apply_rollups
+from core.config import (
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_QUEUE_SIZE,
+    AUDIT_STORAGE_FORMAT,
+)
+from database import AsyncSessionLocal
+from models import AuditLog
+from schemas.auth import AuditLogForm
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Categories behind the action_type filter of GET /audit-logs, checked in order
+ACTION_TYPE_ACTIONS = {
+    "security": ("login", "logout", "failed_login"),
+    "database": ("backup", "restore"),
+}
+ACTION_TYPE_ENTITIES = {
+    "account": ("user", "account"),
+    "permission": ("role", "permission"),
+    "settings": ("setting",),
+}
+ACTION_TYPES = (*ACTION_TYPE_ACTIONS, *ACTION_TYPE_ENTITIES, "data")
+
+
+def classify_action(action: str | None, entity_name: str | None) -> str:
+    """Derive the indexed action_type column when a record is written"""
+    action = (action or "").lower()
+    entity_name = (entity_name or "").lower()
+    for action_type, actions in ACTION_TYPE_ACTIONS.items():
+        if action in actions:
+            return action_type
+    for action_type, entities in ACTION_TYPE_ENTITIES.items():
+        if entity_name in entities:
+            return action_type
+    return "data"
+
+
+class AuditWriter:
+    def __init__(
+        self, max_queue: int, batch_size: int, flush_interval: float, storage_format: str
+    ):
+        self.max_queue = max_queue
+        self.storage_format = storage_format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.accepting = True
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self._task: asyncio.Task | None = None
+
+    def enqueue(self, log: AuditLogForm) -> bool:
+        return self.enqueue_change(
+            user_id=log.user_id,
+            action=log.action,
+            entity_name=log.entity_name,
+            entity_id=log.entity_id,
+            before_state=log.before_state,
+            after_state=log.after_state,
+        )
+
+    def enqueue_change(
+        self,
+        user_id,
+        action: str,
+        entity_name: str,
+        entity_id,
+        before_state: dict | None,
+        after_state: dict | None,
+        timestamp: datetime | None = None,
+    ) -> bool:
+        """Queue one change; states are JSON-encoded by the writer, not the caller"""
+        if not self.accepting:
+            self.dropped += 1
+            return False
+        record = {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "action": action,
+            "action_type": classify_action(action, entity_name),
+            "entity_name": entity_name,
+            "entity_id": entity_id,
+            "before_state": before_state,
+            "after_state": after_state,
+            "timestamp": timestamp or datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _collect(self) -> tuple[list[dict], bool]:
+        """Wait for one record, then gather more until the batch is full or the interval ends"""
+        loop = asyncio.get_running_loop()
+        first = await self.queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _encode(self, session, batch: list[dict]):
+        if self.storage_format != "diff":
+            for record in batch:
+                record["before_state"] = jsonable_encoder(redact(record["before_state"]))
+                record["after_state"] = jsonable_encoder(redact(record["after_state"]))
+            return
+        entities = {
+            (r["entity_name"], r["entity_id"]) for r in batch if r["entity_id"] is not None
+        }
+        seen = set()
+        if entities:
+            result = await session.execute(
+                select(AuditLog.entity_name, AuditLog.entity_id)
+                .where(tuple_(AuditLog.entity_name, AuditLog.entity_id).in_(entities))
+                .distinct()
+            )
+            seen = {tuple(row) for row in result}
+        for record in batch:
+            key = (record["entity_name"], record["entity_id"])
+            anchor = key not in seen
+            seen.add(key)
+            record["changes"], record["state_hash"] = compact(
+                record["before_state"], record["after_state"], anchor
+            )
+            # SQL NULL rather than a JSON 'null' value
+            record["before_state"] = null()
+            record["after_state"] = null()
+
+    async def _flush(self, batch: list[dict]):
+        if not batch:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await self._encode(session, batch)
+                await session.execute(insert(AuditLog).values(batch))
+                await apply_rollups(session, batch)
+                await session.commit()
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %d audit log records", len(batch))
+            return
+        self.written += len(batch)
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+    async def _run(self):
+        while True:
+            batch, stopping = await self._collect()
+            await self._flush(batch)
+            if stopping:
+                return
+
+    def start(self):
+        if self._task is None:
+            self.accepting = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting records and wait until everything queued is written"""
+        if self._task is None:
+            return
+        self.accepting = False
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "storage_format": self.storage_format,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0,
+        }
+
+
+audit_writer = AuditWriter(
+    max_queue=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    storage_format=AUDIT_STORAGE_FORMAT,
+)
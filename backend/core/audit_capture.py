@@ -0,0 +1,233 @@
+"""
+Automatic audit capture for mutations on core entities.
+
+Session events record create/update/delete on citizens, households,
+feedbacks, users and movement logs without extra reads:
+
+- INSERT/UPDATE/DELETE statements get a RETURNING clause, so the after state
+  (or, for DELETE, the before state) comes back with the write itself. The
+  before state of an UPDATE is the row the caller already loaded, passed as
+  the `audit_before` execution option (an ORM instance or a dict), falling
+  back to the rows it targets by primary key that are still held in the
+  session's identity map.
+- Objects added, modified or deleted through the unit of work are captured in
+  `after_flush` from their loaded attributes and attribute history.
+
+Records wait on the session until commit and are then handed to the
+background audit writer; a rollback discards them. The acting user comes from
+`audit_actor`, set by the bearer dependencies.
+"""
+import time
+from contextvars import ContextVar
+from uuid import UUID
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql import operators
+
+from core.audit import audit_writer
+from core.config import AUDIT_CAPTURE_ENABLED
+
+audit_actor: ContextVar[UUID | None] = ContextVar("audit_actor", default=None)
+
+AUDITED_TABLES = {
+    "citizens": "CITIZEN",
+    "households": "HOUSEHOLD",
+    "feedbacks": "FEEDBACK",
+    "users": "USER",
+    "movement_logs": "MOVEMENT_LOG",
+}
+
+PENDING_KEY = "audit_pending"
+
+
+class AuditCapture:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.captured = 0
+        self.overhead_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "captured": self.captured,
+            "overhead_ms_total": round(self.overhead_seconds * 1000, 3),
+            "overhead_us_per_record": (
+                round(self.overhead_seconds / self.captured * 1e6, 1)
+                if self.captured
+                else 0
+            ),
+        }
+
+
+audit_capture = AuditCapture(enabled=AUDIT_CAPTURE_ENABLED)
+
+
+def _instance_state(obj) -> dict:
+    loaded = inspect(obj).dict
+    return {c.name: loaded[c.name] for c in obj.__table__.columns if c.name in loaded}
+
+
+def _previous_state(obj) -> dict:
+    state = inspect(obj)
+    before = {}
+    for c in obj.__table__.columns:
+        history = state.attrs[c.name].history
+        if history.deleted:
+            before[c.name] = history.deleted[0]
+        elif history.unchanged:
+            before[c.name] = history.unchanged[0]
+    return before
+
+
+def _statement_ids(stmt, table) -> list:
+    """Primary keys an UPDATE targets through `id == x` or `id IN (...)`."""
+    pk = table.c.id
+    ids = []
+    for criterion in stmt._where_criteria:
+        left = getattr(criterion, "left", None)
+        value = getattr(getattr(criterion, "right", None), "value", None)
+        if getattr(left, "table", None) is not table or getattr(left, "name", None) != "id":
+            continue
+        if criterion.operator is operators.eq and value is not None:
+            ids.append(value)
+        elif criterion.operator is operators.in_op and value:
+            ids.extend(value)
+    try:
+        python_type = pk.type.python_type
+    except NotImplementedError:
+        return ids
+    coerced = []
+    for value in ids:
+        try:
+            coerced.append(value if isinstance(value, python_type) else python_type(value))
+        except (TypeError, ValueError):
+            continue
+    return coerced
+
+
+def _loaded_states(state: ORMExecuteState, table, hint) -> dict:
+    states = {}
+    mapper = state.bind_mapper
+    if mapper is not None:
+        for pk in _statement_ids(state.statement, table):
+            key = mapper.identity_key_from_primary_key([pk])
+            obj = state.session.identity_map.get(key)
+            if obj is not None:
+                states[str(obj.id)] = _instance_state(obj)
+    if hint is not None:
+        before = hint if isinstance(hint, dict) else _instance_state(hint)
+        states[str(before.get("id"))] = before
+    return states
+
+
+def _verb(verb: str, before: dict | None, after: dict | None) -> str:
+    # Soft deletes are UPDATEs that switch the row off
+    if (
+        verb == "UPDATE"
+        and before
+        and after
+        and before.get("is_active")
+        and after.get("is_active") is False
+    ):
+        return "DELETE"
+    return verb
+
+
+def _pend(
+    session: Session, verb: str, action: str | None, entity: str, before, after
+):
+    state = after or before
+    session.info.setdefault(PENDING_KEY, []).append(
+        {
+            "user_id": audit_actor.get(),
+            "action": action or f"{_verb(verb, before, after)}_{entity}",
+            "entity_name": entity,
+            "entity_id": state.get("id"),
+            "before_state": before or None,
+            "after_state": after or None,
+        }
+    )
+    audit_capture.captured += 1
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_statement(state: ORMExecuteState):
+    if not audit_capture.enabled or not (
+        state.is_insert or state.is_update or state.is_delete
+    ):
+        return None
+    stmt = state.statement
+    table = getattr(stmt, "table", None)
+    entity = AUDITED_TABLES.get(getattr(table, "name", None))
+    if entity is None:
+        return None
+
+    started = time.perf_counter()
+    loaded = (
+        _loaded_states(state, table, state.execution_options.get("audit_before"))
+        if state.is_update
+        else {}
+    )
+    returned = {getattr(c, "name", None) for c in stmt._returning}
+    missing = [c for c in table.columns if c.name not in returned]
+    if missing:
+        # Existing RETURNING columns stay first so scalar()/scalars() callers are unaffected
+        stmt = stmt.returning(*missing)
+    overhead = time.perf_counter() - started
+
+    result = state.invoke_statement(statement=stmt)
+
+    started = time.perf_counter()
+    keys = list(result.keys())
+    frozen = result.freeze()
+    action = state.execution_options.get("audit_action")
+    for row in frozen.data:
+        values = dict(zip(keys, row))
+        if state.is_delete:
+            _pend(state.session, "DELETE", action, entity, values, None)
+        elif state.is_insert:
+            _pend(state.session, "CREATE", action, entity, None, values)
+        else:
+            before = loaded.get(str(values.get("id")))
+            _pend(state.session, "UPDATE", action, entity, before, values)
+    audit_capture.overhead_seconds += overhead + time.perf_counter() - started
+    return frozen()
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_flush(session: Session, flush_context):
+    if not audit_capture.enabled:
+        return
+    started = time.perf_counter()
+    for obj in session.new:
+        entity = AUDITED_TABLES.get(getattr(obj, "__tablename__", None))
+        if entity:
+            _pend(session, "CREATE", None, entity, None, _instance_state(obj))
+    for obj in session.dirty:
+        entity = AUDITED_TABLES.get(getattr(obj, "__tablename__", None))
+        if entity and session.is_modified(obj, include_collections=False):
+            _pend(
+                session,
+                "UPDATE",
+                None,
+                entity,
+                _previous_state(obj),
+                _instance_state(obj),
+            )
+    for obj in session.deleted:
+        entity = AUDITED_TABLES.get(getattr(obj, "__tablename__", None))
+        if entity:
+            _pend(session, "DELETE", None, entity, _instance_state(obj), None)
+    audit_capture.overhead_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending(session: Session):
+    for record in session.info.pop(PENDING_KEY, ()):
+        audit_writer.enqueue_change(**record)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,87 @@
+"""
+Compact audit storage: field-level diffs plus a hash of the full state.
+
+Instead of full before/after copies, an audit row stores
+`changes = {field: [old, new]}` for the fields that changed and
+`state_hash`, the SHA-256 of the canonical JSON of the full after state.
+Folding an entity's diffs in order rebuilds its state at every step; the hash
+confirms that the rebuilt state is complete. The first row recorded for an
+entity is "anchored": unchanged fields are stored as `[value, value]` so the
+fold has a full starting point even for rows that existed before auditing.
+Sensitive fields are never stored, only a marker that they changed.
+"""
+import hashlib
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+SENSITIVE_FIELDS = {"password_hash"}
+REDACTED = "***"
+
+
+def redact(state: dict | None) -> dict | None:
+    if state is None:
+        return None
+    return {k: (REDACTED if k in SENSITIVE_FIELDS else v) for k, v in state.items()}
+
+
+def state_hash(state: dict | None) -> str:
+    canonical = json.dumps(
+        jsonable_encoder(state), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def compute_changes(
+    before: dict | None, after: dict | None, anchor: bool = False
+) -> dict:
+    """Field-level diff; with `anchor`, unchanged fields are kept as [value, value]"""
+    before = before or {}
+    after = after or {}
+    changes = {}
+    for field in before.keys() | after.keys():
+        old, new = before.get(field), after.get(field)
+        if old != new or anchor:
+            changes[field] = [old, new]
+    return changes
+
+
+def compact(before: dict | None, after: dict | None, anchor: bool = False) -> tuple[dict, str]:
+    """Encode a before/after pair as (changes, state_hash)"""
+    changes = compute_changes(
+        jsonable_encoder(redact(before)), jsonable_encoder(redact(after)), anchor
+    )
+    # Redacted values always compare equal, so compare the raw ones
+    for field in SENSITIVE_FIELDS:
+        if before and after and field in before and field in after:
+            if before[field] != after[field]:
+                changes[field] = [REDACTED, REDACTED]
+    return changes, state_hash(jsonable_encoder(redact(after)))
+
+
+def replay(entries) -> list[tuple[dict | None, dict | None, bool]]:
+    """
+    Rebuild (before, after, verified) for each entry of one entity, in order.
+
+    `entries` are objects with `changes`, `state_hash`, `before_state` and
+    `after_state`; rows still in the legacy full format are used as-is and
+    re-seed the fold.
+    """
+    steps = []
+    state: dict | None = None
+    for entry in entries:
+        if entry.changes is None:
+            before, after = entry.before_state, entry.after_state
+            state = after
+            steps.append((before, after, True))
+            continue
+        before = state
+        after = dict(state or {})
+        for field, (_, new) in entry.changes.items():
+            after[field] = new
+        if entry.state_hash == state_hash(None):
+            after = None
+        verified = state_hash(after) == entry.state_hash
+        steps.append((before, after, verified))
+        state = after
+    return steps
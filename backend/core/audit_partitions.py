@@ -0,0 +1,349 @@
+"""
+Monthly partitions, retention and cold archival for `audit_logs`.
+
+`audit_logs` is range-partitioned on `timestamp` into one table per month
+(`audit_logs_pYYYYMM`) plus a default partition for anything outside them.
+The maintainer keeps AUDIT_PARTITION_MONTHS_AHEAD future months created so
+inserts never fall into the default partition.
+
+Months older than AUDIT_RETENTION_MONTHS are archived by `audit_archive.py`:
+each partition is streamed to `<archive dir>/audit_logs_pYYYYMM.ndjson.gz`
+(one JSON object per row) with a `.manifest.json` holding the row count and
+checksum, then detached and dropped. Entities whose history continues past
+the archived month get a fresh full-state anchor row (action SNAPSHOT) at the
+start of the next month, in the same transaction as the drop, so their diffs
+can still be folded from a complete state. Archives can be re-attached with
+`restore_partition` or searched offline with `search_archives` without
+touching the database.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import date, datetime, time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, null, text
+
+from core.audit import classify_action
+from core.audit_format import replay, state_hash
+from core.config import (
+    AUDIT_ARCHIVE_DIR,
+    AUDIT_PARTITION_MONTHS_AHEAD,
+    AUDIT_RETENTION_MONTHS,
+)
+from database import engine
+from models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = re.compile(r"^audit_logs_p(\d{4})(\d{2})$")
+RESTORE_BATCH_SIZE = 5000
+ANCHOR_ACTION = "SNAPSHOT"
+MAINTAIN_INTERVAL_SECONDS = 6 * 3600
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_logs_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> date | None:
+    match = PARTITION_NAME.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def retention_cutoff(today: date | None = None) -> date:
+    """First month that is kept; earlier months are archived"""
+    return add_months(month_start(today or date.today()), -AUDIT_RETENTION_MONTHS)
+
+
+def _create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF audit_logs "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+async def is_partitioned() -> bool:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit_logs'::regclass")
+        )
+        return result.first() is not None
+
+
+async def ensure_partitions(months_ahead: int = AUDIT_PARTITION_MONTHS_AHEAD) -> list[str]:
+    """Create this month's partition and the next `months_ahead` ones"""
+    current = month_start(date.today())
+    months = [add_months(current, i) for i in range(months_ahead + 1)]
+    async with engine.begin() as conn:
+        for month in months:
+            await conn.execute(text(_create_partition_sql(month)))
+    return [partition_name(m) for m in months]
+
+
+async def list_partitions() -> list[dict]:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                """
+                SELECT c.relname AS name,
+                       pg_get_expr(c.relpartbound, c.oid) AS bounds,
+                       c.reltuples::bigint AS estimated_rows,
+                       pg_total_relation_size(c.oid) AS total_bytes
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'audit_logs'::regclass
+                ORDER BY c.relname
+                """
+            )
+        )
+        return [dict(row._mapping) for row in result]
+
+
+def archive_path(name: str, archive_dir: str = AUDIT_ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"{name}.ndjson.gz")
+
+
+async def archive_partition(name: str, archive_dir: str = AUDIT_ARCHIVE_DIR) -> dict:
+    """Stream one partition to compressed NDJSON, then detach and drop it"""
+    if partition_month(name) is None:
+        raise ValueError(f"Not a monthly audit partition: {name}")
+    os.makedirs(archive_dir, exist_ok=True)
+    path = archive_path(name, archive_dir)
+    tmp_path = f"{path}.tmp"
+    digest = hashlib.sha256()
+    rows = 0
+    async with engine.connect() as conn:
+        result = await conn.stream(text(f"SELECT * FROM {name} ORDER BY timestamp, id"))
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+            async for row in result.mappings():
+                line = json.dumps(jsonable_encoder(dict(row)), ensure_ascii=False) + "\n"
+                out.write(line)
+                digest.update(line.encode())
+                rows += 1
+    os.replace(tmp_path, path)
+
+    manifest = {
+        "partition": name,
+        "from": partition_month(name).isoformat(),
+        "to": add_months(partition_month(name), 1).isoformat(),
+        "rows": rows,
+        "sha256": digest.hexdigest(),
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+    with open(f"{path[:-len('.ndjson.gz')]}.manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    async with engine.begin() as conn:
+        current = (await conn.execute(text(f"SELECT count(*) FROM {name}"))).scalar_one()
+        if current != rows:
+            raise RuntimeError(
+                f"{name} changed while archiving ({rows} archived, {current} now); not dropped"
+            )
+        anchors = await _anchor_rows(conn, name, add_months(partition_month(name), 1))
+        for start in range(0, len(anchors), RESTORE_BATCH_SIZE):
+            await conn.execute(insert(AuditLog), anchors[start:start + RESTORE_BATCH_SIZE])
+        await conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+        await conn.execute(text(f"DROP TABLE {name}"))
+    logger.info("Archived %s (%d rows, %d anchors) to %s", name, rows, len(anchors), path)
+    return manifest
+
+
+async def _anchor_rows(conn, name: str, end: date) -> list[dict]:
+    """Full-state anchors at `end` for entities of `name` with later audit rows"""
+    result = await conn.stream(
+        text(
+            f"""
+            SELECT p.entity_name, p.entity_id, p.changes, p.state_hash,
+                   p.before_state, p.after_state
+            FROM {name} p
+            WHERE p.entity_id IS NOT NULL
+              AND EXISTS (
+                  SELECT 1 FROM audit_logs l
+                  WHERE l.entity_name = p.entity_name
+                    AND l.entity_id = p.entity_id
+                    AND l.timestamp >= :end
+              )
+            ORDER BY p.entity_name, p.entity_id, p.timestamp, p.id
+            """
+        ),
+        {"end": end},
+    )
+    timestamp = datetime.combine(end, time.min)
+    anchors = []
+
+    def close(key, entries):
+        _, state, _ = replay(entries)[-1]
+        if state is None:
+            # Deleted by the end of the month; later rows start from nothing
+            return
+        anchors.append(
+            {
+                "id": uuid.uuid4(),
+                "user_id": None,
+                "action": ANCHOR_ACTION,
+                "action_type": classify_action(ANCHOR_ACTION, key[0]),
+                "entity_name": key[0],
+                "entity_id": key[1],
+                # SQL NULL rather than a JSON 'null' value
+                "before_state": null(),
+                "after_state": null(),
+                "changes": {field: [value, value] for field, value in state.items()},
+                "state_hash": state_hash(state),
+                "timestamp": timestamp,
+            }
+        )
+
+    key, entries = None, []
+    async for row in result:
+        if (row.entity_name, row.entity_id) != key:
+            if entries:
+                close(key, entries)
+            key, entries = (row.entity_name, row.entity_id), []
+        entries.append(row)
+    if entries:
+        close(key, entries)
+    return anchors
+
+
+async def archive_expired(archive_dir: str = AUDIT_ARCHIVE_DIR) -> list[dict]:
+    """Archive every monthly partition older than the retention window"""
+    cutoff = retention_cutoff()
+    manifests = []
+    for partition in await list_partitions():
+        month = partition_month(partition["name"])
+        if month is not None and month < cutoff:
+            manifests.append(await archive_partition(partition["name"], archive_dir))
+    return manifests
+
+
+def _decode_row(row: dict) -> dict:
+    for key in ("id", "user_id", "entity_id"):
+        if row.get(key):
+            row[key] = uuid.UUID(row[key])
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+async def restore_partition(path: str) -> int:
+    """Re-attach an archived month: recreate its partition and load the rows back"""
+    name = os.path.basename(path).split(".")[0]
+    month = partition_month(name)
+    if month is None:
+        raise ValueError(f"Not an audit partition archive: {path}")
+    rows = 0
+    async with engine.begin() as conn:
+        await conn.execute(text(_create_partition_sql(month)))
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            batch = []
+            for line in f:
+                batch.append(_decode_row(json.loads(line)))
+                if len(batch) >= RESTORE_BATCH_SIZE:
+                    await conn.execute(insert(AuditLog), batch)
+                    rows += len(batch)
+                    batch = []
+            if batch:
+                await conn.execute(insert(AuditLog), batch)
+                rows += len(batch)
+    logger.info("Restored %s (%d rows)", name, rows)
+    return rows
+
+
+def search_archives(
+    archive_dir: str = AUDIT_ARCHIVE_DIR,
+    start: date | None = None,
+    end: date | None = None,
+    entity_id: str | None = None,
+    user_id: str | None = None,
+    action: str | None = None,
+):
+    """Yield archived rows matching the filters, without a database"""
+    for filename in sorted(os.listdir(archive_dir)):
+        if not filename.endswith(".ndjson.gz"):
+            continue
+        month = partition_month(filename.split(".")[0])
+        if month is None:
+            continue
+        if start and add_months(month, 1) <= start:
+            continue
+        if end and month > end:
+            continue
+        with gzip.open(os.path.join(archive_dir, filename), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if entity_id and row.get("entity_id") != entity_id:
+                    continue
+                if user_id and row.get("user_id") != user_id:
+                    continue
+                if action and action.lower() not in (row.get("action") or "").lower():
+                    continue
+                yield row
+
+
+class PartitionMaintainer:
+    """Keeps future monthly partitions created while the API runs"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.enabled = True
+        self.last_run: datetime | None = None
+        self.last_error: str | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            try:
+                if await is_partitioned():
+                    await ensure_partitions()
+                else:
+                    self.enabled = False
+                    logger.info("audit_logs is not partitioned; partition maintenance disabled")
+                    return
+                self.last_run = datetime.utcnow()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Audit partition maintenance failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "retention_months": AUDIT_RETENTION_MONTHS,
+            "months_ahead": AUDIT_PARTITION_MONTHS_AHEAD,
+            "retention_cutoff": retention_cutoff().isoformat(),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_error": self.last_error,
+        }
+
+
+partition_maintainer = PartitionMaintainer(interval=MAINTAIN_INTERVAL_SECONDS)
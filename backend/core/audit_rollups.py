@@ -0,0 +1,120 @@
+"""
+Daily rollups behind GET /audit-logs/stats.
+
+The audit writer updates them in the same transaction as each batch insert:
+event counters per (day, action_type) are upserted with an increment, and the
+day's HyperLogLog sketch of acting users is merged under a row lock so
+concurrent workers never lose each other's registers. Stats then read a
+handful of rows per day instead of scanning audit_logs.
+"""
+from collections import Counter, defaultdict
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.hll import HyperLogLog
+from models import AuditLogDailyRollup, AuditLogDailyUsers
+
+
+async def apply_batch(session: AsyncSession, batch: list[dict]):
+    counts = Counter((r["timestamp"].date(), r["action_type"]) for r in batch)
+    stmt = pg_insert(AuditLogDailyRollup).values(
+        [
+            {"day": day, "action_type": action_type, "events": events}
+            for (day, action_type), events in sorted(counts.items())
+        ]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[AuditLogDailyRollup.day, AuditLogDailyRollup.action_type],
+            set_={"events": AuditLogDailyRollup.events + stmt.excluded.events},
+        )
+    )
+
+    users_by_day = defaultdict(set)
+    for record in batch:
+        if record["user_id"] is not None:
+            users_by_day[record["timestamp"].date()].add(str(record["user_id"]))
+    # Sorted so concurrent writers lock days in the same order
+    for day in sorted(users_by_day):
+        await merge_users(session, day, users_by_day[day])
+
+
+async def merge_users(session: AsyncSession, day: date, user_ids):
+    await session.execute(
+        pg_insert(AuditLogDailyUsers)
+        .values(day=day, sketch=HyperLogLog().to_bytes())
+        .on_conflict_do_nothing(index_elements=[AuditLogDailyUsers.day])
+    )
+    row = await session.execute(
+        select(AuditLogDailyUsers).where(AuditLogDailyUsers.day == day).with_for_update()
+    )
+    daily = row.scalar_one()
+    sketch = HyperLogLog(registers=daily.sketch)
+    for user_id in user_ids:
+        sketch.add(user_id)
+    if sketch.to_bytes() != daily.sketch:
+        daily.sketch = sketch.to_bytes()
+
+
+# Merged sketch of every day before the key date; past days only change
+# through backfill_audit_rollups, so it is rebuilt once a day
+_users_before_cache: dict[date, HyperLogLog] = {}
+
+
+async def _users_before(client: AsyncSession, today: date) -> HyperLogLog:
+    users = _users_before_cache.get(today)
+    if users is None:
+        users = HyperLogLog()
+        sketches = await client.execute(
+            select(AuditLogDailyUsers.sketch).where(AuditLogDailyUsers.day < today)
+        )
+        for (registers,) in sketches:
+            users.merge(HyperLogLog(registers=registers))
+        _users_before_cache.clear()
+        _users_before_cache[today] = users
+    return users
+
+
+async def read_stats(client: AsyncSession, start: date, today: date) -> dict:
+    """All-time totals, plus totals and per-action_type counts from `start` to `today`"""
+    result = await client.execute(
+        select(
+            AuditLogDailyRollup.day,
+            AuditLogDailyRollup.action_type,
+            AuditLogDailyRollup.events,
+        ).where(AuditLogDailyRollup.day <= today)
+    )
+    today_count = 0
+    total_count = 0
+    by_action_type = Counter()
+    for day, action_type, events in result:
+        total_count += events
+        if day >= start:
+            by_action_type[action_type] += events
+        if day == today:
+            today_count += events
+
+    sketches = await client.execute(
+        select(AuditLogDailyUsers.day, AuditLogDailyUsers.sketch).where(
+            AuditLogDailyUsers.day >= start, AuditLogDailyUsers.day <= today
+        )
+    )
+    users = HyperLogLog(registers=(await _users_before(client, today)).to_bytes())
+    window_users = HyperLogLog()
+    for day, registers in sketches:
+        sketch = HyperLogLog(registers=registers)
+        window_users.merge(sketch)
+        if day == today:
+            users.merge(sketch)
+
+    return {
+        "today_count": today_count,
+        "total_count": total_count,
+        "unique_users": users.count(),
+        "window_count": sum(by_action_type.values()),
+        "window_unique_users": window_users.count(),
+        "by_action_type": dict(by_action_type),
+    }
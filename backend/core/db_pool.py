@@ -0,0 +1,51 @@
+"""
+Connection pool with live gauges for GET /system/db-pool.
+
+Same behaviour as SQLAlchemy's default async queue pool; it additionally
+times every checkout (waiting for a free connection, pre-ping and, for new
+connections, connecting) and counts pool timeouts.
+"""
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self._timeout,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": (
+                round(self.wait_seconds_total / self.checkouts * 1000, 3)
+                if self.checkouts
+                else 0
+            ),
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
@@ -0,0 +1,88 @@
+"""
+Password hashing off the event loop.
+
+bcrypt/argon2 hashing is CPU-bound and takes tens to hundreds of milliseconds,
+which would stall every other request if run inline in an async handler.
+Calls are shipped to a process pool sized to the number of cores; once
+`HASH_QUEUE_LIMIT` calls are in flight further requests are rejected with 503
+instead of piling up behind the pool.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from core.config import HASH_POOL_SIZE, HASH_QUEUE_LIMIT
+from core.utils import hash_pw, verify_pw
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = max(workers, 1)
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Password hashing queue is full, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.start()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, fn, *args)
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_pw, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_pw, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(workers=HASH_POOL_SIZE, queue_limit=HASH_QUEUE_LIMIT)
+
+
+async def hash_pw_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_pw_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
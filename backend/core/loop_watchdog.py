@@ -0,0 +1,172 @@
+"""
+Event-loop watchdog that catches blocking calls in the act.
+
+A heartbeat task stamps the time every LOOP_WATCHDOG_THRESHOLD_MS / 2. A
+daemon thread checks the stamp; when the loop has been stuck for longer than
+the threshold, it grabs the loop thread's current Python stack (the code that
+is blocking, not where it was awaited from), and the route of the request
+whose task is running. Once the loop recovers, the heartbeat fills in how
+long the stall really lasted.
+
+Recent stalls are kept in a ring buffer for GET /system/event-loop and are
+counted per route in /metrics.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from datetime import datetime
+
+from core.config import (
+    LOOP_WATCHDOG_ENABLED,
+    LOOP_WATCHDOG_HISTORY,
+    LOOP_WATCHDOG_THRESHOLD_MS,
+)
+
+MAX_STACK_FRAMES = 25
+
+
+class LoopWatchdog:
+    def __init__(self, enabled: bool, threshold: float, history: int):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.heartbeat_interval = threshold / 2
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.stalls_by_route: Counter[str] = Counter()
+        self.recent: deque[dict] = deque(maxlen=history)
+        self._beat = 0.0
+        self._open: dict | None = None
+        self._requests: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def track(self, scope):
+        """Remember which request the current task is serving"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._requests[task] = scope
+
+    def untrack(self):
+        task = asyncio.current_task()
+        if task is not None:
+            self._requests.pop(task, None)
+
+    def _route_of(self, task) -> str | None:
+        scope = self._requests.get(task) if task is not None else None
+        if scope is None:
+            return None
+        route = scope.get("route")
+        return f"{scope['method']} {getattr(route, 'path', None) or scope['path']}"
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.heartbeat_interval)
+            with self._lock:
+                if self._open is not None:
+                    blocked = time.monotonic() - self._open["_last_beat"] - self.heartbeat_interval
+                    self._open["blocked_ms"] = round(max(blocked, 0.0) * 1000, 1)
+                    self.stalled_seconds += max(blocked, 0.0)
+                    del self._open["_last_beat"]
+                    self._open = None
+
+    def _capture(self, last_beat: float, age: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = (
+            [line.rstrip() for line in traceback.format_stack(frame)[-MAX_STACK_FRAMES:]]
+            if frame is not None
+            else []
+        )
+        task = asyncio.current_task(self._loop)
+        route = self._route_of(task)
+        record = {
+            "at": datetime.utcnow().isoformat(),
+            "route": route,
+            "task": task.get_name() if task is not None else None,
+            "blocked_ms": round(age * 1000, 1),
+            "stack": stack,
+            "_last_beat": last_beat,
+        }
+        with self._lock:
+            self._open = record
+            self.recent.append(record)
+            self.stalls += 1
+            self.stalls_by_route[route or "background"] += 1
+
+    def _watch(self):
+        poll = self.heartbeat_interval / 2
+        while not self._stopping.wait(poll):
+            last_beat = self._beat
+            age = time.monotonic() - last_beat
+            # Between beats the loop may legitimately idle for one interval
+            if age > self.heartbeat_interval + self.threshold and self._open is None:
+                self._capture(last_beat, age - self.heartbeat_interval)
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = [
+                {k: v for k, v in record.items() if not k.startswith("_")}
+                for record in reversed(self.recent)
+            ]
+            return {
+                "enabled": self.enabled,
+                "threshold_ms": round(self.threshold * 1000, 1),
+                "stalls": self.stalls,
+                "stalled_ms_total": round(self.stalled_seconds * 1000, 1),
+                "stalls_by_route": dict(self.stalls_by_route.most_common()),
+                "recent": recent,
+            }
+
+
+loop_watchdog = LoopWatchdog(
+    enabled=LOOP_WATCHDOG_ENABLED,
+    threshold=LOOP_WATCHDOG_THRESHOLD_MS / 1000,
+    history=LOOP_WATCHDOG_HISTORY,
+)
+
+
+class LoopWatchdogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not loop_watchdog.enabled:
+            await self.app(scope, receive, send)
+            return
+        loop_watchdog.track(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_watchdog.untrack()
@@ -0,0 +1,301 @@
+"""
+Prometheus metrics served at GET /metrics (text exposition format).
+
+Covers per-route request counts and latency histograms, in-flight requests,
+event-loop lag and stalls (core/loop_watchdog.py), database pool gauges and
+user cache hit ratio. The hot path
+only bumps preallocated bucket counters: one list per (method, route, status
+class), created on the first request for that route, so a request costs a
+tuple key, a dict lookup and a bisect. Labels and cumulative buckets are only
+built when /metrics is scraped.
+
+With several uvicorn workers, set METRICS_MULTIPROC_DIR to a directory shared
+by all of them (and empty it before starting the server). Each worker writes
+a JSON snapshot of its counters there every METRICS_SNAPSHOT_SECONDS, and a
+scrape of any worker sums the counters of every snapshot. Gauges are reported
+per worker (`worker` label) and only for workers whose snapshot is recent.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+
+from core.config import (
+    LOOP_LAG_INTERVAL,
+    METRICS_ENABLED,
+    METRICS_MULTIPROC_DIR,
+    METRICS_SNAPSHOT_SECONDS,
+)
+from core.loop_watchdog import loop_watchdog
+from core.user_cache import user_cache
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+STATUS_CLASSES = ("0xx", "1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+
+
+def _histogram_lines(name: str, buckets, counts, labels: str = "") -> list[str]:
+    """`counts` holds one slot per bucket, one for +Inf, then the sum"""
+    prefix = f"{labels}," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    cumulative += counts[len(buckets)]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {counts[-1]}")
+    lines.append(f"{name}_count{suffix} {cumulative}")
+    return lines
+
+
+def _add(target: list, source: list):
+    for i, value in enumerate(source):
+        target[i] += value
+
+
+class Metrics:
+    def __init__(
+        self,
+        enabled: bool,
+        multiproc_dir: str,
+        snapshot_interval: float,
+        lag_interval: float,
+    ):
+        self.enabled = enabled
+        self.multiproc_dir = multiproc_dir
+        self.snapshot_interval = snapshot_interval
+        self.lag_interval = lag_interval
+        self.requests: dict[tuple[str, str, str], list] = {}
+        self.in_flight = 0
+        self.lag = [0] * (len(LAG_BUCKETS) + 2)
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self._tasks: list[asyncio.Task] = []
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, STATUS_CLASSES[status // 100] if status < 600 else "5xx")
+        counts = self.requests.get(key)
+        if counts is None:
+            counts = self.requests[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        counts[-1] += seconds
+
+    def observe_lag(self, seconds: float):
+        self.lag[bisect_left(LAG_BUCKETS, seconds)] += 1
+        self.lag[-1] += seconds
+        self.lag_last = seconds
+        self.lag_max = max(self.lag_max, seconds)
+
+    async def _sample_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            self.observe_lag(max(0.0, loop.time() - started - self.lag_interval))
+
+    def _gauges(self) -> dict:
+        pool = engine.pool.stats()
+        return {
+            "http_requests_in_flight": self.in_flight,
+            "event_loop_lag_last_seconds": self.lag_last,
+            "event_loop_lag_max_seconds": self.lag_max,
+            "db_pool_size": pool["pool_size"],
+            "db_pool_checked_out": pool["checked_out"],
+            "db_pool_checked_in": pool["checked_in"],
+            "db_pool_overflow": pool["overflow"],
+        }
+
+    def _counters(self) -> dict:
+        return {
+            "db_pool_checkouts_total": engine.pool.checkouts,
+            "db_pool_timeouts_total": engine.pool.timeouts,
+            "db_pool_wait_seconds_total": engine.pool.wait_seconds_total,
+            "user_cache_hits_total": user_cache.hits,
+            "user_cache_misses_total": user_cache.misses,
+            "user_cache_evictions_total": user_cache.evictions,
+            "event_loop_stalled_seconds_total": loop_watchdog.stalled_seconds,
+        }
+
+    def snapshot(self, final: bool = False) -> dict:
+        return {
+            "pid": os.getpid(),
+            "written_at": time.time(),
+            "requests": [[*key, counts] for key, counts in self.requests.items()],
+            "lag": self.lag,
+            "counters": self._counters(),
+            "stalls": dict(loop_watchdog.stalls_by_route),
+            "gauges": None if final else self._gauges(),
+        }
+
+    def write_snapshot(self, final: bool = False):
+        path = os.path.join(self.multiproc_dir, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.snapshot(final), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_snapshots(self) -> list[dict]:
+        if not self.multiproc_dir:
+            return [self.snapshot()]
+        self.write_snapshot()
+        snapshots = []
+        for filename in os.listdir(self.multiproc_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable metrics snapshot %s", filename)
+        return snapshots
+
+    async def _write_snapshots(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                self.write_snapshot()
+            except OSError:
+                logger.exception("Could not write metrics snapshot")
+
+    def start(self):
+        if not self.enabled or self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._sample_lag()))
+        if self.multiproc_dir:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+            self._tasks.append(asyncio.create_task(self._write_snapshots()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self.enabled and self.multiproc_dir:
+            # Keep this worker's counters in the totals, drop its gauges
+            self.write_snapshot(final=True)
+
+    def render(self) -> str:
+        snapshots = self._read_snapshots()
+        requests: dict[tuple, list] = {}
+        lag = [0] * (len(LAG_BUCKETS) + 2)
+        counters: dict[str, float] = {}
+        stalls: dict[str, int] = {}
+        gauges: dict[str, list[tuple[int, float]]] = {}
+        stale_before = time.time() - 3 * self.snapshot_interval
+        for snap in snapshots:
+            for method, route, status, counts in snap["requests"]:
+                key = (method, route, status)
+                if key in requests:
+                    _add(requests[key], counts)
+                else:
+                    requests[key] = list(counts)
+            _add(lag, snap["lag"])
+            for name, value in snap["counters"].items():
+                counters[name] = counters.get(name, 0) + value
+            for route, count in snap.get("stalls", {}).items():
+                stalls[route] = stalls.get(route, 0) + count
+            if snap["gauges"] and (
+                snap["pid"] == os.getpid() or snap["written_at"] >= stale_before
+            ):
+                for name, value in snap["gauges"].items():
+                    gauges.setdefault(name, []).append((snap["pid"], value))
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by route template and status class.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), counts in sorted(requests.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines.append(f"http_requests_total{{{labels}}} {sum(counts[:-1])}")
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route template and status class.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), counts in sorted(requests.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines += _histogram_lines("http_request_duration_seconds", LATENCY_BUCKETS, counts, labels)
+
+        lines += [
+            "# HELP event_loop_lag_seconds Delay of the loop-lag probe beyond its scheduled wakeup.",
+            "# TYPE event_loop_lag_seconds histogram",
+        ]
+        lines += _histogram_lines("event_loop_lag_seconds", LAG_BUCKETS, lag)
+
+        lines += [
+            "# HELP event_loop_stalls_total Loop stalls over the watchdog threshold, by route.",
+            "# TYPE event_loop_stalls_total counter",
+        ]
+        for route, count in sorted(stalls.items()):
+            lines.append(f"event_loop_stalls_total{{{_labels(route=route)}}} {count}")
+
+        for name, value in counters.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        lookups = counters["user_cache_hits_total"] + counters["user_cache_misses_total"]
+        lines.append("# TYPE user_cache_hit_ratio gauge")
+        lines.append(
+            f"user_cache_hit_ratio {counters['user_cache_hits_total'] / lookups if lookups else 0.0}"
+        )
+
+        for name, values in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            for pid, value in sorted(values):
+                lines.append(f"{name}{{{_labels(worker=pid)}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics(
+    enabled=METRICS_ENABLED,
+    multiproc_dir=METRICS_MULTIPROC_DIR,
+    snapshot_interval=METRICS_SNAPSHOT_SECONDS,
+    lag_interval=LOOP_LAG_INTERVAL,
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        metrics.in_flight += 1
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", None) or "unmatched",
+                status,
+                time.perf_counter() - started,
+            )
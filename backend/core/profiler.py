@@ -0,0 +1,258 @@
+"""
+On-demand request profiler.
+
+An administrator can profile a single request by sending `X-Profile: 1` (or
+adding `?profile=1`). With PROFILE_SAMPLE_RATE = N, one in every N requests
+per route is also profiled: `sample_route`, an app-level dependency, counts
+requests by the route template once routing has resolved it, so sampled
+profiles start at the route's dependencies rather than at the middleware.
+Requests that are not profiled only pay a header scan and a counter bump, and
+with REQUEST_PROFILER_ENABLED off (the default) neither the middleware nor
+the dependency is installed. A profiling request whose token carries a non-admin
+role claim is turned away after the signature check, without a user lookup.
+
+While a request is profiled, a sampling thread reads the event-loop thread's
+stack every PROFILE_INTERVAL_MS. If the request's task is running, the
+sample is that stack. If the task is suspended (waiting on the database or
+on other tasks), the sample is the task's await chain under `(awaiting)`, so
+I/O waits show up as well as CPU time. Samples are stored as folded stacks
+(`frame;frame;frame microseconds`, weighted by the wall time each sample
+covers), which flamegraph.pl and speedscope read directly.
+
+Each profile is kept next to the request's SQL timings in a ring buffer. The
+`X-Profile-Id` response header names it, and GET /system/profiles serves it.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+
+from fastapi import HTTPException, Request
+
+from core.config import (
+    PROFILE_HISTORY,
+    PROFILE_INTERVAL_MS,
+    PROFILE_SAMPLE_RATE,
+    REQUEST_PROFILER_ENABLED,
+)
+from core.query_stats import current_request_stats
+from core.security import get_current_user, get_payload
+from database import AsyncSessionLocal
+from schemas.auth import UserRole
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold_frames(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _fold_awaits(task) -> str:
+    labels = ["(awaiting)"]
+    coro = task.get_coro()
+    try:
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            labels.append(_label(frame.f_code))
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    except (AttributeError, ValueError):
+        # The chain changed under us; keep what was read so far
+        pass
+    return ";".join(labels)
+
+
+class Sampler(threading.Thread):
+    def __init__(self, task: asyncio.Task, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.task = task
+        self.loop = task.get_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self.count = 0
+        self._stopping = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stopping.wait(self.interval):
+            if asyncio.current_task(self.loop) is self.task:
+                stack = _fold_frames(sys._current_frames().get(self.loop_thread_id))
+            else:
+                stack = _fold_awaits(self.task)
+            # Weighted by wall time: a loop thread holding the GIL delays samples
+            now = time.perf_counter()
+            self.samples[stack] += round((now - last) * 1_000_000)
+            self.count += 1
+            last = now
+
+    def finish(self):
+        self._stopping.set()
+        self.join()
+
+
+class RequestProfiler:
+    def __init__(self, enabled: bool, sample_rate: int, interval: float, history: int):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.profiles: deque[dict] = deque(maxlen=history)
+        self._route_counts: Counter[str] = Counter()
+
+    def should_sample(self, route: str) -> bool:
+        if self.sample_rate <= 0:
+            return False
+        self._route_counts[route] += 1
+        return self._route_counts[route] % self.sample_rate == 0
+
+    def store(self, profile: dict):
+        self.profiles.append(profile)
+
+    def get(self, profile_id: str) -> dict | None:
+        return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": round(self.interval * 1000, 3),
+            "profiles": [
+                {k: v for k, v in p.items() if k != "folded"}
+                for p in reversed(self.profiles)
+            ],
+        }
+
+
+request_profiler = RequestProfiler(
+    enabled=REQUEST_PROFILER_ENABLED,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    interval=PROFILE_INTERVAL_MS / 1000,
+    history=PROFILE_HISTORY,
+)
+
+
+PROFILE_KEY = "profile"
+
+
+class ProfileRun:
+    def __init__(self, trigger: str, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.sampler = Sampler(asyncio.current_task(), interval)
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+
+def _header(scope, name: bytes) -> bytes | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _requested(scope) -> bool:
+    return _header(scope, b"x-profile") in (b"1", b"true") or b"profile=1" in scope.get(
+        "query_string", b""
+    )
+
+
+async def _is_admin(scope) -> bool:
+    auth = _header(scope, b"authorization")
+    if not auth or not auth.lower().startswith(b"bearer "):
+        return False
+    token = auth[7:].decode()
+    try:
+        role = get_payload(token).get("role")
+    except HTTPException:
+        return False
+    if role is not None and role != UserRole.ADMIN.value:
+        return False
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await get_current_user(token, db, allow_claims=True)
+    except HTTPException:
+        return False
+    return user.active and user.role == UserRole.ADMIN.value
+
+
+async def sample_route(request: Request):
+    scope = request.scope
+    # None means the middleware is watching this request but nothing profiles it yet
+    if scope.get(PROFILE_KEY, False) is not None:
+        return
+    route = scope.get("route")
+    if route is not None and request_profiler.should_sample(
+        f"{scope['method']} {route.path}"
+    ):
+        scope[PROFILE_KEY] = ProfileRun("sampled", request_profiler.interval)
+
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if _requested(scope) and await _is_admin(scope):
+            scope[PROFILE_KEY] = ProfileRun("requested", request_profiler.interval)
+        elif request_profiler.sample_rate > 0:
+            # sample_route decides once the route is known
+            scope[PROFILE_KEY] = None
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message):
+            run = scope.get(PROFILE_KEY)
+            if message["type"] == "http.response.start" and run is not None:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", run.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            run = scope.get(PROFILE_KEY)
+            if run is not None:
+                self._store(scope, run)
+
+    @staticmethod
+    def _store(scope, run: ProfileRun):
+        run.sampler.finish()
+        duration = time.perf_counter() - run.started
+        route = scope.get("route")
+        sql = current_request_stats()
+        request_profiler.store(
+            {
+                "id": run.id,
+                "at": datetime.utcnow().isoformat(),
+                "route": f"{scope['method']} {getattr(route, 'path', None) or scope['path']}",
+                "trigger": run.trigger,
+                "duration_ms": round(duration * 1000, 2),
+                "samples": run.sampler.count,
+                "sql": {
+                    "statements": sql.statements,
+                    "db_ms": round(sql.db_seconds * 1000, 2),
+                    "rows": sql.rows,
+                }
+                if sql is not None
+                else None,
+                "folded": "\n".join(
+                    f"{stack} {us}" for stack, us in run.sampler.samples.most_common()
+                ),
+            }
+        )
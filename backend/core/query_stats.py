@@ -0,0 +1,198 @@
+"""
+Per-request SQL instrumentation.
+
+Engine events count the statements, database time and rows (returned or
+affected) of every request. `QueryStatsMiddleware` reports them in a
+`Server-Timing` header, e.g. `db;dur=4.2;desc="5 queries, 12 rows"`, and
+aggregates them per route for GET /system/query-stats.
+
+Routes can declare a query budget with `dependencies=[query_budget(n)]`.
+Requests over budget are logged and counted; with QUERY_BUDGET_STRICT (test
+mode) they fail with `QueryBudgetExceeded` instead, so N+1 regressions break
+the run that introduced them.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import QUERY_BUDGET_STRICT, QUERY_STATS_ENABLED
+
+logger = logging.getLogger(__name__)
+
+START_KEY = "query_stats_start"
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestQueryStats:
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.budget: int | None = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.statements > self.budget
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.statements} queries, {self.rows} rows", '
+            f"app;dur={total_seconds * 1000:.2f}"
+        )
+
+
+_current: ContextVar[RequestQueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_request_stats() -> RequestQueryStats | None:
+    return _current.get()
+
+
+def current_route() -> str | None:
+    stats = _current.get()
+    return _route_name(stats.scope) if stats is not None and stats.scope else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault(START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get(START_KEY):
+        return
+    stats.db_seconds += time.perf_counter() - conn.info[START_KEY].pop()
+    stats.statements += 1
+    rows = cursor.rowcount
+    if rows < 0:
+        # asyncpg buffers the whole result during execute, so it is countable here
+        rows = len(getattr(cursor, "_rows", ()))
+    stats.rows += rows
+
+
+class RouteQueryStats:
+    """Totals per route template, since process start"""
+
+    def __init__(self, enabled: bool, strict: bool):
+        self.enabled = enabled
+        self.strict = strict
+        self._routes: dict[str, dict] = {}
+
+    def record(self, route: str, stats: RequestQueryStats):
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = {
+                "requests": 0,
+                "statements": 0,
+                "max_statements": 0,
+                "db_seconds": 0.0,
+                "rows": 0,
+                "budget": None,
+                "over_budget": 0,
+            }
+        entry["requests"] += 1
+        entry["statements"] += stats.statements
+        entry["max_statements"] = max(entry["max_statements"], stats.statements)
+        entry["db_seconds"] += stats.db_seconds
+        entry["rows"] += stats.rows
+        if stats.budget is not None:
+            entry["budget"] = stats.budget
+        if stats.over_budget:
+            entry["over_budget"] += 1
+
+    def reset(self):
+        self._routes.clear()
+
+    def stats(self) -> dict:
+        routes = []
+        for route, entry in self._routes.items():
+            requests = entry["requests"]
+            routes.append(
+                {
+                    "route": route,
+                    "requests": requests,
+                    "statements_avg": round(entry["statements"] / requests, 2),
+                    "statements_max": entry["max_statements"],
+                    "db_ms_avg": round(entry["db_seconds"] / requests * 1000, 3),
+                    "rows_avg": round(entry["rows"] / requests, 1),
+                    "budget": entry["budget"],
+                    "over_budget": entry["over_budget"],
+                }
+            )
+        routes.sort(key=lambda r: r["statements_avg"] * r["requests"], reverse=True)
+        return {"enabled": self.enabled, "strict": self.strict, "routes": routes}
+
+
+query_stats = RouteQueryStats(enabled=QUERY_STATS_ENABLED, strict=QUERY_BUDGET_STRICT)
+
+
+class QueryBudget:
+    def __init__(self, max_statements: int):
+        self.max_statements = max_statements
+
+    async def __call__(self):
+        # async so FastAPI runs it on the loop rather than handing it to the threadpool
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = self.max_statements
+
+
+def query_budget(max_statements: int):
+    """Route dependency declaring the most SQL statements a request may issue"""
+    return Depends(QueryBudget(max_statements))
+
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', None) or 'unmatched'}"
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not query_stats.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                if stats.over_budget:
+                    detail = (
+                        f"{_route_name(scope)} issued {stats.statements} SQL statements "
+                        f"(budget {stats.budget})"
+                    )
+                    if query_stats.strict:
+                        raise QueryBudgetExceeded(detail)
+                    logger.warning(detail)
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (
+                        b"server-timing",
+                        stats.server_timing(time.perf_counter() - started).encode(),
+                    )
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            query_stats.record(_route_name(scope), stats)
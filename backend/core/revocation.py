@@ -0,0 +1,201 @@
+"""
+Revocation registry for locked, deleted and re-versioned users.
+
+Every worker keeps the set of revoked user ids in memory so the bearer
+dependency can reject them in O(1) without reading the `users` row. The set
+is loaded at startup and then kept current by tailing the append-only
+`user_revocation_events` table past a watermark (the highest applied `seq`), so
+changes made by other workers are picked up within REVOCATION_REFRESH_SECONDS.
+
+`seq` is handed out at insert time, not at commit, so a transaction holding a
+lower seq can commit after a higher one was read. Seqs skipped over by the
+watermark are kept as gaps and re-queried on every refresh until they show up
+or REVOCATION_GAP_SECONDS pass (a rolled-back insert leaves a permanent gap).
+Lock and unlock are applied only if newer than the last one seen for the
+user, so a late event never undoes a later change.
+"""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import REVOCATION_GAP_SECONDS, REVOCATION_REFRESH_SECONDS
+from core.token_versions import token_versions
+from core.user_cache import user_cache
+from database import AsyncSessionLocal
+from models import User, UserRevocationEvent
+
+logger = logging.getLogger(__name__)
+
+REFRESH_BATCH_SIZE = 1000
+MAX_GAPS = 10000
+
+
+class RevocationRegistry:
+    def __init__(self, refresh_interval: float, gap_seconds: float):
+        self.refresh_interval = refresh_interval
+        self.gap_seconds = gap_seconds
+        self.revoked: set[str] = set()
+        self.watermark = 0
+        self.gaps: dict[int, float] = {}
+        self.late_events = 0
+        self._lock_seq: dict[str, int] = {}
+        self.loaded = False
+        self.refreshes = 0
+        self._task: asyncio.Task | None = None
+
+    def is_revoked(self, user_id) -> bool:
+        return str(user_id) in self.revoked
+
+    def apply(self, user_id, event: str, token_version: int | None = None, seq: int | None = None):
+        key = str(user_id)
+        if event in ("lock", "unlock") and seq is not None:
+            if seq < self._lock_seq.get(key, 0):
+                # A late event; the newer lock/unlock already applied wins
+                event = None
+            else:
+                self._lock_seq[key] = seq
+        if event in ("lock", "delete"):
+            self.revoked.add(key)
+        elif event == "unlock":
+            self.revoked.discard(key)
+        if event == "delete":
+            token_versions.revoke_user(key)
+        elif token_version is not None:
+            token_versions.observe(key, token_version)
+        user_cache.invalidate(key)
+
+    async def load(self):
+        async with AsyncSessionLocal() as session:
+            # Read the watermark first: events racing with the snapshot are
+            # replayed by the next refresh, and applying them twice is harmless.
+            result = await session.execute(select(func.max(UserRevocationEvent.seq)))
+            watermark = result.scalar() or 0
+            # Seqs below the watermark whose transactions have not committed yet
+            result = await session.execute(
+                select(UserRevocationEvent.seq).where(
+                    UserRevocationEvent.seq > watermark - REFRESH_BATCH_SIZE
+                )
+            )
+            present = set(result.scalars())
+
+            result = await session.execute(select(User.id).where(User.active.is_(False)))
+            revoked = {str(user_id) for user_id in result.scalars()}
+
+            result = await session.execute(
+                select(UserRevocationEvent.user_id)
+                .where(UserRevocationEvent.event == "delete")
+                .distinct()
+            )
+            deleted = {str(user_id) for user_id in result.scalars()}
+
+            result = await session.execute(
+                select(User.id, User.token_version).where(User.token_version > 0)
+            )
+            versions = result.all()
+
+        self.revoked = revoked | deleted
+        for user_id in deleted:
+            token_versions.revoke_user(user_id)
+        for user_id, version in versions:
+            token_versions.observe(user_id, version)
+        self.watermark = watermark
+        deadline = time.monotonic() + self.gap_seconds
+        self.gaps = {
+            seq: deadline
+            for seq in range(max(watermark - REFRESH_BATCH_SIZE + 1, 1), watermark + 1)
+            if seq not in present
+        }
+        self.loaded = True
+
+    def _advance(self, seq: int):
+        deadline = time.monotonic() + self.gap_seconds
+        for missing in range(max(self.watermark + 1, seq - MAX_GAPS), seq):
+            self.gaps[missing] = deadline
+        self.watermark = seq
+
+    async def refresh(self):
+        async with AsyncSessionLocal() as session:
+            if self.gaps:
+                result = await session.execute(
+                    select(UserRevocationEvent)
+                    .where(UserRevocationEvent.seq.in_(list(self.gaps)))
+                    .order_by(UserRevocationEvent.seq)
+                )
+                for e in result.scalars():
+                    del self.gaps[e.seq]
+                    self.late_events += 1
+                    self.apply(e.user_id, e.event, e.token_version, e.seq)
+                now = time.monotonic()
+                self.gaps = {seq: d for seq, d in self.gaps.items() if d > now}
+
+            while True:
+                result = await session.execute(
+                    select(UserRevocationEvent)
+                    .where(UserRevocationEvent.seq > self.watermark)
+                    .order_by(UserRevocationEvent.seq)
+                    .limit(REFRESH_BATCH_SIZE)
+                )
+                events = result.scalars().all()
+                for e in events:
+                    self.apply(e.user_id, e.event, e.token_version, e.seq)
+                    self._advance(e.seq)
+                if len(events) < REFRESH_BATCH_SIZE:
+                    break
+        self.refreshes += 1
+
+    async def _run(self):
+        while True:
+            try:
+                if self.loaded:
+                    await self.refresh()
+                else:
+                    await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Revocation registry refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "revoked_users": len(self.revoked),
+            "tracked_token_versions": len(token_versions),
+            "watermark": self.watermark,
+            "pending_gaps": len(self.gaps),
+            "late_events": self.late_events,
+            "refreshes": self.refreshes,
+            "refresh_interval_seconds": self.refresh_interval,
+        }
+
+
+revocation_registry = RevocationRegistry(
+    refresh_interval=REVOCATION_REFRESH_SECONDS, gap_seconds=REVOCATION_GAP_SECONDS
+)
+
+
+async def record_revocation(
+    db: AsyncSession, user_id, event: str, token_version: int | None = None
+):
+    """Queue a revocation event in the caller's transaction"""
+    await db.execute(
+        insert(UserRevocationEvent).values(
+            user_id=user_id, event=event, token_version=token_version
+        )
+    )
@@ -5,14 +5,19 @@ from fastapi import HTTPException
 from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.audit import audit_writer
 from core.config import (
     ACCESS_TOKEN_EXPIRES,
     ALGORITHM,
     REFRESH_TOKEN_EXPIRES,
     SECRET_KEY,
+    TOKEN_EMBED_CLAIMS,
 )
-from core.utils import verify_pw
-from models import AuditLog, User
+from core.hashing import verify_pw_async
+from core.revocation import revocation_registry
+from core.token_versions import token_versions
+from core.user_cache import user_cache
+from models import User
 from models.citizen import Citizen
 from schemas.auth import AuditLogForm, UserInfor, UserRole
 
@@ -32,12 +37,29 @@ async def authenticate_user(
     if not user.active:
         return None
 
-    if verify_pw(password, user.password_hash):
+    if await verify_pw_async(password, user.password_hash):
         return str(user.id)
     return None
 
 
-def create_token(user_id: str, token_type: str, expires_delta) -> str:
+CLAIM_KEYS = ("username", "role", "scope_id", "ver")
+
+
+def token_claims(u: User) -> dict:
+    """Claims embedded in tokens when TOKEN_EMBED_CLAIMS is enabled"""
+    if not TOKEN_EMBED_CLAIMS:
+        return {}
+    return {
+        "username": u.username,
+        "role": u.role,
+        "scope_id": str(u.scope_id) if u.scope_id else "",
+        "ver": u.token_version or 0,
+    }
+
+
+def create_token(
+    user_id: str, token_type: str, expires_delta, claims: dict | None = None
+) -> str:
     exp = datetime.now(timezone.utc)
     if token_type == "access_token":
         exp = exp + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRES))
@@ -45,6 +67,8 @@ def create_token(user_id: str, token_type: str, expires_delta) -> str:
         exp = exp + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRES))
     # tạo token
     to_encode = {"id": user_id, "iat": datetime.now(timezone.utc), "exp": exp}
+    if claims:
+        to_encode.update(claims)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -60,12 +84,53 @@ def get_payload(token: str):
         raise HTTPException(status_code=401, detail="Invalid token: " + str(e))
 
 
-async def get_current_user(access_token: str, db: AsyncSession):
+def check_token_version(user_id: str, version) -> None:
+    if version is not None and token_versions.is_revoked(user_id, version):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+
+def user_from_claims(payload: dict) -> UserInfor | None:
+    if not all(key in payload for key in CLAIM_KEYS):
+        return None
+    return UserInfor(
+        id=payload["id"],
+        username=payload["username"],
+        role=UserRole(payload["role"]),
+        active=True,
+        scope_id=payload["scope_id"],
+    )
+
+
+async def get_current_user(
+    access_token: str, db: AsyncSession, allow_claims: bool = False
+):
+    """
+    Resolve the user behind an access token.
+
+    With `allow_claims` (ordinary reads) and TOKEN_EMBED_CLAIMS enabled, a
+    token carrying signed role/scope/version claims is trusted without a
+    database lookup, as long as its version has not been revoked.
+    """
     payload = get_payload(access_token)
     user_id = payload.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
 
+    if revocation_registry.is_revoked(user_id):
+        raise HTTPException(status_code=401, detail="User is inactive")
+
+    version = payload.get("ver")
+    check_token_version(user_id, version)
+    # Claims are only trusted once the registry knows who has been revoked
+    if allow_claims and TOKEN_EMBED_CLAIMS and revocation_registry.loaded:
+        claimed = user_from_claims(payload)
+        if claimed is not None:
+            return claimed
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     query = select(User).where(User.id == user_id)
     result = await db.execute(query)
     u = result.scalar_one_or_none()
@@ -76,13 +141,18 @@ async def get_current_user(access_token: str, db: AsyncSession):
     if not u.active:
         raise HTTPException(status_code=401, detail="User is inactive")
 
-    return UserInfor(
+    token_versions.observe(user_id, u.token_version or 0)
+    check_token_version(user_id, version)
+
+    user = UserInfor(
         id=u.id,
         username=u.username,
         role=UserRole(u.role),
         active=bool(u.active),
         scope_id=str(u.scope_id) if u.scope_id else "",
     )
+    user_cache.set(user_id, user)
+    return user
 
 
 def recreate_token(refresh_token: str) -> str:
@@ -90,26 +160,16 @@ def recreate_token(refresh_token: str) -> str:
     user_id = payload.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
+    if revocation_registry.is_revoked(user_id):
+        raise HTTPException(status_code=401, detail="User is inactive")
+    check_token_version(user_id, payload.get("ver"))
+    claims = {k: payload[k] for k in CLAIM_KEYS if k in payload}
     new_access_token = create_token(
-        user_id, "access_token", timedelta(minutes=ACCESS_TOKEN_EXPIRES)
+        user_id, "access_token", timedelta(minutes=ACCESS_TOKEN_EXPIRES), claims
     )
     return new_access_token
 
 
-async def save_audit_log(log: AuditLogForm, db: AsyncSession):
-    try:
-        audit_log = AuditLog(
-            user_id=log.user_id,
-            action=log.action,
-            entity_name=log.entity_name,
-            entity_id=log.entity_id,
-            before_state=log.before_state,
-            after_state=log.after_state,
-            timestamp=datetime.now(timezone.utc),
-        )
-        db.add(audit_log)
-        await db.commit()
-
-    except Exception as e:
-        # KHÔNG raise HTTPException trong background task
-        print("AUDIT LOG ERROR:", str(e))
+def save_audit_log(log: AuditLogForm) -> bool:
+    """Hand the record to the background audit writer; never blocks on I/O"""
+    return audit_writer.enqueue(log)
@@ -0,0 +1,251 @@
+"""
+Slow query log.
+
+Engine events time every statement; those slower than SLOW_QUERY_MS are
+logged and recorded, grouped by the fingerprint of their normalized SQL
+(literals, $n placeholders and IN lists collapsed), with count, total and
+max time, p50/p95/p99 over the latest durations, the routes that issued them
+and the parameters of the most recent occurrence. Parameters are kept only as
+far as they are safe to show: numbers, dates, UUIDs, booleans and NULLs as
+is, strings and bytes as their type and length (a password hash or token is
+just another string to a positional driver), and anything bound under a
+sensitive name as "***".
+
+With SLOW_QUERY_EXPLAIN, the first occurrence of each fingerprint is
+re-planned with `EXPLAIN (ANALYZE off, FORMAT JSON)` on a separate connection
+by a background task, so the plan is stored without executing the query
+again or touching the caller's transaction. GET /system/slow-queries serves
+the entries.
+"""
+import asyncio
+import datetime as dt
+import hashlib
+import logging
+import re
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from core.config import (
+    SLOW_QUERY_EXPLAIN,
+    SLOW_QUERY_MAX_FINGERPRINTS,
+    SLOW_QUERY_MS,
+)
+from core.query_stats import current_route
+
+logger = logging.getLogger(__name__)
+
+START_KEY = "slow_query_start"
+DURATION_SAMPLES = 1000
+MAX_PARAM_ITEMS = 10
+SENSITIVE_PARAM = re.compile(r"password|passwd|secret|token|hash|cccd", re.IGNORECASE)
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|(?<![:\w]):[A-Za-z_]\w*")
+_IN_LIST = re.compile(r"\bIN \((?:\?(?:::\w+)?, )*\?(?:::\w+)?\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _describe(value):
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    if isinstance(value, (Decimal, dt.date, dt.time, dt.timedelta, uuid.UUID)):
+        return str(value)
+    if isinstance(value, str):
+        return f"<str, {len(value)} chars>"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<bytes, {len(value)} bytes>"
+    if isinstance(value, (list, tuple)):
+        items = [_describe(v) for v in value[:MAX_PARAM_ITEMS]]
+        if len(value) > MAX_PARAM_ITEMS:
+            items.append(f"... ({len(value)} items)")
+        return items
+    return f"<{type(value).__name__}>"
+
+
+def normalize_params(parameters):
+    """Parameters reduced to what is safe to expose (see module docstring)"""
+    if isinstance(parameters, dict):
+        return {
+            k: "***" if SENSITIVE_PARAM.search(str(k)) else _describe(v)
+            for k, v in parameters.items()
+        }
+    return _describe(parameters)
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class SlowQueryLog:
+    def __init__(self, threshold: float, explain: bool, max_fingerprints: int):
+        self.threshold = threshold
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.entries: dict[str, dict] = {}
+        self.recorded = 0
+        self.dropped = 0
+        self._engine = None
+        self._explain_queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def attach(self, engine):
+        """Time every statement run through `engine`"""
+        self._engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(START_KEY, []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get(START_KEY):
+            return
+        duration = time.perf_counter() - conn.info[START_KEY].pop()
+        if duration >= self.threshold and not statement.lstrip().upper().startswith("EXPLAIN"):
+            self.record(statement, parameters, duration)
+
+    def record(self, statement: str, parameters, duration: float):
+        normalized = normalize(statement)
+        key = fingerprint(normalized)
+        route = current_route()
+        logger.warning(
+            "Slow query %s took %.1f ms (route %s): %.200s",
+            key, duration * 1000, route or "-", normalized,
+        )
+        entry = self.entries.get(key)
+        if entry is None:
+            if len(self.entries) >= self.max_fingerprints:
+                self.dropped += 1
+                return
+            entry = self.entries[key] = {
+                "fingerprint": key,
+                "statement": normalized,
+                "count": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "durations": deque(maxlen=DURATION_SAMPLES),
+                "routes": {},
+                "first_seen": datetime.utcnow().isoformat(),
+                "plan": None,
+            }
+            explainable = statement.lstrip().upper().startswith(EXPLAINABLE)
+            if self.explain and explainable and self._explain_queue is not None:
+                try:
+                    self._explain_queue.put_nowait((key, statement, parameters))
+                except asyncio.QueueFull:
+                    pass
+        entry["count"] += 1
+        entry["total_seconds"] += duration
+        entry["max_seconds"] = max(entry["max_seconds"], duration)
+        entry["durations"].append(duration)
+        route = route or "background"
+        entry["routes"][route] = entry["routes"].get(route, 0) + 1
+        entry["last_seen"] = datetime.utcnow().isoformat()
+        entry["last_sql"] = statement
+        entry["last_params"] = normalize_params(parameters)
+        self.recorded += 1
+
+    async def _run_explains(self):
+        while True:
+            key, statement, parameters = await self._explain_queue.get()
+            try:
+                async with self._engine.connect() as conn:
+                    result = await conn.exec_driver_sql(
+                        f"EXPLAIN (ANALYZE off, FORMAT JSON) {statement}", parameters
+                    )
+                    self.entries[key]["plan"] = result.scalar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if key in self.entries:
+                    self.entries[key]["plan"] = {"error": str(e)}
+
+    def start(self):
+        if not self.explain or self._task is not None:
+            return
+        self._explain_queue = asyncio.Queue(maxsize=100)
+        self._task = asyncio.create_task(self._run_explains())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._explain_queue = None
+
+    def _summary(self, entry: dict) -> dict:
+        ordered = sorted(entry["durations"])
+        return {
+            "fingerprint": entry["fingerprint"],
+            "statement": entry["statement"],
+            "count": entry["count"],
+            "total_ms": round(entry["total_seconds"] * 1000, 1),
+            "max_ms": round(entry["max_seconds"] * 1000, 1),
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 1),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 1),
+            "routes": entry["routes"],
+            "first_seen": entry["first_seen"],
+            "last_seen": entry["last_seen"],
+            "has_plan": entry["plan"] is not None,
+        }
+
+    def top(self, sort: str = "total_ms", limit: int = 50) -> dict:
+        summaries = sorted(
+            (self._summary(e) for e in self.entries.values()),
+            key=lambda s: s[sort],
+            reverse=True,
+        )
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "explain": self.explain,
+            "recorded": self.recorded,
+            "fingerprints": len(self.entries),
+            "dropped": self.dropped,
+            "entries": summaries[:limit],
+        }
+
+    def get(self, key: str) -> dict | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return {
+            **self._summary(entry),
+            "last_sql": entry["last_sql"],
+            "last_params": entry["last_params"],
+            "plan": entry["plan"],
+        }
+
+    def reset(self):
+        self.entries.clear()
+        self.recorded = 0
+        self.dropped = 0
+
+
+slow_query_log = SlowQueryLog(
+    threshold=SLOW_QUERY_MS / 1000,
+    explain=SLOW_QUERY_EXPLAIN,
+    max_fingerprints=SLOW_QUERY_MAX_FINGERPRINTS,
+)
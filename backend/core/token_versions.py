@@ -0,0 +1,33 @@
+"""
+Latest known `token_version` per user.
+
+Tokens issued in claims mode carry the user's `token_version` at issue time.
+Locking a user, changing their role/scope or resetting their password bumps
+the counter, which revokes every token carrying an older version. The map is
+only ever raised, so a stale observation can never un-revoke a token.
+"""
+import sys
+
+REVOKED = sys.maxsize
+
+
+class TokenVersionMap:
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+
+    def observe(self, user_id, version: int):
+        key = str(user_id)
+        if version > self._versions.get(key, 0):
+            self._versions[key] = version
+
+    def revoke_user(self, user_id):
+        self._versions[str(user_id)] = REVOKED
+
+    def is_revoked(self, user_id, version: int) -> bool:
+        return version < self._versions.get(str(user_id), 0)
+
+    def __len__(self):
+        return len(self._versions)
+
+
+token_versions = TokenVersionMap()
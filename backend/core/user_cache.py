@@ -0,0 +1,73 @@
+"""
+In-process cache of authenticated users, keyed by user id.
+
+Avoids the `SELECT ... FROM users` round trip that every protected endpoint
+would otherwise pay in `get_current_user`. Entries expire after a TTL and the
+least recently used entry is evicted once the cache is full. Routes that
+change a user row must call `invalidate`.
+"""
+import time
+from collections import OrderedDict
+
+from core.config import USER_CACHE_MAX_SIZE, USER_CACHE_TTL
+from schemas.auth import UserInfor
+
+
+class UserCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = max_size > 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, UserInfor]] = OrderedDict()
+
+    def get(self, user_id) -> UserInfor | None:
+        if not self.enabled:
+            return None
+        key = str(user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def set(self, user_id, user: UserInfor):
+        if not self.enabled:
+            return
+        key = str(user_id)
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id):
+        self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+user_cache = UserCache(max_size=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL)
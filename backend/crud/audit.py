@@ -0,0 +1,154 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.audit_format import replay
+from models import AuditLog, User
+
+
+async def reconstruct_states(
+    client: AsyncSession, log: AuditLog
+) -> tuple[dict | None, dict | None, bool]:
+    """
+    Full (before, after) state for one audit row, and whether the rebuilt
+    after state matches the stored hash.
+
+    Legacy rows still carry full copies. Compact rows are rebuilt by folding
+    every diff of the same entity up to and including this one.
+    """
+    if log.changes is None:
+        return log.before_state, log.after_state, True
+    if log.entity_id is None:
+        steps = replay([log])
+        return steps[-1]
+
+    result = await client.execute(
+        select(
+            AuditLog.changes,
+            AuditLog.state_hash,
+            AuditLog.before_state,
+            AuditLog.after_state,
+        )
+        .where(
+            AuditLog.entity_name == log.entity_name,
+            AuditLog.entity_id == log.entity_id,
+            tuple_(AuditLog.timestamp, AuditLog.id) <= tuple_(log.timestamp, log.id),
+        )
+        .order_by(AuditLog.timestamp, AuditLog.id)
+    )
+    steps = replay(result.all())
+    return steps[-1]
+
+
+def encode_cursor(log: AuditLog) -> str:
+    raw = f"{log.timestamp.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Raises ValueError for malformed cursors"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), UUID(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def after_cursor(cursor: str, ascending: bool = False):
+    """Condition selecting rows after `cursor` in (timestamp, id) order, newest first by default"""
+    timestamp, log_id = decode_cursor(cursor)
+    key = tuple_(AuditLog.timestamp, AuditLog.id)
+    return key > tuple_(timestamp, log_id) if ascending else key < tuple_(timestamp, log_id)
+
+
+async def estimate_count(client: AsyncSession, query) -> int:
+    """
+    Row count from planner statistics instead of scanning.
+
+    Unfiltered listings read `pg_class.reltuples`; filtered ones take the
+    planner's row estimate for the query.
+    """
+    if query.whereclause is None:
+        # A partitioned parent has no statistics of its own; sum its partitions
+        result = await client.execute(
+            text(
+                """
+                SELECT COALESCE(
+                    (SELECT sum(c.reltuples) FROM pg_inherits i
+                     JOIN pg_class c ON c.oid = i.inhrelid
+                     WHERE i.inhparent = 'audit_logs'::regclass AND c.reltuples > 0),
+                    (SELECT reltuples FROM pg_class WHERE oid = 'audit_logs'::regclass)
+                )::bigint
+                """
+            )
+        )
+        return max(result.scalar() or 0, 0)
+    compiled = query.compile(
+        dialect=client.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    conn = await client.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def get_entity_history(
+    client: AsyncSession,
+    entity_name: str,
+    entity_id: UUID,
+    cursor: str | None = None,
+    limit: int = 50,
+    reconstruct: bool = False,
+):
+    """
+    One entity's audit timeline, oldest first, served by ix_audit_logs_entity_timeline.
+
+    Returns (rows, states, next_cursor): rows are (AuditLog, username, role);
+    with `reconstruct`, states holds (before, after, verified) for each row,
+    rebuilt by folding the entity's diffs up to the end of the page.
+    """
+    timeline = (AuditLog.entity_name == entity_name, AuditLog.entity_id == entity_id)
+    query = (
+        select(AuditLog, User.username, User.role)
+        .outerjoin(User, AuditLog.user_id == User.id)
+        .where(*timeline)
+        .order_by(AuditLog.timestamp, AuditLog.id)
+        .limit(limit + 1)
+    )
+    if cursor:
+        query = query.where(after_cursor(cursor, ascending=True))
+    rows = (await client.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][0]) if has_more else None
+
+    states = None
+    if reconstruct and rows:
+        last = rows[-1][0]
+        history = (
+            await client.execute(
+                select(
+                    AuditLog.id,
+                    AuditLog.changes,
+                    AuditLog.state_hash,
+                    AuditLog.before_state,
+                    AuditLog.after_state,
+                )
+                .where(
+                    *timeline,
+                    tuple_(AuditLog.timestamp, AuditLog.id) <= tuple_(last.timestamp, last.id),
+                )
+                .order_by(AuditLog.timestamp, AuditLog.id)
+            )
+        ).all()
+        steps = dict(zip((entry.id for entry in history), replay(history)))
+        states = [steps[log.id] for log, _, _ in rows]
+    return rows, states, next_cursor
@@ -0,0 +1,41 @@
+"""
+Single round-trip writes.
+
+INSERT and UPDATE statements return the written row through RETURNING, so
+callers get the stored state (server defaults included) without a refresh or
+a follow-up SELECT. Rows come back as plain dicts, the same shape as
+`as_dict()`. Both helpers go through the ORM session, so audit capture still
+sees the statement and reuses the returned columns.
+"""
+from typing import Any, Dict
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def insert_returning(
+    session: AsyncSession, model, values: Dict[str, Any]
+) -> Dict[str, Any]:
+    stmt = insert(model).values(**values).returning(*model.__table__.columns)
+    result = await session.execute(stmt)
+    return dict(result.mappings().one())
+
+
+async def update_returning(
+    session: AsyncSession,
+    model,
+    id,
+    values: Dict[str, Any],
+    before: Any = None,
+) -> Dict[str, Any] | None:
+    """Update one row by primary key; None if it does not exist"""
+    stmt = (
+        update(model)
+        .where(model.id == id)
+        .values(**values)
+        .returning(*model.__table__.columns)
+        .execution_options(audit_before=before)
+    )
+    result = await session.execute(stmt)
+    row = result.mappings().first()
+    return dict(row) if row is not None else None
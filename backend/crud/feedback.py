@@ -4,6 +4,7 @@ from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from crud.base import insert_returning, update_returning
 from models.feedback import Feedback, FeedbackResponse
 from schemas.common import Category, Status
 from schemas.feedback import FBResponse, FeedBack, MergedFB
@@ -78,39 +79,47 @@ async def update_feedback(client: AsyncSession, feedback: FeedBack, feedback_id:
         else feedback.trang_thai
     )
 
-    stmt = (
-        update(Feedback).where(Feedback.id == feedback_id).values(status=status_value)
+    data = await update_returning(
+        client, Feedback, feedback_id, {"status": status_value}
+    )
+    if data is None:
+        return None
+    responses = await client.execute(
+        select(FeedbackResponse).filter(FeedbackResponse.feedback_id == feedback_id)
     )
-    await client.execute(stmt)
     await client.commit()
 
-    return await get_feedback_by_id(client, feedback_id)
+    data["feedback_responses"] = [r.as_dict() for r in responses.scalars()]
+    data["feedback_reporters"] = []
+    return data
 
 
 async def create_feedback_response(
     client: AsyncSession, fbresponse: FBResponse, feedback_id: str
 ):
-    query = select(Feedback).filter(Feedback.id == feedback_id)
+    query = select(Feedback.created_by_user_id).filter(Feedback.id == feedback_id)
     result = await client.execute(query)
-    feedback_obj = result.scalar_one_or_none()
+    feedback_row = result.first()
 
-    if not feedback_obj:
+    if not feedback_row:
         return None
 
-    created_by_user_id = feedback_obj.created_by_user_id
-
-    response = FeedbackResponse(
-        content=fbresponse.noi_dung,
-        agency=fbresponse.co_quan,
-        attachment_url=fbresponse.tep_dinh_kem_url,
-        feedback_id=feedback_id,
-        responded_at=datetime.datetime.utcnow(),
-        created_by_user_id=created_by_user_id,
+    created_by_user_id = feedback_row.created_by_user_id
+
+    response = await insert_returning(
+        client,
+        FeedbackResponse,
+        {
+            "content": fbresponse.noi_dung,
+            "agency": fbresponse.co_quan,
+            "attachment_url": fbresponse.tep_dinh_kem_url,
+            "feedback_id": feedback_id,
+            "responded_at": datetime.datetime.utcnow(),
+            "created_by_user_id": created_by_user_id,
+        },
     )
-    client.add(response)
     await client.commit()
-    await client.refresh(response)
-    return response.as_dict()
+    return response
 
 
 async def create_new_feedback(client: AsyncSession, posted_fb, user_id: str):
@@ -126,22 +135,23 @@ async def create_new_feedback(client: AsyncSession, posted_fb, user_id: str):
     if posted_fb.nguoi_phan_anh.nhankhau_id:
         scope_id = posted_fb.nguoi_phan_anh.nhankhau_id
 
-    new_feedback = Feedback(
-        status=Status.moi_ghi_nhan.value,
-        category=category_value,
-        content=posted_fb.noi_dung,
-        scope_id=scope_id,
-        created_by_user_id=created_by_user_id,
-        report_count=1,
-        created_at=datetime.datetime.utcnow(),
-        updated_at=datetime.datetime.utcnow(),
+    new_feedback = await insert_returning(
+        client,
+        Feedback,
+        {
+            "status": Status.moi_ghi_nhan.value,
+            "category": category_value,
+            "content": posted_fb.noi_dung,
+            "scope_id": scope_id,
+            "created_by_user_id": created_by_user_id,
+            "report_count": 1,
+            "created_at": datetime.datetime.utcnow(),
+            "updated_at": datetime.datetime.utcnow(),
+        },
     )
-
-    client.add(new_feedback)
     await client.commit()
-    await client.refresh(new_feedback)
 
-    return new_feedback.as_dict()
+    return new_feedback
 
 
 async def merge_feedbacks(client: AsyncSession, merged_fb: MergedFB):
@@ -159,19 +169,21 @@ async def merge_feedbacks(client: AsyncSession, merged_fb: MergedFB):
     parent_id = merged_fb.parent_id
 
     if parent_id is None:
-        new_parent = Feedback(
-            category=sub_fb.category,
-            scope_id=sub_fb.scope_id,
-            status=sub_fb.status,
-            content=sub_fb.content,
-            report_count=count,
-            created_by_user_id=sub_fb.created_by_user_id,
-            created_at=datetime.datetime.utcnow(),
-            updated_at=datetime.datetime.utcnow(),
+        new_parent = await insert_returning(
+            client,
+            Feedback,
+            {
+                "category": sub_fb.category,
+                "scope_id": sub_fb.scope_id,
+                "status": sub_fb.status,
+                "content": sub_fb.content,
+                "report_count": count,
+                "created_by_user_id": sub_fb.created_by_user_id,
+                "created_at": datetime.datetime.utcnow(),
+                "updated_at": datetime.datetime.utcnow(),
+            },
         )
-        client.add(new_parent)
-        await client.flush()
-        parent_id = new_parent.id
+        parent_id = new_parent["id"]
 
     stmt = (
         update(Feedback)
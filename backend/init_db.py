@@ -7,15 +7,20 @@ from passlib.context import CryptContext
 from sqlalchemy import (
     JSON,
     UUID,
+    BigInteger,
     Boolean,
     Column,
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     select,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, relationship
 
@@ -42,18 +47,60 @@ class User(Base):
     role = Column(String)
     scope_id = Column(String, nullable=True)
     active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True))
+    user_id = Column(UUID(as_uuid=True), index=True)
     action = Column(String)
+    action_type = Column(String(20), index=True)  # derived by core.audit.classify_action
     entity_name = Column(String)
     entity_id = Column(UUID(as_uuid=True))
     before_state = Column(JSON)
     after_state = Column(JSON)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # Compact format: field-level diff and hash of the full after state (core/audit_format.py)
+    changes = Column(JSONB, nullable=True)
+    state_hash = Column(String(64), nullable=True)
+    # Part of the primary key: audit_logs is range-partitioned by month on timestamp
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_entity_timeline", "entity_name", "entity_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class AuditLogDailyRollup(Base):
+    __tablename__ = "audit_log_daily_rollups"
+    day = Column(Date, primary_key=True)
+    action_type = Column(String(20), primary_key=True)
+    events = Column(BigInteger, nullable=False, default=0)
+
+
+class AuditLogDailyUsers(Base):
+    __tablename__ = "audit_log_daily_users"
+    day = Column(Date, primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+
+class UserRevocationEvent(Base):
+    __tablename__ = "user_revocation_events"
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    event = Column(String(20), nullable=False)  # lock, unlock, delete, version
+    token_version = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_user_revocation_events_delete",
+            "user_id",
+            postgresql_where=text("event = 'delete'"),
+        ),
+    )
 
 
 # ==========================================
@@ -122,6 +169,7 @@ class Citizen(Base):
     )
     full_name = Column(String(100), nullable=False)
     date_of_birth = Column(Date, nullable=False)
+    gender = Column(String(10), nullable=True)
     place_of_birth = Column(String(255))
     hometown = Column(String(255))
     ethnicity = Column(String(50))
@@ -145,6 +193,16 @@ class Citizen(Base):
         "Household", back_populates="members", foreign_keys=[household_id]
     )
 
+    __table_args__ = (
+        Index(
+            "ix_citizens_living_gender_date_of_birth",
+            "gender",
+            "date_of_birth",
+            "household_id",
+            postgresql_where=text("is_active AND NOT is_deceased"),
+        ),
+    )
+
 
 class MovementLog(Base):
     __tablename__ = "movement_logs"
@@ -182,6 +240,8 @@ class Feedback(Base):
     # Relations
     responses = relationship("FeedbackResponse", back_populates="feedback")
 
+    __table_args__ = (Index("ix_feedbacks_created_at_status", "created_at", "status"),)
+
 
 class FeedbackResponse(Base):
     __tablename__ = "feedback_responses"
@@ -200,6 +260,42 @@ class FeedbackResponse(Base):
 # ==========================================
 # Initialization Logic
 # ==========================================
+# Trigram indexes behind the audit log username/action search (needs pg_trgm)
+SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_users_username_lower_trgm"
+    " ON users USING gin (lower(username) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_action_lower_trgm"
+    " ON audit_logs USING gin (lower(action) gin_trgm_ops)",
+]
+
+
+# Months of audit_logs partitions created up front, starting with the current
+# one; the API's partition maintainer keeps later months created from then on
+AUDIT_PARTITION_MONTHS = 3
+
+
+async def create_audit_partitions(conn):
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit_logs'::regclass")
+    )
+    if result.first() is None:
+        print("audit_logs is not partitioned; run migrations/partition_audit_logs.sql.")
+        return
+    await conn.execute(
+        text("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT")
+    )
+    month = date.today().replace(day=1)
+    for _ in range(AUDIT_PARTITION_MONTHS):
+        following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        await conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS audit_logs_p{month:%Y%m} PARTITION OF audit_logs "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            )
+        )
+        month = following
+
+
 async def init_db():
     print(f"Connecting to {DATABASE_URL}...")
     engine = create_async_engine(DATABASE_URL, echo=True)
@@ -207,7 +303,11 @@ async def init_db():
     # 1. Tạo bảng
     async with engine.begin() as conn:
         print("Creating all tables from shared Base...")
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+        await create_audit_partitions(conn)
+        for ddl in SEARCH_INDEXES:
+            await conn.execute(text(ddl))
 
     # 2. Seed dữ liệu mẫu
     async with AsyncSession(engine) as session:
@@ -268,6 +368,7 @@ async def init_db():
                     household_id=household_id,  # Link tới hộ khẩu đã flush ở trên
                     full_name="Nguyễn Văn A",
                     date_of_birth=date(1980, 1, 1),
+                    gender="NAM",
                     place_of_birth="Hà Nội",
                     hometown="Nam Định",
                     ethnicity="Kinh",
@@ -287,6 +388,7 @@ async def init_db():
                     household_id=household_id,
                     full_name="Trần Thị B",
                     date_of_birth=date(1982, 5, 15),
+                    gender="NU",
                     place_of_birth="Hà Nam",
                     hometown="Hà Nam",
                     ethnicity="Kinh",
@@ -1,9 +1,56 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from core.audit import audit_writer
+from core.audit_partitions import partition_maintainer
+from core.config import METRICS_ALLOWED_HOSTS, REQUEST_PROFILER_ENABLED
+from core.hashing import password_hasher
+from core.loop_watchdog import LoopWatchdogMiddleware, loop_watchdog
+from core.metrics import MetricsMiddleware, metrics
+from core.profiler import ProfilerMiddleware, sample_route
+from core.query_stats import QueryStatsMiddleware
+from core.revocation import revocation_registry
+from core.slow_queries import slow_query_log
+from routers import (
+    auth,
+    feedback,
+    households,
+    logs,
+    residents,
+    roles,
+    statistics,
+    system,
+)
 
-from routers import auth, feedback, households, logs, residents, roles, statistics
 
-app = FastAPI(title="Citizen Management API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    password_hasher.start()
+    revocation_registry.start()
+    audit_writer.start()
+    partition_maintainer.start()
+    metrics.start()
+    loop_watchdog.start()
+    slow_query_log.start()
+    yield
+    await slow_query_log.stop()
+    await loop_watchdog.stop()
+    await metrics.stop()
+    await partition_maintainer.stop()
+    await audit_writer.stop()
+    await revocation_registry.stop()
+    password_hasher.shutdown()
+
+
+app = FastAPI(
+    title="Citizen Management API",
+    lifespan=lifespan,
+    # Sampled profiling is decided per route, after routing
+    dependencies=[Depends(sample_route)] if REQUEST_PROFILER_ENABLED else [],
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -12,7 +59,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
+# Inside QueryStatsMiddleware so profiles can include the request's SQL timings
+if REQUEST_PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(LoopWatchdogMiddleware)
 
 # Auth routes
 app.include_router(auth.router, prefix="/api/v1", tags=["Authentication"])
@@ -29,12 +83,27 @@ app.include_router(feedback.router, prefix="/api/v1", tags=["Feedback"])
 # Statistics routes
 app.include_router(statistics.router, prefix="/api/v1", tags=["Statistics"])
 
+# Internal diagnostics
+app.include_router(system.router, prefix="/api/v1", tags=["System"])
+
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "citizen-management"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    client = request.client.host if request.client else None
+    if not metrics.enabled or (
+        "*" not in METRICS_ALLOWED_HOSTS and client not in METRICS_ALLOWED_HOSTS
+    ):
+        return PlainTextResponse("Not Found", status_code=404)
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,9 @@
+-- Compact audit storage: field-level diff plus SHA-256 of the full after state.
+-- Existing rows are converted afterwards with `python -m migrations.compact_audit_logs`.
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS changes JSONB;
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS state_hash VARCHAR(64);
+
+-- The writer looks up each entity's earlier rows to decide whether to anchor
+-- a record; without this index every batch scans the whole table.
+CREATE INDEX IF NOT EXISTS ix_audit_logs_entity_timeline
+    ON audit_logs (entity_name, entity_id, timestamp);
@@ -0,0 +1,6 @@
+-- Per-entity timelines (GET /audit-logs/entity/{entity_name}/{entity_id}) and
+-- diff reconstruction seek on (entity_name, entity_id, timestamp).
+-- add_audit_log_compact_columns.sql already creates it; this is a no-op then.
+-- On the partitioned table this builds the index on every partition.
+CREATE INDEX IF NOT EXISTS ix_audit_logs_entity_timeline
+    ON audit_logs (entity_name, entity_id, timestamp);
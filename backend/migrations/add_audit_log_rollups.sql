@@ -0,0 +1,14 @@
+-- Daily rollups for GET /audit-logs/stats, maintained by the audit writer.
+-- Populate history afterwards with `python -m migrations.backfill_audit_rollups`.
+CREATE TABLE IF NOT EXISTS audit_log_daily_rollups (
+    day DATE NOT NULL,
+    action_type VARCHAR(20) NOT NULL,
+    events BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, action_type)
+);
+
+-- HyperLogLog registers (core/hll.py) of distinct acting users per day
+CREATE TABLE IF NOT EXISTS audit_log_daily_users (
+    day DATE PRIMARY KEY,
+    sketch BYTEA NOT NULL
+);
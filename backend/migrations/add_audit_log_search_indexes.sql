@@ -0,0 +1,36 @@
+-- Index-backed search for GET /audit-logs (prefix/substring on username and action)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username_lower_trgm
+    ON users USING gin (lower(username) gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_logs_action_lower_trgm
+    ON audit_logs USING gin (lower(action) gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_logs_user_id
+    ON audit_logs (user_id);
+
+-- Categorical action_type, set by the audit writer (core.audit.classify_action)
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS action_type VARCHAR(20);
+
+-- Backfill existing rows in batches, committing after each one
+DO $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    LOOP
+        UPDATE audit_logs SET action_type = CASE
+                WHEN lower(action) IN ('login', 'logout', 'failed_login') THEN 'security'
+                WHEN lower(action) IN ('backup', 'restore') THEN 'database'
+                WHEN lower(entity_name) IN ('user', 'account') THEN 'account'
+                WHEN lower(entity_name) IN ('role', 'permission') THEN 'permission'
+                WHEN lower(entity_name) = 'setting' THEN 'settings'
+                ELSE 'data'
+            END
+        WHERE id IN (SELECT id FROM audit_logs WHERE action_type IS NULL LIMIT 50000);
+        GET DIAGNOSTICS updated = ROW_COUNT;
+        EXIT WHEN updated = 0;
+        COMMIT;
+    END LOOP;
+END $$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_logs_action_type
+    ON audit_logs (action_type);
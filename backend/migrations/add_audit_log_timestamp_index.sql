@@ -0,0 +1,3 @@
+-- Keyset pagination for GET /audit-logs: ORDER BY timestamp DESC, id DESC seeks this index
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_logs_timestamp_id
+    ON audit_logs (timestamp, id);
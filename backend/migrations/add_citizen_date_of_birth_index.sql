@@ -0,0 +1,6 @@
+-- Age distributions (GET /statistics/residents/demographics) bucket living
+-- citizens by date_of_birth; household_id is included so the per-group
+-- breakdown can join households without visiting the citizens heap.
+CREATE INDEX IF NOT EXISTS ix_citizens_living_date_of_birth
+    ON citizens (date_of_birth, household_id)
+    WHERE is_active AND NOT is_deceased;
@@ -0,0 +1,10 @@
+-- Stored citizen gender (NAM / NU). Existing rows stay NULL until
+-- `python -m migrations.backfill_citizen_gender` fills them in.
+ALTER TABLE citizens ADD COLUMN IF NOT EXISTS gender VARCHAR(10);
+
+-- Demographics group living citizens by age bucket and gender; this index
+-- replaces ix_citizens_living_date_of_birth and keeps the counts index-only.
+CREATE INDEX IF NOT EXISTS ix_citizens_living_gender_date_of_birth
+    ON citizens (gender, date_of_birth, household_id)
+    WHERE is_active AND NOT is_deceased;
+DROP INDEX IF EXISTS ix_citizens_living_date_of_birth;
@@ -0,0 +1,4 @@
+-- Feedback trend buckets (GET /statistics/ward/feedback-trend) range-scan
+-- created_at; status is included so the resolved counts need no heap visits.
+CREATE INDEX IF NOT EXISTS ix_feedbacks_created_at_status
+    ON feedbacks (created_at, status);
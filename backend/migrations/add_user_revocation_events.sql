@@ -0,0 +1,11 @@
+-- Append-only revocation events consumed incrementally by every API worker
+CREATE TABLE IF NOT EXISTS user_revocation_events (
+    seq BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    event VARCHAR(20) NOT NULL,
+    token_version INTEGER,
+    created_at TIMESTAMP DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_user_revocation_events_delete
+    ON user_revocation_events (user_id) WHERE event = 'delete';
@@ -0,0 +1,2 @@
+-- Per-user token version used to revoke signed access/refresh tokens
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,91 @@
+"""
+Rebuild the daily audit rollups from audit_logs.
+
+Each day is recomputed from the source rows and replaces whatever the rollup
+tables hold, so the script is safe to re-run. It locks the rollup tables for
+the duration of each day's transaction: audit writers block on their upsert
+until the day is rebuilt, and events they had already written are counted
+exactly once.
+
+    python -m migrations.backfill_audit_rollups [--since 2024-01-01]
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.hll import HyperLogLog
+from database import AsyncSessionLocal, engine
+from models import AuditLog, AuditLogDailyRollup, AuditLogDailyUsers
+
+
+async def rebuild_day(day: date) -> int:
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    in_day = (AuditLog.timestamp >= start, AuditLog.timestamp < end)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text(
+                "LOCK TABLE audit_log_daily_rollups, audit_log_daily_users "
+                "IN SHARE ROW EXCLUSIVE MODE"
+            )
+        )
+        counts = (
+            await session.execute(
+                select(AuditLog.action_type, func.count())
+                .where(*in_day)
+                .group_by(AuditLog.action_type)
+            )
+        ).all()
+        sketch = HyperLogLog()
+        users = await session.stream(
+            select(AuditLog.user_id).where(*in_day, AuditLog.user_id.is_not(None)).distinct()
+        )
+        async for (user_id,) in users:
+            sketch.add(str(user_id))
+
+        await session.execute(delete(AuditLogDailyRollup).where(AuditLogDailyRollup.day == day))
+        if counts:
+            await session.execute(
+                pg_insert(AuditLogDailyRollup).values(
+                    [
+                        {"day": day, "action_type": action_type or "data", "events": events}
+                        for action_type, events in counts
+                    ]
+                )
+            )
+        await session.execute(
+            pg_insert(AuditLogDailyUsers)
+            .values(day=day, sketch=sketch.to_bytes())
+            .on_conflict_do_update(
+                index_elements=[AuditLogDailyUsers.day],
+                set_={"sketch": sketch.to_bytes()},
+            )
+        )
+        await session.commit()
+    return sum(events for _, events in counts)
+
+
+async def backfill(since: date | None):
+    async with AsyncSessionLocal() as session:
+        first = (await session.execute(select(func.min(AuditLog.timestamp)))).scalar()
+    if first is None:
+        print("audit_logs is empty.")
+        await engine.dispose()
+        return
+    day = max(first.date(), since) if since else first.date()
+    today = datetime.utcnow().date()
+    while day <= today:
+        events = await rebuild_day(day)
+        print(f"{day}: {events} events")
+        day += timedelta(days=1)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--since", type=date.fromisoformat)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.since))
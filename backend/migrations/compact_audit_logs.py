@@ -0,0 +1,91 @@
+"""
+Convert existing audit_logs rows to the compact diff format.
+
+Run after add_audit_log_compact_columns.sql. Rows are processed in chunks in
+primary-key order, each chunk in its own transaction, so the script can be
+interrupted and re-run: only rows with `changes IS NULL` are touched. The
+earliest row of each entity is anchored with its full state so history can
+still be rebuilt from the diffs alone.
+
+    python -m migrations.compact_audit_logs [--chunk-size 5000]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import and_, bindparam, exists, null, or_, select, update
+from sqlalchemy.orm import aliased
+
+from core.audit_format import compact
+from database import AsyncSessionLocal, engine
+from models import AuditLog
+
+table = AuditLog.__table__
+
+convert = (
+    update(table)
+    .where(table.c.id == bindparam("b_id"))
+    .values(
+        changes=bindparam("b_changes"),
+        state_hash=bindparam("b_hash"),
+        before_state=null(),
+        after_state=null(),
+    )
+)
+
+
+def chunk_query(last_id, chunk_size: int):
+    earlier = aliased(AuditLog)
+    has_history = exists().where(
+        earlier.entity_name == AuditLog.entity_name,
+        earlier.entity_id == AuditLog.entity_id,
+        or_(
+            earlier.timestamp < AuditLog.timestamp,
+            and_(earlier.timestamp == AuditLog.timestamp, earlier.id < AuditLog.id),
+        ),
+    )
+    query = (
+        select(
+            AuditLog.id,
+            AuditLog.before_state,
+            AuditLog.after_state,
+            has_history.label("has_history"),
+        )
+        .where(AuditLog.changes.is_(None))
+        .order_by(AuditLog.id)
+        .limit(chunk_size)
+    )
+    if last_id is not None:
+        query = query.where(AuditLog.id > last_id)
+    return query
+
+
+async def migrate(chunk_size: int):
+    converted = 0
+    last_id = None
+    started = time.perf_counter()
+    while True:
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(chunk_query(last_id, chunk_size))).all()
+            if not rows:
+                break
+            params = []
+            for row in rows:
+                changes, digest = compact(
+                    row.before_state, row.after_state, anchor=not row.has_history
+                )
+                params.append({"b_id": row.id, "b_changes": changes, "b_hash": digest})
+            await session.execute(convert, params)
+            await session.commit()
+        converted += len(rows)
+        last_id = rows[-1].id
+        print(f"converted {converted} rows ({time.perf_counter() - started:.1f}s)")
+    await engine.dispose()
+    print(f"Done: {converted} audit log rows converted.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.chunk_size))
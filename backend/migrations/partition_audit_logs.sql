@@ -0,0 +1,68 @@
+-- Convert audit_logs into a table range-partitioned by month on timestamp.
+-- Run in a maintenance window after the earlier audit_logs migrations; the
+-- API keeps future partitions created (core/audit_partitions.py) and
+-- audit_archive.py applies retention.
+BEGIN;
+
+ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned;
+ALTER INDEX IF EXISTS audit_logs_pkey RENAME TO audit_logs_unpartitioned_pkey;
+ALTER INDEX IF EXISTS ix_audit_logs_timestamp_id RENAME TO ix_audit_logs_unpartitioned_timestamp_id;
+ALTER INDEX IF EXISTS ix_audit_logs_user_id RENAME TO ix_audit_logs_unpartitioned_user_id;
+ALTER INDEX IF EXISTS ix_audit_logs_action_type RENAME TO ix_audit_logs_unpartitioned_action_type;
+ALTER INDEX IF EXISTS ix_audit_logs_action_lower_trgm RENAME TO ix_audit_logs_unpartitioned_action_lower_trgm;
+
+CREATE TABLE audit_logs (
+    id UUID NOT NULL,
+    user_id UUID,
+    action VARCHAR,
+    action_type VARCHAR(20),
+    entity_name VARCHAR,
+    entity_id UUID,
+    before_state JSON,
+    after_state JSON,
+    changes JSONB,
+    state_hash VARCHAR(64),
+    timestamp TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+-- One partition per month from the oldest row up to two months ahead
+DO $$
+DECLARE
+    month DATE := date_trunc('month', COALESCE(
+        (SELECT min(timestamp) FROM audit_logs_unpartitioned), now()))::date;
+BEGIN
+    WHILE month <= (date_trunc('month', now()) + interval '2 months')::date LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+            'audit_logs_p' || to_char(month, 'YYYYMM'), month, (month + interval '1 month')::date
+        );
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+INSERT INTO audit_logs
+    (id, user_id, action, action_type, entity_name, entity_id,
+     before_state, after_state, changes, state_hash, timestamp)
+SELECT id, user_id, action, action_type, entity_name, entity_id,
+       before_state, after_state, changes, state_hash, COALESCE(timestamp, to_timestamp(0))
+FROM audit_logs_unpartitioned;
+
+DO $$
+BEGIN
+    IF (SELECT count(*) FROM audit_logs) <> (SELECT count(*) FROM audit_logs_unpartitioned) THEN
+        RAISE EXCEPTION 'audit_logs row count mismatch after copy';
+    END IF;
+END $$;
+
+DROP TABLE audit_logs_unpartitioned;
+
+-- Indexes on the parent cascade to every current and future partition
+CREATE INDEX ix_audit_logs_timestamp_id ON audit_logs (timestamp, id);
+CREATE INDEX ix_audit_logs_user_id ON audit_logs (user_id);
+CREATE INDEX ix_audit_logs_action_type ON audit_logs (action_type);
+CREATE INDEX ix_audit_logs_action_lower_trgm ON audit_logs USING gin (lower(action) gin_trgm_ops);
+
+COMMIT;
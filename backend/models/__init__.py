@@ -1,5 +1,11 @@
 # Models module
-from models.user import User, AuditLog
+from models.user import (
+    User,
+    AuditLog,
+    AuditLogDailyRollup,
+    AuditLogDailyUsers,
+    UserRevocationEvent,
+)
 from models.household import Household
 from models.citizen import Citizen
 from models.movement_log import MovementLog
@@ -15,6 +21,9 @@ __all__ = [
     "Base",
     "User",
     "AuditLog",
+    "AuditLogDailyRollup",
+    "AuditLogDailyUsers",
+    "UserRevocationEvent",
     "Household",
     "Citizen",
     "MovementLog",
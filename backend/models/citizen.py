@@ -1,7 +1,7 @@
 import uuid
 
 from database import Base
-from sqlalchemy import UUID, Boolean, Column, Date, ForeignKey, String
+from sqlalchemy import UUID, Boolean, Column, Date, ForeignKey, Index, String, text
 from sqlalchemy.orm import relationship
 
 
@@ -12,6 +12,7 @@ class Citizen(Base):
     household_id = Column(UUID(as_uuid=True), ForeignKey("households.id"), nullable=True)
     full_name = Column(String(100), nullable=False)
     date_of_birth = Column(Date, nullable=False)
+    gender = Column(String(10), nullable=True)  # NAM / NU, see schemas.common.Gender
     place_of_birth = Column(String(255))
     hometown = Column(String(255))
     ethnicity = Column(String(50))
@@ -34,3 +35,13 @@ class Citizen(Base):
     household = relationship(
         "Household", back_populates="members", foreign_keys=[household_id]
     )
+
+    __table_args__ = (
+        Index(
+            "ix_citizens_living_gender_date_of_birth",
+            "gender",
+            "date_of_birth",
+            "household_id",
+            postgresql_where=text("is_active AND NOT is_deceased"),
+        ),
+    )
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 
 from database import Base
-from sqlalchemy import JSON, UUID, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import JSON, UUID, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 
@@ -25,6 +25,8 @@ class Feedback(Base):
     # Relations
     responses = relationship("FeedbackResponse", back_populates="feedback")
 
+    __table_args__ = (Index("ix_feedbacks_created_at_status", "created_at", "status"),)
+
     def as_dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
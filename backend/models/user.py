@@ -2,7 +2,20 @@ import uuid
 from datetime import datetime
 
 from database import Base
-from sqlalchemy import JSON, UUID, Boolean, Column, DateTime, String
+from sqlalchemy import (
+    JSON,
+    UUID,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 
 
 class User(Base):
@@ -13,15 +26,52 @@ class User(Base):
     role = Column(String)
     scope_id = Column(String, nullable=True)
     active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True))
+    user_id = Column(UUID(as_uuid=True), index=True)
     action = Column(String)
+    action_type = Column(String(20), index=True)  # derived by core.audit.classify_action
     entity_name = Column(String)
     entity_id = Column(UUID(as_uuid=True))
     before_state = Column(JSON)
     after_state = Column(JSON)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # Compact format: field-level diff and hash of the full after state (core/audit_format.py)
+    changes = Column(JSONB, nullable=True)
+    state_hash = Column(String(64), nullable=True)
+    # Part of the primary key: audit_logs is range-partitioned by month on timestamp
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_entity_timeline", "entity_name", "entity_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class UserRevocationEvent(Base):
+    """Append-only log of lock/unlock/delete/token-version changes, read by every worker"""
+    __tablename__ = "user_revocation_events"
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    event = Column(String(20), nullable=False)  # lock, unlock, delete, version
+    token_version = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AuditLogDailyRollup(Base):
+    """Per-day event counters by action_type, maintained by the audit writer"""
+    __tablename__ = "audit_log_daily_rollups"
+    day = Column(Date, primary_key=True)
+    action_type = Column(String(20), primary_key=True)
+    events = Column(BigInteger, nullable=False, default=0)
+
+
+class AuditLogDailyUsers(Base):
+    """Per-day HyperLogLog sketch of distinct acting users (core/hll.py)"""
+    __tablename__ = "audit_log_daily_users"
+    day = Column(Date, primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
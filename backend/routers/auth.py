@@ -3,32 +3,30 @@ from typing import Annotated
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Body,
     Depends,
     HTTPException,
     status,
 )
-from fastapi.encoders import jsonable_encoder
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth_bearer import JWTBearer, JWTBearerMe
 from core.config import ACCESS_TOKEN_EXPIRES, REFRESH_TOKEN_EXPIRES
+from core.hashing import hash_pw_async
+from core.revocation import record_revocation, revocation_registry
 from core.security import (
     authenticate_user,
     create_token,
     get_current_user,
     recreate_token,
-    save_audit_log,
+    token_claims,
 )
-from core.utils import hash_pw
 from database import get_db
 from models import User
 from schemas.auth import (
     AccessTokenResponse,
-    AuditLogForm,
     AuthRes,
     LoginRes,
     RefreshTokenRequest,
@@ -59,11 +57,14 @@ async def auth_check(request_data: ValidateRequest, db: AsyncSession = Depends(g
     )
 
 
-async def exist_user_checking(id: str, db: AsyncSession):
+async def exist_user_checking(id: str, db: AsyncSession) -> User:
+    # The loaded row doubles as the audit "before" state of the following write
     query = select(User).where(User.id == id)
     result = await db.execute(query)
-    if not result.scalar_one_or_none():
+    user = result.scalar_one_or_none()
+    if not user:
         raise HTTPException(status_code=404, detail="ID Not Found")
+    return user
 
 
 @router.post("/login", response_model=LoginRes, status_code=status.HTTP_200_OK)
@@ -82,17 +83,21 @@ async def login_for_access_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        query = select(User).where(User.id == id)
+        result = await db.execute(query)
+        data = result.scalar_one()
+
+        claims = token_claims(data)
         access_token = create_token(
-            id, "access_token", timedelta(minutes=ACCESS_TOKEN_EXPIRES)
+            id, "access_token", timedelta(minutes=ACCESS_TOKEN_EXPIRES), claims
         )
         refresh_token = create_token(
-            id, "refresh_token", timedelta(days=REFRESH_TOKEN_EXPIRES)
+            id, "refresh_token", timedelta(days=REFRESH_TOKEN_EXPIRES), claims
         )
 
-        query = select(User).where(User.id == id)
-        result = await db.execute(query)
-        data = result.scalar_one()
-
+    except HTTPException:
+        # Includes the hashing pool's 503 when it is saturated
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -186,12 +191,13 @@ async def create_user(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Username already exists"
         )
+    password_hash = await hash_pw_async(user.password)
     try:
         new_user = User(
             username=user.username,
             role=user.role.value,
             scope_id=user.scope_id,
-            password_hash=hash_pw(user.password),
+            password_hash=password_hash,
             active=True,
         )
         db.add(new_user)
@@ -208,7 +214,7 @@ async def update_user(
     update_data: UserUpdateForm = Body(..., embed=True),
     db: AsyncSession = Depends(get_db),
 ):
-    await exist_user_checking(id, db)
+    existing = await exist_user_checking(id, db)
     try:
         update_fields = {
             k: v if k != "role" else v.value
@@ -218,9 +224,20 @@ async def update_user(
         if not update_fields:
             raise HTTPException(status_code=400, detail="Invalid Update Form")
 
-        stmt = update(User).where(User.id == id).values(**update_fields)
-        await db.execute(stmt)
+        # Role and scope are embedded in tokens, so changing them revokes old tokens
+        update_fields["token_version"] = User.token_version + 1
+        stmt = (
+            update(User)
+            .where(User.id == id)
+            .values(**update_fields)
+            .returning(User.token_version)
+            .execution_options(audit_before=existing)
+        )
+        result = await db.execute(stmt)
+        version = result.scalar_one()
+        await record_revocation(db, id, "version", version)
         await db.commit()
+        revocation_registry.apply(id, "version", version)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"{str(e)}")
     return {"message": "Successfully Updated"}
@@ -233,15 +250,23 @@ async def reset_password(
     user: UserInfor = Depends(JWTBearer(accepted_role_list=[UserRole.ADMIN])),
     db: AsyncSession = Depends(get_db),
 ):
-    await exist_user_checking(id, db)
+    existing = await exist_user_checking(id, db)
+    password_hash = await hash_pw_async(password.password)
     try:
         stmt = (
             update(User)
             .where(User.id == id)
-            .values(password_hash=hash_pw(password.password))
+            .values(
+                password_hash=password_hash, token_version=User.token_version + 1
+            )
+            .returning(User.token_version)
+            .execution_options(audit_action="RESET_PASSWORD", audit_before=existing)
         )
-        await db.execute(stmt)
+        result = await db.execute(stmt)
+        version = result.scalar_one()
+        await record_revocation(db, id, "version", version)
         await db.commit()
+        revocation_registry.apply(id, "version", version)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"{str(e)}")
     return {"message": "Successfully Updated"}
@@ -268,7 +293,9 @@ async def delete_user(
     try:
         stmt = delete(User).where(User.id == id)
         await db.execute(stmt)
+        await record_revocation(db, id, "delete")
         await db.commit()
+        revocation_registry.apply(id, "delete")
         return {"message": "Successfully Deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"{str(e)}")
@@ -282,11 +309,20 @@ async def lock_user(
     ),
     db: AsyncSession = Depends(get_db),
 ):
-    await exist_user_checking(id, db)
+    existing = await exist_user_checking(id, db)
     try:
-        stmt = update(User).where(User.id == id).values(active=False)
-        await db.execute(stmt)
+        stmt = (
+            update(User)
+            .where(User.id == id)
+            .values(active=False, token_version=User.token_version + 1)
+            .returning(User.token_version)
+            .execution_options(audit_action="LOCK_USER", audit_before=existing)
+        )
+        result = await db.execute(stmt)
+        version = result.scalar_one()
+        await record_revocation(db, id, "lock", version)
         await db.commit()
+        revocation_registry.apply(id, "lock", version)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"{str(e)}")
     return {"message": "Successfully Locked"}
@@ -295,38 +331,23 @@ async def lock_user(
 @router.put("/users/{id}/unlock", status_code=200)
 async def unlock_user(
     id: str,
-    background_task: BackgroundTasks,
     user_data: UserInfor = Depends(
         JWTBearer(accepted_role_list=[UserRole.ADMIN.value])
     ),
     db: AsyncSession = Depends(get_db),
 ):
-    await exist_user_checking(id, db)
+    existing = await exist_user_checking(id, db)
     try:
-        result = await db.execute(select(User).where(User.id == id))
-        before_data = result.scalar_one().__dict__.copy()
-        if "_sa_instance_state" in before_data:
-            del before_data["_sa_instance_state"]
-
-        stmt = update(User).where(User.id == id).values(active=True)
+        stmt = (
+            update(User)
+            .where(User.id == id)
+            .values(active=True)
+            .execution_options(audit_action="UNLOCK_USER", audit_before=existing)
+        )
         await db.execute(stmt)
+        await record_revocation(db, id, "unlock")
         await db.commit()
-
-        result = await db.execute(select(User).where(User.id == id))
-        after_data = result.scalar_one().__dict__.copy()
-        if "_sa_instance_state" in after_data:
-            del after_data["_sa_instance_state"]
-
-        t = AuditLogForm(
-            user_id=user_data.id,
-            action="UNLOCK_USER",
-            entity_name="USER",
-            entity_id=id,
-            before_state=jsonable_encoder(before_data),
-            after_state=jsonable_encoder(after_data),
-        )
-        await save_audit_log(t, db)
-
+        revocation_registry.apply(id, "unlock")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"{str(e)}")
     return {"message": "Successfully Unlocked"}
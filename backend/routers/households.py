@@ -3,8 +3,10 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth_bearer import JWTBearer
+from database import get_db
 from schemas.auth import UserInfor, UserRole
 from schemas.household import HokhauCreate, HokhauUpdate
 from services.household_service import HouseholdService
@@ -19,9 +21,10 @@ async def count_hokhau(
     to_id: str | None = Query(None, description="ID tổ"),
     phuong_id: str | None = Query(None, description="ID phường"),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        response = await HouseholdService.count_hokhau(to_id=to_id, phuong_id=phuong_id)
+        response = await HouseholdService.count_hokhau(db, to_id=to_id, phuong_id=phuong_id)
         return {
             "data": len(response.data),
         }
@@ -35,6 +38,7 @@ async def count_hokhau(
 @router.get("/me/info", summary="Get household information of current user (Citizen)")
 async def get_my_household(
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=[UserRole.NGUOI_DAN])),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         if not user_data.scope_id:
@@ -53,7 +57,7 @@ async def get_my_household(
                 detail={"error": {"code": "INVALID_SCOPE_ID", "message": "Mã nhân khẩu không hợp lệ. Vui lòng liên hệ quản trị viên."}},
             )
 
-        response = await HouseholdService.get_household_by_citizen_id(user_data.scope_id)
+        response = await HouseholdService.get_household_by_citizen_id(db, user_data.scope_id)
         if not response:
             raise HTTPException(
                 status_code=404,
@@ -78,9 +82,11 @@ async def get_hokhau_list(
     page: int = Query(1, ge=1),
     limit: int = Query(20, le=100),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         response = await HouseholdService.get_hokhau_list(
+            db,
             q=q,
             phuong_xa=phuong_xa,
             page=page,
@@ -101,9 +107,10 @@ async def get_hokhau_list(
 async def get_hokhau_detail(
     id: str,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        response = await HouseholdService.get_hokhau_detail(id)
+        response = await HouseholdService.get_hokhau_detail(db, id)
         if not response:
             raise HTTPException(
                 status_code=404,
@@ -123,10 +130,12 @@ async def get_hokhau_detail(
 async def create_hokhau(
     data: HokhauCreate,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         data_dict = data.model_dump(mode="json")
-        response = await HouseholdService.create_hokhau(data_dict)
+        response = await HouseholdService.create_hokhau(db, data_dict)
+        await db.commit()
         return {
             "data": response.data,
         }
@@ -142,9 +151,10 @@ async def update_hokhau(
     id: str,
     data: HokhauUpdate,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(id)
+        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
@@ -163,7 +173,8 @@ async def update_hokhau(
 
         changed_fields["updated_at"] = datetime.now(timezone(timedelta(hours=7)))
         changed_fields = jsonable_encoder(changed_fields)
-        response = await HouseholdService.update_hokhau(id, changed_fields)
+        response = await HouseholdService.update_hokhau(db, id, changed_fields, before=existing.data)
+        await db.commit()
         return {"data": response.data}
     except Exception as e:
         raise HTTPException(
@@ -176,17 +187,19 @@ async def update_hokhau(
 async def verify_hokhau(
     id: str,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=[UserRole.CAN_BO_PHUONG])),
+    db: AsyncSession = Depends(get_db),
 ):
     """Mark a household as verified by an official"""
     try:
-        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(id)
+        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
                 detail={"error": {"code": "NOT_FOUND", "message": "Không tìm thấy hộ khẩu."}},
             )
 
-        response = await HouseholdService.verify_hokhau(id)
+        response = await HouseholdService.verify_hokhau(db, id, before=existing.data)
+        await db.commit()
         return {
             "data": response.data,
             "message": "Xác minh hộ khẩu thành công.",
@@ -204,17 +217,19 @@ async def verify_hokhau(
 async def unverify_hokhau(
     id: str,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=[UserRole.CAN_BO_PHUONG])),
+    db: AsyncSession = Depends(get_db),
 ):
     """Remove verification from a household"""
     try:
-        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(id)
+        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
                 detail={"error": {"code": "NOT_FOUND", "message": "Không tìm thấy hộ khẩu."}},
             )
 
-        response = await HouseholdService.unverify_hokhau(id)
+        response = await HouseholdService.unverify_hokhau(db, id, before=existing.data)
+        await db.commit()
         return {
             "data": response.data,
             "message": "Đã hủy xác minh hộ khẩu.",
@@ -232,16 +247,18 @@ async def unverify_hokhau(
 async def delete_hokhau(
     id: str,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=[UserRole.ADMIN])),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(id)
+        existing = await HouseholdService.get_hokhau_detail_without_nhankhau(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
                 detail={"error": {"code": "NOT_FOUND", "message": "Không tìm thấy hộ khẩu."}},
             )
 
-        response = await HouseholdService.delete_hokhau(id)
+        response = await HouseholdService.delete_hokhau(db, id, before=existing.data)
+        await db.commit()
         return {
             "data": bool(response.data),
         }
@@ -1,12 +1,23 @@
-from datetime import datetime, time
+from datetime import datetime, timedelta
 from typing import Optional
+from uuid import UUID
 
+from core.audit import ACTION_TYPES
+from core.audit_rollups import read_stats
 from core.auth_bearer import JWTBearer
+from crud.audit import (
+    after_cursor,
+    encode_cursor,
+    estimate_count,
+    get_entity_history,
+    reconstruct_states,
+)
 from database import get_db
 from fastapi import APIRouter, Depends, HTTPException, Query
 from models import AuditLog, User
 from schemas.auth import UserInfor, UserRole
 from schemas.role import (
+    AuditLogEntityHistoryResponse,
     AuditLogListResponse,
     AuditLogResponse,
     AuditLogStatsResponse,
@@ -21,10 +32,13 @@ router = APIRouter(prefix="/audit-logs", tags=["audit_logs"])
 async def get_logs(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    count: str = Query("exact", pattern="^(exact|estimated|none)$"),
     action_type: Optional[str] = None,
     role: Optional[str] = None,
     status: Optional[str] = None,
     search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern="^(prefix|contains)$"),
     db: AsyncSession = Depends(get_db),
     _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
 ):
@@ -34,17 +48,8 @@ async def get_logs(
 
     conditions = []
 
-    if action_type:
-        if action_type == "account":
-            conditions.append(func.lower(AuditLog.entity_name).in_(["user", "account"]))
-        elif action_type == "security":
-            conditions.append(func.lower(AuditLog.action).in_(["login", "logout", "failed_login"]))
-        elif action_type == "permission":
-            conditions.append(func.lower(AuditLog.entity_name).in_(["role", "permission"]))
-        elif action_type == "database":
-            conditions.append(func.lower(AuditLog.action).in_(["backup", "restore"]))
-        elif action_type == "settings":
-            conditions.append(func.lower(AuditLog.entity_name) == "setting")
+    if action_type in ACTION_TYPES:
+        conditions.append(AuditLog.action_type == action_type)
 
     if role:
         conditions.append(User.role == role)
@@ -56,26 +61,52 @@ async def get_logs(
             conditions.append(1 == 0)
 
     if search:
-        search_lower = f"%{search.lower()}%"
+        # Both sides are served by the trigram indexes on lower(username) and lower(action)
+        needle = search.lower()
+
+        def matches(column):
+            if search_mode == "prefix":
+                return func.lower(column).startswith(needle, autoescape=True)
+            return func.lower(column).contains(needle, autoescape=True)
+
+        matching_users = select(User.id).where(matches(User.username))
         conditions.append(
-            (func.lower(User.username).like(search_lower)) |
-            (func.lower(AuditLog.action).like(search_lower))
+            AuditLog.user_id.in_(matching_users) | matches(AuditLog.action)
         )
 
     if conditions:
         query = query.where(and_(*conditions))
 
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
-
-    total_pages = (total + page_size - 1) // page_size
-
-    query = query.order_by(desc(AuditLog.timestamp))
-    query = query.offset((page - 1) * page_size).limit(page_size)
+    total = None
+    total_pages = None
+    if count == "exact":
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(count_query)
+        total = total_result.scalar_one()
+    elif count == "estimated":
+        total = await estimate_count(db, query)
+    if total is not None:
+        total_pages = (total + page_size - 1) // page_size
+
+    query = query.order_by(desc(AuditLog.timestamp), desc(AuditLog.id))
+    if cursor:
+        # Keyset pagination: seeks on ix_audit_logs_timestamp_id, so every page costs the same
+        try:
+            query = query.where(after_cursor(cursor))
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": {"code": "INVALID_CURSOR", "message": "Invalid cursor"}},
+            )
+    else:
+        query = query.offset((page - 1) * page_size)
+    query = query.limit(page_size + 1)
 
     result = await db.execute(query)
     rows = result.all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1][0]) if has_more else None
 
     logs_data = []
     for log, username, user_role in rows:
@@ -90,6 +121,7 @@ async def get_logs(
                 entity_id=log.entity_id,
                 before_state=log.before_state,
                 after_state=log.after_state,
+                changes=log.changes,
                 timestamp=log.timestamp,
             )
         )
@@ -100,34 +132,82 @@ async def get_logs(
         page=page,
         page_size=page_size,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/stats", response_model=AuditLogStatsResponse)
 async def get_stats(
+    days: int = Query(30, ge=1, le=366, description="Window for the window_* and by_action_type counts"),
     db: AsyncSession = Depends(get_db),
     _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
 ):
     today = datetime.utcnow().date()
-    start_of_today = datetime.combine(today, time.min)
+    # Answered from the daily rollups maintained by the audit writer
+    stats = await read_stats(db, today - timedelta(days=days - 1), today)
 
-    today_query = select(func.count(AuditLog.id)).where(AuditLog.timestamp >= start_of_today)
-    today_result = await db.execute(today_query)
-    today_count = today_result.scalar() or 0
+    return AuditLogStatsResponse(
+        today_count=stats["today_count"],
+        success_count=stats["total_count"],
+        error_count=0,
+        unique_users=stats["unique_users"],
+        window_days=days,
+        window_count=stats["window_count"],
+        window_unique_users=stats["window_unique_users"],
+        by_action_type=stats["by_action_type"],
+    )
 
-    users_query = select(func.count(func.distinct(AuditLog.user_id)))
-    users_result = await db.execute(users_query)
-    unique_users = users_result.scalar() or 0
 
-    total_query = select(func.count(AuditLog.id))
-    total_result = await db.execute(total_query)
-    total_count = total_result.scalar() or 0
+@router.get(
+    "/entity/{entity_name}/{entity_id}", response_model=AuditLogEntityHistoryResponse
+)
+async def get_entity_timeline(
+    entity_name: str,
+    entity_id: UUID,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    reconstruct: bool = Query(False, description="Include full before/after state at each step"),
+    db: AsyncSession = Depends(get_db),
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    entity_name = entity_name.upper()
+    try:
+        rows, states, next_cursor = await get_entity_history(
+            db, entity_name, entity_id, cursor, limit, reconstruct
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": {"code": "INVALID_CURSOR", "message": "Invalid cursor"}},
+        )
 
-    return AuditLogStatsResponse(
-        today_count=today_count,
-        success_count=total_count,
-        error_count=0,
-        unique_users=unique_users,
+    logs_data = []
+    for index, (log, username, user_role) in enumerate(rows):
+        before_state, after_state, verified = (
+            states[index] if states else (log.before_state, log.after_state, None)
+        )
+        logs_data.append(
+            AuditLogResponse(
+                id=log.id,
+                user_id=log.user_id,
+                username=username,
+                user_role=user_role,
+                action=log.action,
+                entity_name=log.entity_name,
+                entity_id=log.entity_id,
+                before_state=before_state,
+                after_state=after_state,
+                changes=log.changes,
+                state_verified=verified,
+                timestamp=log.timestamp,
+            )
+        )
+
+    return AuditLogEntityHistoryResponse(
+        entity_name=entity_name,
+        entity_id=entity_id,
+        logs=logs_data,
+        next_cursor=next_cursor,
     )
 
 
@@ -148,6 +228,7 @@ async def get_log_detail(
         raise HTTPException(status_code=404, detail="Log not found")
 
     log, username, user_role = row
+    before_state, after_state, verified = await reconstruct_states(db, log)
 
     return AuditLogResponse(
         id=log.id,
@@ -157,7 +238,9 @@ async def get_log_detail(
         action=log.action,
         entity_name=log.entity_name,
         entity_id=log.entity_id,
-        before_state=log.before_state,
-        after_state=log.after_state,
+        before_state=before_state,
+        after_state=after_state,
+        changes=log.changes,
+        state_verified=verified,
         timestamp=log.timestamp,
     )
@@ -6,7 +6,8 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth_bearer import JWTBearer
-from core.utils import hash_pw, verify_pw
+from core.hashing import hash_pw_async, verify_pw_async
+from core.revocation import record_revocation, revocation_registry
 from database import get_db
 from models import User
 from models.citizen import Citizen
@@ -30,9 +31,10 @@ async def get_all_nhankhau(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        response = await ResidentService.get_all_nhankhau(q=q, page=page, limit=limit)
+        response = await ResidentService.get_all_nhankhau(db, q=q, page=page, limit=limit)
         return {
             "data": response.data,
             "pagination": response.meta,
@@ -48,9 +50,10 @@ async def get_all_nhankhau(
 async def search_nhankhau(
     q: str = Query(..., description="Query string to search by name or CCCD number"),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        response = await ResidentService.search_nhankhau(q)
+        response = await ResidentService.search_nhankhau(db, q)
         # Return full citizen data for matching in frontend
         formatted = [
             {
@@ -76,11 +79,10 @@ async def count_nhankhau(
     to_id: str | None = Query(None, description="ID tổ dân phố"),
     phuong_id: str | None = Query(None, description="ID phường xã"),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        response = await ResidentService.count_nhankhau(
-            to_id=to_id, phuong_id=phuong_id
-        )
+        response = await ResidentService.count_nhankhau(db, to_id=to_id, phuong_id=phuong_id)
         return {
             "data": len(response.data),
         }
@@ -95,13 +97,18 @@ async def count_nhankhau(
 async def create_nhankhau(
     data: NhankhauCreate,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         data_dict = data.model_dump(exclude_none=True)
-        response = await ResidentService.create_nhankhau(data_dict)
+        response = await ResidentService.create_nhankhau(db, data_dict)
+        await db.commit()
         return {
             "data": response.data,
         }
+    except HTTPException:
+        # Includes the hashing pool's 503 when it is saturated
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -134,7 +141,7 @@ async def get_my_info(
                 },
             )
 
-        response = await ResidentService.get_nhankhau_detail(citizen_id)
+        response = await ResidentService.get_nhankhau_detail(db, citizen_id)
         if not response.data:
             raise HTTPException(
                 status_code=404,
@@ -181,7 +188,7 @@ async def update_my_info(
             )
 
         # Check if citizen exists
-        existing = await ResidentService.get_nhankhau_detail(citizen_id)
+        existing = await ResidentService.get_nhankhau_detail(db, citizen_id)
         if not existing.data:
             raise HTTPException(
                 status_code=404,
@@ -209,7 +216,8 @@ async def update_my_info(
                 },
             )
 
-        response = await ResidentService.update_nhankhau(citizen_id, update_fields)
+        response = await ResidentService.update_nhankhau(db, citizen_id, update_fields, before=existing.data)
+        await db.commit()
         return {"data": response.data, "message": "Cập nhật thông tin thành công."}
     except HTTPException:
         raise
@@ -248,7 +256,7 @@ async def change_my_password(
             )
 
         # Verify old password
-        if not verify_pw(password_data.old_password, user.password_hash):
+        if not await verify_pw_async(password_data.old_password, user.password_hash):
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -271,12 +279,21 @@ async def change_my_password(
                 },
             )
 
-        # Update password
-        stmt = update(User).where(User.id == user_data.id).values(
-            password_hash=hash_pw(password_data.new_password)
+        # Update password; bumping token_version revokes previously issued tokens
+        stmt = (
+            update(User)
+            .where(User.id == user_data.id)
+            .values(
+                password_hash=await hash_pw_async(password_data.new_password),
+                token_version=User.token_version + 1,
+            )
+            .returning(User.token_version)
         )
-        await db.execute(stmt)
+        result = await db.execute(stmt)
+        version = result.scalar_one()
+        await record_revocation(db, user_data.id, "version", version)
         await db.commit()
+        revocation_registry.apply(user_data.id, "version", version)
 
         return {"message": "Đổi mật khẩu thành công."}
     except HTTPException:
@@ -295,9 +312,10 @@ async def change_my_password(
 async def get_nhankhau_detail(
     id: str,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        response = await ResidentService.get_nhankhau_detail(id)
+        response = await ResidentService.get_nhankhau_detail(db, id)
         if not response:
             raise HTTPException(
                 status_code=404,
@@ -323,9 +341,10 @@ async def update_nhankhau(
     id: str,
     data: NhankhauUpdate,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=COMMON_ROLES)),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        existing = await ResidentService.get_nhankhau_detail(id)
+        existing = await ResidentService.get_nhankhau_detail(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
@@ -358,7 +377,7 @@ async def update_nhankhau(
                 from_household_id = old_household
                 to_household_id = new_household
 
-        update_result = await ResidentService.update_nhankhau(id, payload)
+        update_result = await ResidentService.update_nhankhau(db, id, payload, before=current_data)
 
         if change_type:
             movement_data = {
@@ -369,7 +388,10 @@ async def update_nhankhau(
                 "change_date": date.today().isoformat(),
                 "notes": f"Nhân khẩu {current_data.get('full_name')} thực hiện thay đổi: {change_type}",
             }
-            await ResidentService.create_movement_log(movement_data)
+            await ResidentService.create_movement_log(db, movement_data)
+
+        # The update and its movement log commit together
+        await db.commit()
 
         return {
             "data": update_result.data,
@@ -386,9 +408,10 @@ async def update_nhankhau(
 async def delete_nhankhau(
     id: str,
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=[UserRole.ADMIN])),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
-        existing = await ResidentService.get_nhankhau_detail(id)
+        existing = await ResidentService.get_nhankhau_detail(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
@@ -400,7 +423,8 @@ async def delete_nhankhau(
                 },
             )
 
-        response = await ResidentService.delete_nhankhau(id)
+        response = await ResidentService.delete_nhankhau(db, id, before=existing.data)
+        await db.commit()
         return {
             "data": bool(response.data),
         }
@@ -412,9 +436,12 @@ async def delete_nhankhau(
 
 
 @router.get("/{id}/lich-su-bien-dong", summary="Get movement logs of a citizen")
-async def get_nhankhau_movement_logs(id: str):
+async def get_nhankhau_movement_logs(
+    id: str,
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        existing = await ResidentService.get_nhankhau_detail(id)
+        existing = await ResidentService.get_nhankhau_detail(db, id)
         if not existing:
             raise HTTPException(
                 status_code=404,
@@ -426,7 +453,7 @@ async def get_nhankhau_movement_logs(id: str):
                 },
             )
 
-        response = await ResidentService.get_nhankhau_movement_logs(id)
+        response = await ResidentService.get_nhankhau_movement_logs(db, id)
         return {
             "data": response.data,
         }
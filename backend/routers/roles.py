@@ -7,6 +7,7 @@ from core.permissions import (
     ROLE_METADATA,
     ROLE_PERMISSIONS,
 )
+from core.query_stats import query_budget
 from database import get_db
 from fastapi import APIRouter, Depends, HTTPException
 from models import User
@@ -23,7 +24,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 router = APIRouter(prefix="/roles", tags=["roles"])
 
 
-@router.get("", response_model=List[RoleResponse])
+# One user count per role, plus the user lookup on a cache miss
+@router.get(
+    "",
+    response_model=List[RoleResponse],
+    dependencies=[query_budget(len(ROLE_METADATA) + 1)],
+)
 async def get_all_roles(
     db: AsyncSession = Depends(get_db),
     _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
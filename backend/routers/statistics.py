@@ -2,27 +2,42 @@
 Statistics API Router for Leader Dashboard Reports
 """
 import datetime
-from collections import defaultdict
+from typing import Literal, Optional
 
 from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import and_, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth_bearer import JWTBearer
+from core.config import STATS_CACHE_TTL
+from core.query_stats import query_budget
 from database import get_db
-from models.citizen import Citizen
 from models.feedback import Feedback
 from models.household import Household
 from schemas.auth import UserInfor, UserRole
 from schemas.common import Category, Status
+from services.statistics_service import (
+    AGE_EDGES,
+    AGE_MAX_BUCKETS,
+    PYRAMID_MAX_AGE,
+    TREND_MAX_BUCKETS,
+    StatisticsService,
+    bucket_count,
+    bucket_start,
+    bucket_step,
+)
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
 
 LEADER_ROLES = [UserRole.ADMIN, UserRole.TO_TRUONG, UserRole.CAN_BO_PHUONG]
 
 
-@router.get("/overview", summary="Get overview statistics for dashboard")
+@router.get(
+    "/overview",
+    summary="Get overview statistics for dashboard",
+    dependencies=[query_budget(4)],
+)
 async def get_overview_statistics(
     db: AsyncSession = Depends(get_db),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=LEADER_ROLES)),
@@ -35,45 +50,15 @@ async def get_overview_statistics(
     - Resolution rate
     """
     try:
-        # Total households
-        households_query = select(func.count()).select_from(Household).where(Household.is_active == True)
-        households_result = await db.execute(households_query)
-        total_households = households_result.scalar() or 0
-
-        # Total residents (active citizens)
-        residents_query = select(func.count()).select_from(Citizen).where(
-            and_(Citizen.is_active == True, Citizen.is_deceased == False)
-        )
-        residents_result = await db.execute(residents_query)
-        total_residents = residents_result.scalar() or 0
-
-        # Feedback this month
-        now = datetime.datetime.now()
-        first_day_of_month = datetime.datetime(now.year, now.month, 1)
-        
-        feedback_this_month_query = select(func.count()).select_from(Feedback).where(
-            Feedback.created_at >= first_day_of_month
-        )
-        feedback_result = await db.execute(feedback_this_month_query)
-        feedback_this_month = feedback_result.scalar() or 0
-
-        # Resolution rate (resolved / total * 100)
-        total_feedback_query = select(func.count()).select_from(Feedback)
-        total_feedback_result = await db.execute(total_feedback_query)
-        total_feedback = total_feedback_result.scalar() or 0
-
-        resolved_query = select(func.count()).select_from(Feedback).where(
-            Feedback.status == Status.da_giai_quyet.value
-        )
-        resolved_result = await db.execute(resolved_query)
-        resolved_count = resolved_result.scalar() or 0
-
+        counts = await StatisticsService.overview()
+        total_feedback = counts["feedback"]["total"]
+        resolved_count = counts["feedback"]["resolved"]
         resolution_rate = round((resolved_count / total_feedback * 100), 0) if total_feedback > 0 else 0
 
         return {
-            "total_households": total_households,
-            "total_residents": total_residents,
-            "feedback_this_month": feedback_this_month,
+            "total_households": counts["households"]["active"],
+            "total_residents": counts["citizens"]["residents"],
+            "feedback_this_month": counts["feedback"]["since"],
             "resolution_rate": int(resolution_rate),
         }
 
@@ -233,110 +218,118 @@ async def get_feedback_by_status(
         )
 
 
-@router.get("/residents/demographics", summary="Get resident demographics")
+def _invalid_edges(message: str) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={"error": {"code": "INVALID_EDGES", "message": message}},
+    )
+
+
+def _age_edges(edges: Optional[str], bucket_width: Optional[int]) -> tuple[int, ...]:
+    """Lower age edges of the buckets, starting at 0"""
+    if edges is not None and bucket_width is not None:
+        raise _invalid_edges("Give either edges or bucket_width, not both")
+    if bucket_width is not None:
+        values = list(range(0, PYRAMID_MAX_AGE + 1, bucket_width))
+    elif edges is None:
+        return AGE_EDGES
+    else:
+        try:
+            values = [int(edge) for edge in edges.split(",") if edge.strip()]
+        except ValueError:
+            raise _invalid_edges("edges must be comma-separated whole years")
+    if values and values[0] != 0:
+        values.insert(0, 0)
+    if len(values) < 2 or any(b <= a for a, b in zip(values, values[1:])) or values[0] < 0:
+        raise _invalid_edges("edges must be increasing ages")
+    if values[-1] > PYRAMID_MAX_AGE:
+        raise _invalid_edges(f"edges must not exceed {PYRAMID_MAX_AGE}")
+    if len(values) > AGE_MAX_BUCKETS:
+        raise _invalid_edges(f"At most {AGE_MAX_BUCKETS} buckets per request")
+    return tuple(values)
+
+
+def _age_distribution(edges: tuple[int, ...], buckets: dict, total: int) -> list[dict]:
+    data = []
+    for index, low in enumerate(edges):
+        high = edges[index + 1] - 1 if index + 1 < len(edges) else None
+        counts = buckets.get(index, {"count": 0, "male": 0, "female": 0, "unknown": 0})
+        data.append({
+            "group": f"{low}-{high} tuổi" if high is not None else f"Trên {low - 1} tuổi",
+            "min_age": low,
+            "max_age": high,
+            "count": counts["count"],
+            "male": counts["male"],
+            "female": counts["female"],
+            "unknown": counts["unknown"],
+            "percentage": round(counts["count"] / total * 100) if total > 0 else 0,
+        })
+    return data
+
+
+def _gender_distribution(buckets: dict, total: int) -> list[dict]:
+    labels = {"male": "Nam", "female": "Nữ", "unknown": "Chưa xác định"}
+    data = []
+    for key, label in labels.items():
+        count = sum(counts[key] for counts in buckets.values())
+        # Only citizens not yet backfilled lack a gender
+        if key == "unknown" and count == 0:
+            continue
+        data.append({
+            "gender": label,
+            "count": count,
+            "percentage": round(count / total * 100) if total > 0 else 0,
+        })
+    return data
+
+
+@router.get(
+    "/residents/demographics",
+    summary="Get resident demographics",
+    dependencies=[query_budget(2)],
+)
 async def get_resident_demographics(
+    edges: Optional[str] = Query(
+        None, description="Comma-separated lower age edges in years, e.g. 0,16,61"
+    ),
+    bucket_width: Optional[int] = Query(
+        None, ge=1, le=PYRAMID_MAX_AGE, description="Equal-width buckets (e.g. 5 for a pyramid)"
+    ),
+    group_by: Optional[Literal["neighborhood_group", "ward"]] = None,
     db: AsyncSession = Depends(get_db),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=LEADER_ROLES)),
 ):
     """
     Returns demographics:
-    - Age distribution (0-15, 16-60, 60+)
-    - Gender distribution (estimated from name patterns)
+    - Age distribution (0-15, 16-60, 60+ unless edges or bucket_width is given)
+    - Gender distribution (stored gender)
+    - The same per neighborhood group or ward with group_by
     """
+    age_edges = _age_edges(edges, bucket_width)
     try:
-        # Get all active citizens
-        query = select(Citizen).where(
-            and_(Citizen.is_active == True, Citizen.is_deceased == False)
-        )
-        result = await db.execute(query)
-        citizens = result.scalars().all()
-
-        total = len(citizens)
-        if total == 0:
-            return {
-                "age_distribution": [
-                    {"group": "0-15 tuổi", "count": 0, "percentage": 0},
-                    {"group": "16-60 tuổi", "count": 0, "percentage": 0},
-                    {"group": "Trên 60 tuổi", "count": 0, "percentage": 0},
-                ],
-                "gender_distribution": [
-                    {"gender": "Nam", "count": 0, "percentage": 0},
-                    {"gender": "Nữ", "count": 0, "percentage": 0},
-                ],
-                "total": 0,
-            }
-
-        today = datetime.date.today()
-        age_groups = {"0-15": 0, "16-60": 0, "60+": 0}
-        gender_count = {"male": 0, "female": 0}
-
-        for citizen in citizens:
-            # Calculate age
-            if citizen.date_of_birth:
-                age = today.year - citizen.date_of_birth.year
-                if today.month < citizen.date_of_birth.month or (
-                    today.month == citizen.date_of_birth.month and today.day < citizen.date_of_birth.day
-                ):
-                    age -= 1
-
-                if age <= 15:
-                    age_groups["0-15"] += 1
-                elif age <= 60:
-                    age_groups["16-60"] += 1
-                else:
-                    age_groups["60+"] += 1
-            else:
-                # Default to working age if no DOB
-                age_groups["16-60"] += 1
-
-            # Estimate gender from name (Vietnamese naming conventions)
-            # Common female middle names/parts: Thị, Ngọc, Thanh, Hương, Lan, etc.
-            # This is a rough estimation
-            full_name = citizen.full_name.lower() if citizen.full_name else ""
-            female_indicators = ["thị", " nữ ", "ngọc", "hương", "lan", "mai", "linh", "hoa", "thu", "phương", "yến", "hằng", "nga", "oanh", "hạnh", "dung", "thảo", "trang", "nhung"]
-            
-            is_female = any(ind in full_name for ind in female_indicators)
-            if is_female:
-                gender_count["female"] += 1
-            else:
-                gender_count["male"] += 1
-
-        age_distribution = [
-            {
-                "group": "0-15 tuổi",
-                "count": age_groups["0-15"],
-                "percentage": round(age_groups["0-15"] / total * 100) if total > 0 else 0,
-            },
-            {
-                "group": "16-60 tuổi",
-                "count": age_groups["16-60"],
-                "percentage": round(age_groups["16-60"] / total * 100) if total > 0 else 0,
-            },
-            {
-                "group": "Trên 60 tuổi",
-                "count": age_groups["60+"],
-                "percentage": round(age_groups["60+"] / total * 100) if total > 0 else 0,
-            },
-        ]
-
-        gender_distribution = [
-            {
-                "gender": "Nam",
-                "count": gender_count["male"],
-                "percentage": round(gender_count["male"] / total * 100) if total > 0 else 0,
-            },
-            {
-                "gender": "Nữ",
-                "count": gender_count["female"],
-                "percentage": round(gender_count["female"] / total * 100) if total > 0 else 0,
-            },
-        ]
+        stats = await StatisticsService.demographics(db, age_edges, group_by)
 
-        return {
-            "age_distribution": age_distribution,
-            "gender_distribution": gender_distribution,
+        total = sum(counts["count"] for counts in stats["overall"].values())
+        result = {
+            "age_distribution": _age_distribution(age_edges, stats["overall"], total),
+            "gender_distribution": _gender_distribution(stats["overall"], total),
             "total": total,
+            "edges": list(age_edges),
         }
+        if group_by is not None:
+            groups = []
+            for group_id, group in stats["groups"].items():
+                group_total = sum(counts["count"] for counts in group["buckets"].values())
+                groups.append({
+                    "group_id": str(group_id) if group_id else None,
+                    "name": group["name"],
+                    "total": group_total,
+                    "age_distribution": _age_distribution(age_edges, group["buckets"], group_total),
+                    "gender_distribution": _gender_distribution(group["buckets"], group_total),
+                })
+            result["group_by"] = group_by
+            result["groups"] = sorted(groups, key=lambda g: g["total"], reverse=True)
+        return result
 
     except Exception as e:
         raise HTTPException(
@@ -345,55 +338,76 @@ async def get_resident_demographics(
         )
 
 
-@router.get("/feedback/processing-time", summary="Get average processing time by category")
+CATEGORY_NAMES = {
+    Category.ha_tang.value: "Hạ tầng",
+    Category.moi_truong.value: "Môi trường",
+    Category.an_ninh.value: "An ninh",
+    Category.khac.value: "Khác",
+}
+
+
+def _days(value) -> Optional[float]:
+    return round(float(value), 1) if value is not None else None
+
+
+def _processing_times(stats: Optional[dict]) -> dict:
+    """Processing-time figures of one aggregate row, rounded to 0.1 day"""
+    stats = stats or {}
+    return {
+        "count": stats.get("timed", 0),
+        "mean_days": _days(stats.get("avg_days")),
+        "median_days": _days(stats.get("median_days")),
+        "p90_days": _days(stats.get("p90_days")),
+        "max_days": _days(stats.get("max_days")),
+    }
+
+
+@router.get(
+    "/feedback/processing-time",
+    summary="Get average processing time by category",
+    dependencies=[query_budget(2)],
+)
 async def get_feedback_processing_time(
     db: AsyncSession = Depends(get_db),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=LEADER_ROLES)),
 ):
     """
     Returns average processing time (in days) by category
-    for resolved feedback
+    for resolved feedback, with median, p90 and max alongside
     """
     try:
-        query = select(Feedback).where(
-            Feedback.status == Status.da_giai_quyet.value
-        )
-        result = await db.execute(query)
-        feedbacks = result.scalars().all()
-
-        category_times = defaultdict(list)
-        
-        for fb in feedbacks:
-            if fb.created_at and fb.updated_at:
-                days = (fb.updated_at - fb.created_at).days
-                category_times[fb.category].append(days)
-
-        category_names = {
-            Category.ha_tang.value: "Hạ tầng",
-            Category.moi_truong.value: "Môi trường",
-            Category.an_ninh.value: "An ninh",
-            Category.khac.value: "Khác",
-        }
+        stats = await StatisticsService.feedback_processing(db)
 
         data = []
-        for category, times in category_times.items():
-            avg_days = round(sum(times) / len(times)) if times else 0
-            name = category_names.get(category, category) if category else "Khác"
+        for category, row in stats["by_category"].items():
+            if not row["timed"]:
+                continue
+            name = CATEGORY_NAMES.get(category, category) if category else "Khác"
             data.append({
                 "category": name,
-                "avg_days": max(avg_days, 1),  # At least 1 day
+                "avg_days": max(round(row["avg_whole_days"]), 1),  # At least 1 day
+                **_processing_times(row),
             })
 
         # Add missing categories with default values
         existing_categories = [d["category"] for d in data]
-        for code, name in category_names.items():
+        for code, name in CATEGORY_NAMES.items():
             if name not in existing_categories:
                 data.append({
                     "category": name,
                     "avg_days": 0,
+                    **_processing_times(None),
                 })
 
-        return {"data": data}
+        return {
+            "data": data,
+            "by_scope": [
+                {"scope_id": scope_id, **_processing_times(row)}
+                for scope_id, row in stats["by_scope"].items()
+                if row["timed"]
+            ],
+            "overall": _processing_times(stats["overall"]),
+        }
 
     except Exception as e:
         raise HTTPException(
@@ -407,7 +421,11 @@ async def get_feedback_processing_time(
 OFFICIAL_ROLES = [UserRole.ADMIN, UserRole.CAN_BO_PHUONG]
 
 
-@router.get("/ward/overview", summary="Get ward-level overview statistics")
+@router.get(
+    "/ward/overview",
+    summary="Get ward-level overview statistics",
+    dependencies=[query_budget(4)],
+)
 async def get_ward_overview(
     db: AsyncSession = Depends(get_db),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=OFFICIAL_ROLES)),
@@ -420,35 +438,10 @@ async def get_ward_overview(
     - Feedback this month
     """
     try:
-        # Total households
-        households_query = select(func.count()).select_from(Household).where(Household.is_active == True)
-        households_result = await db.execute(households_query)
-        total_households = households_result.scalar() or 0
-
-        # Total residents (active citizens)
-        residents_query = select(func.count()).select_from(Citizen).where(
-            and_(Citizen.is_active == True, Citizen.is_deceased == False)
-        )
-        residents_result = await db.execute(residents_query)
-        total_residents = residents_result.scalar() or 0
+        counts = await StatisticsService.overview()
+        total_households = counts["households"]["active"]
+        total_groups = counts["households"]["groups"]
 
-        # Feedback this month
-        now = datetime.datetime.now()
-        first_day_of_month = datetime.datetime(now.year, now.month, 1)
-        
-        feedback_this_month_query = select(func.count()).select_from(Feedback).where(
-            Feedback.created_at >= first_day_of_month
-        )
-        feedback_result = await db.execute(feedback_this_month_query)
-        feedback_this_month = feedback_result.scalar() or 0
-
-        # Count distinct scope_ids (neighborhood groups)
-        scope_query = select(func.count(func.distinct(Household.scope_id))).select_from(Household).where(
-            and_(Household.is_active == True, Household.scope_id != None)
-        )
-        scope_result = await db.execute(scope_query)
-        total_groups = scope_result.scalar() or 0
-        
         # Default to at least 1 if there are households
         if total_groups == 0 and total_households > 0:
             total_groups = 1
@@ -456,8 +449,8 @@ async def get_ward_overview(
         return {
             "total_groups": total_groups,
             "total_households": total_households,
-            "total_residents": total_residents,
-            "feedback_this_month": feedback_this_month,
+            "total_residents": counts["citizens"]["residents"],
+            "feedback_this_month": counts["feedback"]["since"],
         }
 
     except Exception as e:
@@ -467,58 +460,85 @@ async def get_ward_overview(
         )
 
 
-@router.get("/ward/feedback-trend", summary="Get feedback trend for last N months")
+@router.get(
+    "/ward/feedback-trend",
+    summary="Get feedback trend per month, week or day",
+    dependencies=[query_budget(2)],
+)
 async def get_ward_feedback_trend(
-    months: int = 5,
+    response: Response,
+    months: int = Query(
+        5,
+        ge=1,
+        le=max(TREND_MAX_BUCKETS.values()),
+        description="Number of most recent buckets, when start is not given",
+    ),
+    granularity: Literal["month", "week", "day"] = "month",
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
     db: AsyncSession = Depends(get_db),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=OFFICIAL_ROLES)),
 ):
     """
-    Returns feedback count (total and resolved) for each of the last N months
+    Returns feedback count (total and resolved) for each bucket in the range.
+    Without start, the range is the last `months` buckets up to end (default today).
     """
+    max_buckets = TREND_MAX_BUCKETS[granularity]
+    too_large = HTTPException(
+        status_code=400,
+        detail={
+            "error": {
+                "code": "RANGE_TOO_LARGE",
+                "message": f"At most {max_buckets} {granularity} buckets per request",
+            }
+        },
+    )
+    if start is None and months > max_buckets:
+        raise too_large
+    try:
+        last = bucket_start(end or datetime.date.today(), granularity)
+        if start is not None:
+            first = bucket_start(start, granularity)
+        else:
+            first = last - bucket_step(granularity, months - 1)
+        stop = last + bucket_step(granularity)
+    except (OverflowError, ValueError):
+        # Ranges reaching past year 1 or 9999
+        raise HTTPException(
+            status_code=400,
+            detail={"error": {"code": "INVALID_RANGE", "message": "Date range out of bounds"}},
+        )
+    if first > last:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": {"code": "INVALID_RANGE", "message": "start must not be after end"}},
+        )
+    if bucket_count(first, last, granularity) > max_buckets:
+        raise too_large
+
     try:
+        rows = await StatisticsService.feedback_trend(db, granularity, first, last, stop)
         result = []
-        now = datetime.datetime.now()
-        
-        for i in range(months - 1, -1, -1):
-            target_date = now - relativedelta(months=i)
-            month_start = datetime.datetime(target_date.year, target_date.month, 1)
-            if i == 0:
-                month_end = now
+        for row in rows:
+            bucket = row["bucket"]
+            if granularity == "month":
+                label = f"Tháng {bucket.month}"
+            elif granularity == "week":
+                label = f"Tuần {bucket.isocalendar()[1]}/{bucket.isocalendar()[0]}"
             else:
-                next_month = month_start + relativedelta(months=1)
-                month_end = next_month - datetime.timedelta(seconds=1)
-            
-            month_name = f"Tháng {target_date.month}"
-            
-            # Total feedback in this month
-            total_query = select(func.count()).select_from(Feedback).where(
-                and_(
-                    Feedback.created_at >= month_start,
-                    Feedback.created_at <= month_end
-                )
-            )
-            total_result = await db.execute(total_query)
-            total_count = total_result.scalar() or 0
-            
-            # Resolved feedback in this month
-            resolved_query = select(func.count()).select_from(Feedback).where(
-                and_(
-                    Feedback.created_at >= month_start,
-                    Feedback.created_at <= month_end,
-                    Feedback.status == Status.da_giai_quyet.value
-                )
-            )
-            resolved_result = await db.execute(resolved_query)
-            resolved_count = resolved_result.scalar() or 0
-            
-            result.append({
-                "month": month_name,
-                "total": total_count,
-                "resolved": resolved_count,
-            })
-        
-        return {"data": result}
+                label = bucket.strftime("%d/%m")
+            item = {
+                "bucket": bucket.date().isoformat(),
+                "label": label,
+                "total": row["total"],
+                "resolved": row["resolved"],
+            }
+            if granularity == "month":
+                item["month"] = label
+            result.append(item)
+
+        response.headers["Cache-Control"] = f"private, max-age={int(STATS_CACHE_TTL)}"
+        return {"granularity": granularity, "data": result}
 
     except Exception as e:
         raise HTTPException(
@@ -639,7 +659,11 @@ async def get_ward_feedback_by_agency(
         )
 
 
-@router.get("/ward/efficiency", summary="Get ward efficiency statistics")
+@router.get(
+    "/ward/efficiency",
+    summary="Get ward efficiency statistics",
+    dependencies=[query_budget(2)],
+)
 async def get_ward_efficiency(
     db: AsyncSession = Depends(get_db),
     user_data: UserInfor = Depends(JWTBearer(accepted_role_list=OFFICIAL_ROLES)),
@@ -650,80 +674,44 @@ async def get_ward_efficiency(
     - Resolved count and percentage
     - In progress count and percentage
     - Pending count and percentage
-    - Average response time
+    - Average response time, plus median/p90/max processing time
+    - The same figures per neighborhood group (scope)
     """
     try:
         # Current year
         now = datetime.datetime.now()
         year_start = datetime.datetime(now.year, 1, 1)
-        
-        # Total feedback this year
-        total_query = select(func.count()).select_from(Feedback).where(
-            Feedback.created_at >= year_start
-        )
-        total_result = await db.execute(total_query)
-        total_year = total_result.scalar() or 0
-
-        # By status
-        resolved_query = select(func.count()).select_from(Feedback).where(
-            and_(
-                Feedback.created_at >= year_start,
-                Feedback.status == Status.da_giai_quyet.value
-            )
-        )
-        resolved_result = await db.execute(resolved_query)
-        resolved_count = resolved_result.scalar() or 0
 
-        in_progress_query = select(func.count()).select_from(Feedback).where(
-            and_(
-                Feedback.created_at >= year_start,
-                Feedback.status == Status.dang_xu_ly.value
-            )
-        )
-        in_progress_result = await db.execute(in_progress_query)
-        in_progress_count = in_progress_result.scalar() or 0
-
-        pending_query = select(func.count()).select_from(Feedback).where(
-            and_(
-                Feedback.created_at >= year_start,
-                Feedback.status == Status.moi_ghi_nhan.value
-            )
-        )
-        pending_result = await db.execute(pending_query)
-        pending_count = pending_result.scalar() or 0
-
-        # Calculate percentages
-        resolved_pct = round((resolved_count / total_year * 100)) if total_year > 0 else 0
-        in_progress_pct = round((in_progress_count / total_year * 100)) if total_year > 0 else 0
-        pending_pct = round((pending_count / total_year * 100)) if total_year > 0 else 0
-
-        # Average response time for resolved feedback
-        resolved_feedbacks_query = select(Feedback).where(
-            and_(
-                Feedback.status == Status.da_giai_quyet.value,
-                Feedback.created_at >= year_start
-            )
-        )
-        resolved_feedbacks_result = await db.execute(resolved_feedbacks_query)
-        resolved_feedbacks = resolved_feedbacks_result.scalars().all()
+        stats = await StatisticsService.feedback_processing(db, since=year_start)
 
-        total_days = 0
-        count_with_dates = 0
-        for fb in resolved_feedbacks:
-            if fb.created_at and fb.updated_at:
-                days = (fb.updated_at - fb.created_at).days
-                total_days += max(days, 1)
-                count_with_dates += 1
+        def efficiency(row: dict) -> dict:
+            total = row["total"]
 
-        avg_response_days = round(total_days / count_with_dates, 1) if count_with_dates > 0 else 0
+            def share(count: int) -> dict:
+                return {"count": count, "percentage": round(count / total * 100) if total > 0 else 0}
 
+            return {
+                "resolved": share(row["resolved"]),
+                "in_progress": share(row["in_progress"]),
+                "pending": share(row["pending"]),
+                "avg_response_days": round(float(row["avg_response_days"]), 1)
+                if row["avg_response_days"] is not None
+                else 0,
+                "processing_time": _processing_times(row),
+            }
+
+        # The () grouping set yields a row even when there is no feedback
+        overall = stats["overall"]
         return {
-            "total_year": total_year,
+            "total_year": overall["total"],
             "year": now.year,
-            "resolved": {"count": resolved_count, "percentage": resolved_pct},
-            "in_progress": {"count": in_progress_count, "percentage": in_progress_pct},
-            "pending": {"count": pending_count, "percentage": pending_pct},
-            "avg_response_days": avg_response_days,
+            **efficiency(overall),
+            "by_scope": [
+                {"scope_id": scope_id, "total": row["total"], **efficiency(row)}
+                for scope_id, row in sorted(
+                    stats["by_scope"].items(), key=lambda item: item[1]["total"], reverse=True
+                )
+            ],
         }
 
     except Exception as e:
@@ -0,0 +1,147 @@
+"""
+Internal diagnostics for administrators (caches, queues, pools)
+"""
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from core.audit import audit_writer
+from core.audit_capture import audit_capture
+from core.audit_partitions import list_partitions, partition_maintainer
+from core.auth_bearer import JWTBearer
+from core.hashing import password_hasher
+from core.loop_watchdog import loop_watchdog
+from core.profiler import request_profiler
+from core.query_stats import query_stats
+from core.revocation import revocation_registry
+from core.slow_queries import slow_query_log
+from core.user_cache import user_cache
+from database import engine
+from schemas.auth import UserInfor, UserRole
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/user-cache", summary="Authenticated user cache counters")
+async def get_user_cache_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return user_cache.stats()
+
+
+@router.get("/password-hasher", summary="Password hashing pool counters")
+async def get_password_hasher_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return password_hasher.stats()
+
+
+@router.get("/revocations", summary="Revocation registry state")
+async def get_revocation_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return revocation_registry.stats()
+
+
+@router.get("/audit-writer", summary="Audit pipeline queue and batch metrics")
+async def get_audit_writer_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return {**audit_writer.stats(), "capture": audit_capture.stats()}
+
+
+@router.get("/audit-partitions", summary="Audit log partitions and retention settings")
+async def get_audit_partitions(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return {**partition_maintainer.stats(), "partitions": await list_partitions()}
+
+
+@router.get("/db-pool", summary="Database connection pool gauges")
+async def get_db_pool_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return {"echo": engine.echo, **engine.pool.stats()}
+
+
+@router.get("/query-stats", summary="SQL statements, DB time and rows per route")
+async def get_query_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return query_stats.stats()
+
+
+@router.get("/event-loop", summary="Event-loop stalls and the stacks that caused them")
+async def get_event_loop_stats(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return loop_watchdog.stats()
+
+
+@router.get("/profiles", summary="Recent request profiles (without stacks)")
+async def list_profiles(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return request_profiler.stats()
+
+
+def _get_profile(profile_id: str) -> dict:
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "PROFILE_NOT_FOUND", "message": "Profile not found"}},
+        )
+    return profile
+
+
+@router.get("/profiles/{profile_id}", summary="One request profile with its folded stacks")
+async def get_profile(
+    profile_id: str,
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return _get_profile(profile_id)
+
+
+@router.get(
+    "/profiles/{profile_id}/folded",
+    summary="Folded stacks for flamegraph.pl or speedscope",
+    response_class=PlainTextResponse,
+)
+async def get_profile_folded(
+    profile_id: str,
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return _get_profile(profile_id)["folded"] + "\n"
+
+
+@router.get("/slow-queries", summary="Slow statements grouped by fingerprint")
+async def list_slow_queries(
+    sort: Literal["total_ms", "count", "p95_ms", "max_ms"] = "total_ms",
+    limit: int = Query(50, ge=1, le=500),
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    return slow_query_log.top(sort, limit)
+
+
+@router.get("/slow-queries/{fingerprint}", summary="One slow statement with its last parameters and plan")
+async def get_slow_query(
+    fingerprint: str,
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    entry = slow_query_log.get(fingerprint)
+    if entry is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "SLOW_QUERY_NOT_FOUND", "message": "Unknown fingerprint"}},
+        )
+    return entry
+
+
+@router.delete("/slow-queries", summary="Clear the slow query log")
+async def reset_slow_queries(
+    _: UserInfor = Depends(JWTBearer(accepted_role_list=UserRole.ADMIN)),
+):
+    slow_query_log.reset()
+    return {"success": True}
@@ -70,7 +70,7 @@ class Entity(Enum):
 
 
 class AuditLogForm(BaseModel):
-    user_id: UUID
+    user_id: Optional[UUID] = None
     action: str
     entity_name: str
     entity_id: UUID
@@ -26,3 +26,8 @@ class Category(str, Enum):
     an_ninh = "AN_NINH"
     moi_truong = "MOI_TRUONG"
     khac = "KHAC"
+
+
+class Gender(str, Enum):
+    nam = "NAM"
+    nu = "NU"
@@ -4,11 +4,14 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from .common import Gender
+
 
 class NhankhauCreate(BaseModel):
     household_id: UUID = Field(..., description='ID hộ khẩu của nhân khẩu')
     full_name: str = Field(..., description='Họ và tên', max_length=100)
     date_of_birth: date = Field(..., description='Ngày sinh', example='2005-09-02')
+    gender: Gender | None = Field(None, description='Giới tính (ước lượng từ họ tên nếu bỏ trống)')
     place_of_birth: str | None = Field(None, description='Nơi sinh', max_length=255)
     hometown: str | None = Field(None, description='Nguyên quán', max_length=255)
     ethnicity: str | None = Field(None, description='Dân tộc', max_length=50)
@@ -25,6 +28,7 @@ class NhankhauUpdate(BaseModel):
     household_id: UUID | None = Field(None, description='ID hộ khẩu của nhân khẩu')
     full_name: str | None = Field(None, description='Họ và tên', max_length=100)
     date_of_birth: date | None = Field(None, description='Ngày sinh', example='2005-09-02')
+    gender: Gender | None = Field(None, description='Giới tính')
     place_of_birth: str | None = Field(None, description='Nơi sinh', max_length=255)
     hometown: str | None = Field(None, description='Nguyên quán', max_length=255)
     ethnicity: str | None = Field(None, description='Dân tộc', max_length=50)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -62,6 +62,8 @@ class AuditLogResponse(BaseModel):
     entity_id: Optional[UUID]
     before_state: Optional[dict]
     after_state: Optional[dict]
+    changes: Optional[dict] = None
+    state_verified: Optional[bool] = None
     timestamp: datetime
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
@@ -72,14 +74,27 @@ class AuditLogResponse(BaseModel):
 
 class AuditLogListResponse(BaseModel):
     logs: List[AuditLogResponse]
-    total: int
+    total: Optional[int]  # None when count=none; approximate when count=estimated
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
+
+
+class AuditLogEntityHistoryResponse(BaseModel):
+    entity_name: str
+    entity_id: UUID
+    logs: List[AuditLogResponse]
+    next_cursor: Optional[str] = None
 
 
 class AuditLogStatsResponse(BaseModel):
     today_count: int
     success_count: int
     error_count: int
-    unique_users: int
+    unique_users: int  # approximate (HyperLogLog)
+    # Over the last `window_days` days, like by_action_type
+    window_days: int = 0
+    window_count: int = 0
+    window_unique_users: int = 0  # approximate (HyperLogLog)
+    by_action_type: Dict[str, int] = {}
@@ -1,184 +1,180 @@
 from typing import Any, Dict, Optional
 
 from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
 
-from database import AsyncSessionLocal, DbResponse
+from crud.base import insert_returning, update_returning
+from database import DbResponse
 from models import Citizen, Household
 
 
 class HouseholdService:
     @staticmethod
     async def get_hokhau_list(
+        session: AsyncSession,
         q: Optional[str] = None,
         phuong_xa: Optional[str] = None,
         page: int = 1,
         limit: int = 20,
     ):
-        async with AsyncSessionLocal() as session:
-            query = (
-                select(Household)
-                .options(
-                    joinedload(Household.head_of_household),
-                    selectinload(Household.members),
-                )
-                .filter(Household.is_active == True)
+        query = (
+            select(Household)
+            .options(
+                joinedload(Household.head_of_household),
+                selectinload(Household.members),
             )
-
-            if phuong_xa:
-                query = query.filter(Household.ward == phuong_xa)
-
-            if q:
-                query = query.join(Household.head_of_household, isouter=True)
-                query = query.filter(
-                    or_(
-                        Citizen.full_name.ilike(f"%{q}%"),
-                        Household.address.ilike(f"%{q}%"),
-                        Household.household_number.ilike(f"%{q}%"),
-                    )
+            .filter(Household.is_active == True)
+        )
+
+        if phuong_xa:
+            query = query.filter(Household.ward == phuong_xa)
+
+        if q:
+            query = query.join(Household.head_of_household, isouter=True)
+            query = query.filter(
+                or_(
+                    Citizen.full_name.ilike(f"%{q}%"),
+                    Household.address.ilike(f"%{q}%"),
+                    Household.household_number.ilike(f"%{q}%"),
                 )
+            )
 
-            offset = (page - 1) * limit
-            query = query.offset(offset).limit(limit)
+        offset = (page - 1) * limit
+        query = query.offset(offset).limit(limit)
 
-            result = await session.execute(query)
-            households = result.unique().scalars().all()
+        result = await session.execute(query)
+        households = result.unique().scalars().all()
 
-            data = []
-            for h in households:
-                h_dict = h.as_dict()
-                if h.head_of_household:
-                    h_dict["head_of_household"] = {
-                        "id": str(h.head_of_household.id),
-                        "full_name": h.head_of_household.full_name
-                    }
-                # Include members list for member count
-                h_dict["nhan_khau"] = [m.as_dict() for m in h.members if m.is_active]
-                data.append(h_dict)
+        data = []
+        for h in households:
+            h_dict = h.as_dict()
+            if h.head_of_household:
+                h_dict["head_of_household"] = {
+                    "id": str(h.head_of_household.id),
+                    "full_name": h.head_of_household.full_name
+                }
+            # Include members list for member count
+            h_dict["nhan_khau"] = [m.as_dict() for m in h.members if m.is_active]
+            data.append(h_dict)
 
-            return DbResponse(data=data, count=len(data))
+        return DbResponse(data=data, count=len(data))
 
     @staticmethod
-    async def get_hokhau_detail(id: str):
-        async with AsyncSessionLocal() as session:
-            query = (
-                select(Household)
-                .options(selectinload(Household.members))
-                .filter(Household.id == id, Household.is_active == True)
-            )
+    async def get_hokhau_detail(session: AsyncSession, id: str):
+        query = (
+            select(Household)
+            .options(selectinload(Household.members))
+            .filter(Household.id == id, Household.is_active == True)
+        )
 
-            result = await session.execute(query)
-            household = result.scalar_one_or_none()
+        result = await session.execute(query)
+        household = result.scalar_one_or_none()
 
-            if not household:
-                return DbResponse(data=None)
+        if not household:
+            return DbResponse(data=None)
 
-            h_dict = household.as_dict()
-            h_dict["nhan_khau"] = [m.as_dict() for m in household.members]
-            return DbResponse(data=h_dict)
+        h_dict = household.as_dict()
+        h_dict["nhan_khau"] = [m.as_dict() for m in household.members]
+        return DbResponse(data=h_dict)
 
     @staticmethod
-    async def get_hokhau_detail_without_nhankhau(id: str):
-        async with AsyncSessionLocal() as session:
-            query = select(Household).filter(
-                Household.id == id, Household.is_active == True
-            )
-            result = await session.execute(query)
-            household = result.scalar_one_or_none()
+    async def get_hokhau_detail_without_nhankhau(session: AsyncSession, id: str):
+        query = select(Household).filter(
+            Household.id == id, Household.is_active == True
+        )
+        result = await session.execute(query)
+        household = result.scalar_one_or_none()
 
-            if not household:
-                return None
+        if not household:
+            return None
 
-            return DbResponse(data=household.as_dict())
+        return DbResponse(data=household.as_dict())
 
     @staticmethod
-    async def get_household_by_citizen_id(citizen_id: str):
-        async with AsyncSessionLocal() as session:
-            query_citizen = select(Citizen).where(Citizen.id == citizen_id)
-            result_citizen = await session.execute(query_citizen)
-            citizen = result_citizen.scalar_one_or_none()
-
-            if not citizen or not citizen.household_id:
-                return None
-
-            query = (
-                select(Household)
-                .options(selectinload(Household.members))
-                .filter(Household.id == citizen.household_id, Household.is_active == True)
-            )
+    async def get_household_by_citizen_id(session: AsyncSession, citizen_id: str):
+        query_citizen = select(Citizen).where(Citizen.id == citizen_id)
+        result_citizen = await session.execute(query_citizen)
+        citizen = result_citizen.scalar_one_or_none()
 
-            result = await session.execute(query)
-            household = result.scalar_one_or_none()
+        if not citizen or not citizen.household_id:
+            return None
 
-            if not household:
-                return None
+        query = (
+            select(Household)
+            .options(selectinload(Household.members))
+            .filter(Household.id == citizen.household_id, Household.is_active == True)
+        )
 
-            h_dict = household.as_dict()
-            h_dict["nhan_khau"] = [m.as_dict() for m in household.members]
-            return DbResponse(data=h_dict)
+        result = await session.execute(query)
+        household = result.scalar_one_or_none()
 
-    @staticmethod
-    async def create_hokhau(data: Dict[str, Any]):
-        async with AsyncSessionLocal() as session:
-            household = Household(**data)
-            session.add(household)
-            await session.commit()
-            await session.refresh(household)
-            return DbResponse(data=household.as_dict())
+        if not household:
+            return None
+
+        h_dict = household.as_dict()
+        h_dict["nhan_khau"] = [m.as_dict() for m in household.members]
+        return DbResponse(data=h_dict)
 
     @staticmethod
-    async def update_hokhau(id: str, data: Dict[str, Any]):
-        async with AsyncSessionLocal() as session:
-            stmt = update(Household).where(Household.id == id).values(**data)
-            await session.execute(stmt)
-            await session.commit()
+    async def create_hokhau(session: AsyncSession, data: Dict[str, Any]):
+        household = await insert_returning(session, Household, data)
+        return DbResponse(data=household)
 
-            result = await session.execute(select(Household).where(Household.id == id))
-            household = result.scalar_one()
-            return DbResponse(data=household.as_dict())
+    @staticmethod
+    async def update_hokhau(
+        session: AsyncSession,
+        id: str,
+        data: Dict[str, Any],
+        before: Dict[str, Any] | None = None,
+    ):
+        household = await update_returning(session, Household, id, data, before=before)
+        return DbResponse(data=household)
 
     @staticmethod
-    async def delete_hokhau(id: str):
-        async with AsyncSessionLocal() as session:
-            stmt = update(Household).where(Household.id == id).values(is_active=False)
-            await session.execute(stmt)
-            await session.commit()
-            return DbResponse(data=True)
+    async def delete_hokhau(
+        session: AsyncSession, id: str, before: Dict[str, Any] | None = None
+    ):
+        stmt = (
+            update(Household)
+            .where(Household.id == id)
+            .values(is_active=False)
+            .execution_options(audit_before=before)
+        )
+        await session.execute(stmt)
+        return DbResponse(data=True)
 
     @staticmethod
-    async def count_hokhau(to_id: str | None = None, phuong_id: str | None = None):
-        async with AsyncSessionLocal() as session:
-            query = select(Household).filter(Household.is_active == True)
+    async def count_hokhau(
+        session: AsyncSession, to_id: str | None = None, phuong_id: str | None = None
+    ):
+        query = select(Household).filter(Household.is_active == True)
 
-            if to_id:
-                query = query.filter(Household.scope_id == to_id)
-            if phuong_id:
-                query = query.filter(Household.scope_id == phuong_id)
+        if to_id:
+            query = query.filter(Household.scope_id == to_id)
+        if phuong_id:
+            query = query.filter(Household.scope_id == phuong_id)
 
-            result = await session.execute(query)
-            households = result.scalars().all()
-            return DbResponse(data=households)
+        result = await session.execute(query)
+        households = result.scalars().all()
+        return DbResponse(data=households)
 
     @staticmethod
-    async def verify_hokhau(id: str):
+    async def verify_hokhau(
+        session: AsyncSession, id: str, before: Dict[str, Any] | None = None
+    ):
         """Mark a household as verified"""
-        async with AsyncSessionLocal() as session:
-            stmt = update(Household).where(Household.id == id).values(is_verified=True)
-            await session.execute(stmt)
-            await session.commit()
-
-            result = await session.execute(select(Household).where(Household.id == id))
-            household = result.scalar_one()
-            return DbResponse(data=household.as_dict())
+        household = await update_returning(
+            session, Household, id, {"is_verified": True}, before=before
+        )
+        return DbResponse(data=household)
 
     @staticmethod
-    async def unverify_hokhau(id: str):
+    async def unverify_hokhau(
+        session: AsyncSession, id: str, before: Dict[str, Any] | None = None
+    ):
         """Remove verification from a household"""
-        async with AsyncSessionLocal() as session:
-            stmt = update(Household).where(Household.id == id).values(is_verified=False)
-            await session.execute(stmt)
-            await session.commit()
-
-            result = await session.execute(select(Household).where(Household.id == id))
-            household = result.scalar_one()
-            return DbResponse(data=household.as_dict())
+        household = await update_returning(
+            session, Household, id, {"is_verified": False}, before=before
+        )
+        return DbResponse(data=household)
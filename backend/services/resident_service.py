@@ -1,178 +1,188 @@
 from typing import Any, Dict
 
 from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from core.utils import hash_pw
-from database import AsyncSessionLocal, DbResponse
+from core.hashing import hash_pw_async
+from crud.base import insert_returning, update_returning
+from database import DbResponse
 from models import Citizen, Household, MovementLog, User
+from schemas.common import Gender
+
+# Common female name parts (Vietnamese naming conventions); a rough estimate
+FEMALE_NAME_INDICATORS = (
+    "thị", " nữ ", "ngọc", "hương", "lan", "mai", "linh", "hoa", "thu", "phương",
+    "yến", "hằng", "nga", "oanh", "hạnh", "dung", "thảo", "trang", "nhung",
+)
+
+
+def estimate_gender(full_name: str | None) -> str:
+    """Guess gender from a full name, for citizens registered without one"""
+    name = full_name.lower() if full_name else ""
+    if any(indicator in name for indicator in FEMALE_NAME_INDICATORS):
+        return Gender.nu.value
+    return Gender.nam.value
 
 
 class ResidentService:
     @staticmethod
-    async def create_nhankhau(data: Dict[str, Any]):
-        async with AsyncSessionLocal() as session:
-            data["is_active"] = True
-            citizen = Citizen(**data)
-            session.add(citizen)
-            await session.commit()
-            await session.refresh(citizen)
-
-            # Auto-create user account for citizen
-            # Username = CCCD, Password = CCCD
-            cccd_number = data.get("cccd_number")
-            if cccd_number:
-                # Check if user with this CCCD already exists
-                existing_user = await session.execute(
-                    select(User).where(User.username == cccd_number)
+    async def create_nhankhau(session: AsyncSession, data: Dict[str, Any]):
+        data["is_active"] = True
+        data["gender"] = Gender(data.get("gender") or estimate_gender(data.get("full_name"))).value
+        citizen = await insert_returning(session, Citizen, data)
+
+        # Auto-create user account for citizen
+        # Username = CCCD, Password = CCCD
+        cccd_number = data.get("cccd_number")
+        if cccd_number:
+            # Check if user with this CCCD already exists
+            existing_user = await session.execute(
+                select(User).where(User.username == cccd_number)
+            )
+            if not existing_user.scalar_one_or_none():
+                user = User(
+                    username=cccd_number,
+                    password_hash=await hash_pw_async(cccd_number),
+                    role="nguoi_dan",
+                    scope_id=str(citizen["id"]),
+                    active=True,
                 )
-                if not existing_user.scalar_one_or_none():
-                    user = User(
-                        username=cccd_number,
-                        password_hash=hash_pw(cccd_number),
-                        role="nguoi_dan",
-                        scope_id=str(citizen.id),
-                        active=True,
-                    )
-                    session.add(user)
-                    await session.commit()
-
-            return DbResponse(data=citizen.as_dict())
+                session.add(user)
 
-    @staticmethod
-    async def get_nhankhau_detail(id: str):
-        async with AsyncSessionLocal() as session:
-            query = select(Citizen).filter(
-                Citizen.id == id, Citizen.is_active == True
-            )
-            result = await session.execute(query)
-            citizen = result.scalar_one_or_none()
-            if not citizen:
-                return DbResponse(data=None)
-            return DbResponse(data=citizen.as_dict())
+        return DbResponse(data=citizen)
 
     @staticmethod
-    async def update_nhankhau(id: str, data: Dict[str, Any]):
-        async with AsyncSessionLocal() as session:
-            stmt = update(Citizen).where(Citizen.id == id).values(**data)
-            await session.execute(stmt)
-            await session.commit()
+    async def get_nhankhau_detail(session: AsyncSession, id: str):
+        query = select(Citizen).filter(
+            Citizen.id == id, Citizen.is_active == True
+        )
+        result = await session.execute(query)
+        citizen = result.scalar_one_or_none()
+        if not citizen:
+            return DbResponse(data=None)
+        return DbResponse(data=citizen.as_dict())
 
-            result = await session.execute(select(Citizen).where(Citizen.id == id))
-            citizen = result.scalar_one()
-            return DbResponse(data=citizen.as_dict())
+    @staticmethod
+    async def update_nhankhau(
+        session: AsyncSession,
+        id: str,
+        data: Dict[str, Any],
+        before: Dict[str, Any] | None = None,
+    ):
+        citizen = await update_returning(session, Citizen, id, data, before=before)
+        return DbResponse(data=citizen)
 
     @staticmethod
-    async def create_movement_log(movement_data: Dict[str, Any]):
-        async with AsyncSessionLocal() as session:
-            log = MovementLog(**movement_data)
-            session.add(log)
-            await session.commit()
-            await session.refresh(log)
-            return DbResponse(data=log.as_dict())
+    async def create_movement_log(session: AsyncSession, movement_data: Dict[str, Any]):
+        log = await insert_returning(session, MovementLog, movement_data)
+        return DbResponse(data=log)
 
     @staticmethod
-    async def delete_nhankhau(id: str):
-        async with AsyncSessionLocal() as session:
-            stmt = update(Citizen).where(Citizen.id == id).values(is_active=False)
-            await session.execute(stmt)
-            await session.commit()
-            return DbResponse(data=True)
+    async def delete_nhankhau(
+        session: AsyncSession, id: str, before: Dict[str, Any] | None = None
+    ):
+        stmt = (
+            update(Citizen)
+            .where(Citizen.id == id)
+            .values(is_active=False)
+            .execution_options(audit_before=before)
+        )
+        await session.execute(stmt)
+        return DbResponse(data=True)
 
     @staticmethod
-    async def get_nhankhau_movement_logs(id: str):
-        async with AsyncSessionLocal() as session:
-            query = (
-                select(MovementLog)
-                .filter(MovementLog.citizen_id == id)
-                .order_by(MovementLog.change_date.desc())
-            )
-            result = await session.execute(query)
-            logs = result.scalars().all()
-            return DbResponse(data=[l.as_dict() for l in logs])
+    async def get_nhankhau_movement_logs(session: AsyncSession, id: str):
+        query = (
+            select(MovementLog)
+            .filter(MovementLog.citizen_id == id)
+            .order_by(MovementLog.change_date.desc())
+        )
+        result = await session.execute(query)
+        logs = result.scalars().all()
+        return DbResponse(data=[l.as_dict() for l in logs])
 
     @staticmethod
     async def get_all_nhankhau(
-        q: str | None = None, page: int = 1, limit: int = 20
+        session: AsyncSession, q: str | None = None, page: int = 1, limit: int = 20
     ):
-        async with AsyncSessionLocal() as session:
-            query = (
-                select(Citizen)
-                .options(joinedload(Citizen.household))
-                .filter(Citizen.is_active == True)
-            )
+        query = (
+            select(Citizen)
+            .options(joinedload(Citizen.household))
+            .filter(Citizen.is_active == True)
+        )
 
-            if q:
-                q_filter = f"%{q}%"
-                query = query.filter(
-                    or_(
-                        Citizen.full_name.ilike(q_filter),
-                        Citizen.cccd_number.ilike(q_filter),
-                    )
-                )
-
-            # Get total count
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await session.execute(count_query)
-            total = total_result.scalar_one()
-
-            # Apply pagination
-            query = query.offset((page - 1) * limit).limit(limit)
-            result = await session.execute(query)
-            citizens = result.scalars().all()
-
-            data = []
-            for c in citizens:
-                c_dict = c.as_dict()
-                if c.household:
-                    c_dict["household"] = c.household.as_dict()
-                data.append(c_dict)
-
-            return DbResponse(
-                data=data,
-                meta={"total": total, "page": page, "limit": limit}
-            )
-
-    @staticmethod
-    async def search_nhankhau(q: str):
-        async with AsyncSessionLocal() as session:
+        if q:
             q_filter = f"%{q}%"
-            query = (
-                select(Citizen)
-                .options(joinedload(Citizen.household))
-                .filter(
-                    or_(
-                        Citizen.full_name.ilike(q_filter),
-                        Citizen.cccd_number.ilike(q_filter),
-                    ),
-                    Citizen.is_active == True,
+            query = query.filter(
+                or_(
+                    Citizen.full_name.ilike(q_filter),
+                    Citizen.cccd_number.ilike(q_filter),
                 )
             )
-            result = await session.execute(query)
-            citizens = result.scalars().all()
 
-            data = []
-            for c in citizens:
-                c_dict = c.as_dict()
-                if c.household:
-                    c_dict["household"] = {"address": c.household.address}
-                data.append(c_dict)
-            return DbResponse(data=data)
+        # Get total count
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await session.execute(count_query)
+        total = total_result.scalar_one()
+
+        # Apply pagination
+        query = query.offset((page - 1) * limit).limit(limit)
+        result = await session.execute(query)
+        citizens = result.scalars().all()
+
+        data = []
+        for c in citizens:
+            c_dict = c.as_dict()
+            if c.household:
+                c_dict["household"] = c.household.as_dict()
+            data.append(c_dict)
+
+        return DbResponse(
+            data=data,
+            meta={"total": total, "page": page, "limit": limit}
+        )
 
     @staticmethod
-    async def count_nhankhau(to_id: str | None = None, phuong_id: str | None = None):
-        async with AsyncSessionLocal() as session:
-            query = (
-                select(Citizen)
-                .join(Household, Citizen.household_id == Household.id)
-                .filter(Citizen.is_active == True, Household.is_active == True)
+    async def search_nhankhau(session: AsyncSession, q: str):
+        q_filter = f"%{q}%"
+        query = (
+            select(Citizen)
+            .options(joinedload(Citizen.household))
+            .filter(
+                or_(
+                    Citizen.full_name.ilike(q_filter),
+                    Citizen.cccd_number.ilike(q_filter),
+                ),
+                Citizen.is_active == True,
             )
+        )
+        result = await session.execute(query)
+        citizens = result.scalars().all()
+
+        data = []
+        for c in citizens:
+            c_dict = c.as_dict()
+            if c.household:
+                c_dict["household"] = {"address": c.household.address}
+            data.append(c_dict)
+        return DbResponse(data=data)
 
-            if to_id:
-                query = query.filter(Household.scope_id == to_id)
-            if phuong_id:
-                query = query.filter(Household.scope_id == phuong_id)
-
-            result = await session.execute(query)
-            citizens = result.scalars().all()
-            return DbResponse(data=citizens)
+    @staticmethod
+    async def count_nhankhau(
+        session: AsyncSession, to_id: str | None = None, phuong_id: str | None = None
+    ):
+        query = (
+            select(Citizen)
+            .join(Household, Citizen.household_id == Household.id)
+            .filter(Citizen.is_active == True, Household.is_active == True)
+        )
+
+        if to_id:
+            query = query.filter(Household.scope_id == to_id)
+        if phuong_id:
+            query = query.filter(Household.scope_id == phuong_id)
+
+        result = await session.execute(query)
+        citizens = result.scalars().all()
+        return DbResponse(data=citizens)
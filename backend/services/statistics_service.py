@@ -0,0 +1,327 @@
+"""
+Aggregations behind the statistics dashboards.
+
+Each table is aggregated in a single statement with `count(*) FILTER (WHERE
+...)`, so one scan yields every counter a dashboard needs from it. Aggregates
+over different tables are independent and run concurrently, each on its own
+pooled connection. Results are kept for STATS_CACHE_TTL seconds because
+counting a multi-million-row table costs a full scan however it is phrased;
+the cache holds at most STATS_CACHE_MAX_ENTRIES results, evicting expired
+and then least recently used ones, since ranges and edges are caller-chosen.
+
+Time series are bucketed in SQL: feedbacks in the range are grouped by
+`date_trunc`, then joined onto a `generate_series` of bucket starts so empty
+buckets come back as zeros, all in one statement. Ranges are capped at
+TREND_MAX_BUCKETS per granularity.
+
+Processing times (resolved feedbacks, `updated_at - created_at`) are also
+aggregated in SQL: average, median, p90 and max per category, per scope and
+overall come from one GROUPING SETS statement, so memory stays constant
+however many feedbacks there are.
+
+Age distributions never compute an age per row. Bucket edges (in years) are
+turned into date-of-birth cutoffs for today, and `width_bucket` places each
+citizen's `date_of_birth` among them, grouped per bucket and stored gender
+and optionally per neighborhood group or ward in the same statement.
+"""
+import asyncio
+import datetime
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import Float, and_, cast, func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import STATS_CACHE_MAX_ENTRIES, STATS_CACHE_TTL
+from database import AsyncSessionLocal
+from models import Citizen, Household, NeighborhoodGroup, Ward
+from models.feedback import Feedback
+from schemas.common import Gender, Status
+
+_cache: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+TREND_MAX_BUCKETS = {"day": 366, "week": 260, "month": 120}
+
+AGE_EDGES = (0, 16, 61)
+AGE_MAX_BUCKETS = 40
+PYRAMID_MAX_AGE = 100
+
+DEMOGRAPHIC_GROUPS = {
+    "neighborhood_group": (Household.neighborhood_group_id, NeighborhoodGroup),
+    "ward": (Household.ward_id, Ward),
+}
+
+
+async def _cached(key, factory: Callable[[], Awaitable[Any]]):
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        _cache.move_to_end(key)
+        return entry[1]
+    value = await factory()
+    if STATS_CACHE_TTL > 0 and STATS_CACHE_MAX_ENTRIES > 0:
+        now = time.monotonic()
+        for stale in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+            del _cache[stale]
+        _cache[key] = (now + STATS_CACHE_TTL, value)
+        _cache.move_to_end(key)
+        while len(_cache) > STATS_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return value
+
+
+async def _on_own_connection(aggregate: Callable[[AsyncSession], Awaitable[Any]]):
+    async with AsyncSessionLocal() as session:
+        return await aggregate(session)
+
+
+async def gather_aggregates(*aggregates: Callable[[AsyncSession], Awaitable[Any]]):
+    """Run independent aggregates concurrently, one pooled connection each"""
+    return await asyncio.gather(*(_on_own_connection(a) for a in aggregates))
+
+
+def month_start(now: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(now.year, now.month, 1)
+
+
+def bucket_start(day: datetime.date, granularity: str) -> datetime.datetime:
+    """Python twin of Postgres date_trunc (weeks start on Monday)"""
+    start = datetime.datetime(day.year, day.month, day.day)
+    if granularity == "week":
+        return start - datetime.timedelta(days=start.weekday())
+    if granularity == "month":
+        return start.replace(day=1)
+    return start
+
+
+def bucket_step(granularity: str, count: int = 1):
+    if granularity == "month":
+        return relativedelta(months=count)
+    return datetime.timedelta(days=count * (7 if granularity == "week" else 1))
+
+
+def bucket_count(first: datetime.datetime, last: datetime.datetime, granularity: str) -> int:
+    if granularity == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days // (7 if granularity == "week" else 1) + 1
+
+
+def age_cutoffs(edges: tuple[int, ...], today: datetime.date) -> list[datetime.date]:
+    """Ascending birth-date cutoffs: age >= edge  <=>  date_of_birth < cutoff"""
+    return [
+        today - relativedelta(years=edge) + datetime.timedelta(days=1)
+        for edge in reversed(edges[1:])
+    ]
+
+
+class StatisticsService:
+    @staticmethod
+    async def household_counts(session: AsyncSession) -> Dict[str, int]:
+        active = Household.is_active
+        query = select(
+            func.count().filter(active).label("active"),
+            func.count(func.distinct(Household.scope_id))
+            .filter(active, Household.scope_id.is_not(None))
+            .label("groups"),
+        ).select_from(Household)
+        row = (await session.execute(query)).one()
+        return dict(row._mapping)
+
+    @staticmethod
+    async def citizen_counts(session: AsyncSession) -> Dict[str, int]:
+        query = select(
+            func.count()
+            .filter(Citizen.is_active, ~Citizen.is_deceased)
+            .label("residents"),
+        ).select_from(Citizen)
+        row = (await session.execute(query)).one()
+        return dict(row._mapping)
+
+    @staticmethod
+    async def feedback_counts(
+        session: AsyncSession, since: datetime.datetime
+    ) -> Dict[str, int]:
+        query = select(
+            func.count().label("total"),
+            func.count()
+            .filter(Feedback.status == Status.da_giai_quyet.value)
+            .label("resolved"),
+            func.count().filter(Feedback.created_at >= since).label("since"),
+        ).select_from(Feedback)
+        row = (await session.execute(query)).one()
+        return dict(row._mapping)
+
+    @staticmethod
+    async def overview(now: datetime.datetime | None = None) -> Dict[str, Dict[str, int]]:
+        """Household, citizen and feedback counters for the dashboards"""
+        since = month_start(now or datetime.datetime.now())
+
+        async def compute():
+            households, citizens, feedback = await gather_aggregates(
+                StatisticsService.household_counts,
+                StatisticsService.citizen_counts,
+                lambda session: StatisticsService.feedback_counts(session, since),
+            )
+            return {"households": households, "citizens": citizens, "feedback": feedback}
+
+        return await _cached(("overview", since), compute)
+
+    @staticmethod
+    async def feedback_trend(
+        session: AsyncSession,
+        granularity: str,
+        first: datetime.datetime,
+        last: datetime.datetime,
+        end: datetime.datetime,
+    ) -> list[Dict[str, Any]]:
+        """Total and resolved feedback per bucket from `first` to `last` (bucket starts), before `end`"""
+        trunc = func.date_trunc(literal_column(f"'{granularity}'"), Feedback.created_at)
+        counts = (
+            select(
+                trunc.label("bucket"),
+                func.count().label("total"),
+                func.count()
+                .filter(Feedback.status == Status.da_giai_quyet.value)
+                .label("resolved"),
+            )
+            .where(Feedback.created_at >= first, Feedback.created_at < end)
+            .group_by(trunc)
+            .subquery()
+        )
+        series = select(
+            func.generate_series(
+                first, last, literal_column(f"interval '1 {granularity}'")
+            ).label("bucket")
+        ).subquery()
+        query = (
+            select(
+                series.c.bucket,
+                func.coalesce(counts.c.total, 0).label("total"),
+                func.coalesce(counts.c.resolved, 0).label("resolved"),
+            )
+            .select_from(series.outerjoin(counts, counts.c.bucket == series.c.bucket))
+            .order_by(series.c.bucket)
+        )
+
+        async def compute():
+            result = await session.execute(query)
+            return [dict(row._mapping) for row in result]
+
+        return await _cached(("feedback_trend", granularity, first, last, end), compute)
+
+    @staticmethod
+    async def feedback_processing(
+        session: AsyncSession, since: datetime.datetime | None = None
+    ) -> Dict[str, Any]:
+        """Status counts and processing-time percentiles per category, per scope and overall"""
+        days = cast(func.extract("epoch", Feedback.updated_at - Feedback.created_at), Float) / 86400
+        resolved = Feedback.status == Status.da_giai_quyet.value
+        timed = and_(resolved, Feedback.created_at.is_not(None), Feedback.updated_at.is_not(None))
+        query = select(
+            Feedback.category,
+            Feedback.scope_id,
+            func.grouping(Feedback.category, Feedback.scope_id).label("grouping_id"),
+            func.count().label("total"),
+            func.count().filter(resolved).label("resolved"),
+            func.count().filter(Feedback.status == Status.dang_xu_ly.value).label("in_progress"),
+            func.count().filter(Feedback.status == Status.moi_ghi_nhan.value).label("pending"),
+            func.count().filter(timed).label("timed"),
+            func.avg(days).filter(timed).label("avg_days"),
+            func.percentile_cont(0.5).within_group(days).filter(timed).label("median_days"),
+            func.percentile_cont(0.9).within_group(days).filter(timed).label("p90_days"),
+            func.max(days).filter(timed).label("max_days"),
+            # Whole-day figures the dashboards have always shown
+            func.avg(func.floor(days)).filter(timed).label("avg_whole_days"),
+            func.avg(func.greatest(func.floor(days), 1)).filter(timed).label("avg_response_days"),
+        ).group_by(
+            func.grouping_sets(tuple_(Feedback.category), tuple_(Feedback.scope_id), tuple_())
+        )
+        if since is not None:
+            query = query.where(Feedback.created_at >= since)
+
+        async def compute():
+            stats = {"overall": None, "by_category": {}, "by_scope": {}}
+            for row in await session.execute(query):
+                values = dict(row._mapping)
+                category = values.pop("category")
+                scope_id = values.pop("scope_id")
+                # grouping() bits: 2 = category rolled up, 1 = scope rolled up
+                grouping = values.pop("grouping_id")
+                if grouping == 1:
+                    stats["by_category"][category] = values
+                elif grouping == 2:
+                    stats["by_scope"][scope_id] = values
+                else:
+                    stats["overall"] = values
+            return stats
+
+        return await _cached(("feedback_processing", since), compute)
+
+    @staticmethod
+    async def demographics(
+        session: AsyncSession,
+        edges: tuple[int, ...] = AGE_EDGES,
+        group_by: str | None = None,
+        today: datetime.date | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Active citizens per age bucket [edges[i], edges[i + 1]) (the last is
+        open-ended) split by gender, overall and per group when `group_by` is
+        "neighborhood_group" or "ward"
+        """
+        today = today or datetime.date.today()
+        last = len(edges) - 1
+        # Inlined (they are dates and ints) so SELECT and GROUP BY read the same
+        cutoffs = array(
+            [literal_column(f"DATE '{cutoff.isoformat()}'") for cutoff in age_cutoffs(edges, today)]
+        )
+        # width_bucket counts from the oldest cutoff; bucket 0 is the youngest
+        bucket_expr = literal_column(str(last)) - func.width_bucket(Citizen.date_of_birth, cutoffs)
+        bucket = bucket_expr.label("bucket")
+        columns = [bucket, Citizen.gender, func.count().label("count")]
+        query = select(*columns).where(Citizen.is_active, ~Citizen.is_deceased)
+        if group_by is None:
+            query = query.group_by(bucket_expr, Citizen.gender)
+        else:
+            key, group_model = DEMOGRAPHIC_GROUPS[group_by]
+            query = (
+                select(
+                    key.label("group_id"),
+                    group_model.name.label("group_name"),
+                    func.grouping(key, group_model.name).label("grouping_id"),
+                    *columns,
+                )
+                .select_from(Citizen)
+                .outerjoin(Household, Household.id == Citizen.household_id)
+                .outerjoin(group_model, group_model.id == key)
+                .where(Citizen.is_active, ~Citizen.is_deceased)
+                .group_by(
+                    func.grouping_sets(
+                        tuple_(key, group_model.name, bucket_expr, Citizen.gender),
+                        tuple_(bucket_expr, Citizen.gender),
+                    )
+                )
+            )
+
+        genders = {Gender.nam.value: "male", Gender.nu.value: "female"}
+
+        async def compute():
+            stats = {"overall": {}, "groups": {}}
+            for row in await session.execute(query):
+                values = dict(row._mapping)
+                if values.get("grouping_id", 3) == 3:
+                    buckets = stats["overall"]
+                else:
+                    buckets = stats["groups"].setdefault(
+                        values["group_id"], {"name": values["group_name"], "buckets": {}}
+                    )["buckets"]
+                counts = buckets.setdefault(
+                    values["bucket"], {"count": 0, "male": 0, "female": 0, "unknown": 0}
+                )
+                counts["count"] += values["count"]
+                counts[genders.get(values["gender"], "unknown")] += values["count"]
+            return stats
+
+        return await _cached(("demographics", edges, group_by, today), compute)